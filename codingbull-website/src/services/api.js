@@ -42,12 +42,9 @@ const debugError = (message, error = null) => {
  * @returns {Promise} - The fetch promise
  */
 const fetchWithTimeout = async (url, options = {}) => {
-  // Add cache-busting parameter
-  const cacheBuster = `_cb=${Date.now()}`;
-  const separator = url.includes('?') ? '&' : '?';
-  const urlWithCacheBuster = `${url}${separator}${cacheBuster}`;
-  
-  debugLog('Fetching URL:', urlWithCacheBuster);
+  // No cache-busting: content endpoints send ETags and 'Cache-Control: no-cache',
+  // so the browser revalidates its copy and gets a 304 when nothing changed
+  debugLog('Fetching URL:', url);
   
   const controller = new AbortController();
   const { signal } = controller;
@@ -57,8 +54,8 @@ const fetchWithTimeout = async (url, options = {}) => {
   }, API_TIMEOUT);
   
   try {
-    debugLog(`Making request to: ${urlWithCacheBuster}`);
-    const response = await fetch(urlWithCacheBuster, { ...options, signal });
+    debugLog(`Making request to: ${url}`);
+    const response = await fetch(url, { ...options, signal });
     debugLog(`Response status: ${response.status} ${response.statusText}`);
     clearTimeout(timeout);
     
@@ -14,6 +14,12 @@ class ErrorTracker {
     this.isEnabled = process.env.REACT_APP_ENABLE_ERROR_TRACKING !== 'false';
     this.apiEndpoint = `${config.api.baseUrl.replace(/\/$/, '')}/error-tracking`;
     
+    // Events are queued and sent together to the batch endpoint
+    this.queue = [];
+    this.maxBatchSize = 20;
+    this.flushInterval = 5000; // milliseconds
+    this.flushTimer = null;
+    
     if (this.isEnabled) {
       this.initializeTracking();
     }
@@ -49,6 +55,14 @@ class ErrorTracker {
     
     // Start session tracking
     this.startSession();
+    
+    // Send whatever is queued before the page goes away
+    window.addEventListener('pagehide', () => this.flush(true));
+    document.addEventListener('visibilitychange', () => {
+      if (document.visibilityState === 'hidden') {
+        this.flush(true);
+      }
+    });
   }
   
   // Breadcrumb tracking
@@ -315,28 +329,49 @@ class ErrorTracker {
   }
   
   // Backend communication
-  async sendToBackend(type, data) {
+  sendToBackend(kind, data) {
     if (!this.isEnabled) return;
     
-    // Prevent recursive calls by using a flag
-    if (this._sendingToBackend) return;
-    this._sendingToBackend = true;
+    this.queue.push({ ...data, kind });
+    
+    if (this.queue.length >= this.maxBatchSize) {
+      this.flush();
+    } else if (!this.flushTimer) {
+      this.flushTimer = setTimeout(() => this.flush(), this.flushInterval);
+    }
+  }
+  
+  async flush(useBeacon = false) {
+    if (this.flushTimer) {
+      clearTimeout(this.flushTimer);
+      this.flushTimer = null;
+    }
+    if (this.queue.length === 0) return;
+    
+    const events = this.queue.splice(0, this.queue.length);
+    const url = `${this.apiEndpoint}/batch/`;
+    const body = JSON.stringify({ events });
+    
+    // A string body goes out as text/plain, which needs no CORS preflight
+    if (useBeacon && navigator.sendBeacon && navigator.sendBeacon(url, body)) {
+      return;
+    }
     
     try {
-      await fetch(`${this.apiEndpoint}/${type}/`, {
+      // Requests to /error-tracking/ are skipped by the fetch wrapper above
+      await fetch(url, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
         },
-        body: JSON.stringify(data)
+        body,
+        keepalive: useBeacon
       });
     } catch (error) {
-      // Silently fail to avoid infinite error loops
+      // Silently drop the batch to avoid infinite error loops
       if (process.env.NODE_ENV === 'development') {
         console.warn('[Error Tracker] Failed to send data to backend:', error);
       }
-    } finally {
-      this._sendingToBackend = false;
     }
   }
   
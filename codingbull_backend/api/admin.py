@@ -15,6 +15,8 @@ from .models import (
     SecurityLog, IPAddress, UserAgent, RateLimitRule, BlacklistRule, 
     SecurityAlert, RateLimitTracker, ErrorLog, PerformanceLog, UserSession
 )
+from .blacklist import bump_blacklist_generation
+from .signals import bump_on_commit
 
 # ============================================================================
 # EXISTING MODELS ADMIN
@@ -95,6 +97,8 @@ class IPAddressAdmin(admin.ModelAdmin):
     @admin.action(description="Blacklist selected IPs")
     def blacklist_ips(self, request, queryset):
         updated = queryset.update(is_blacklisted=True, created_by=request.user)
+        # queryset.update() does not send post_save
+        bump_on_commit(bump_blacklist_generation)
         self.message_user(request, f'{updated} IP addresses blacklisted.')
     
     @admin.action(description="Whitelist selected IPs")
@@ -588,11 +592,13 @@ class BlacklistRuleAdmin(admin.ModelAdmin):
     @admin.action(description="🟢 Activate selected rules")
     def activate_rules(self, request, queryset):
         updated = queryset.update(is_active=True)
+        bump_on_commit(bump_blacklist_generation)  # queryset.update() does not send post_save
         self.message_user(request, '✅ {} blacklist rules activated.'.format(updated))
 
     @admin.action(description="🔴 Deactivate selected rules")
     def deactivate_rules(self, request, queryset):
         updated = queryset.update(is_active=False)
+        bump_on_commit(bump_blacklist_generation)  # queryset.update() does not send post_save
         self.message_user(request, '⏸️ {} blacklist rules deactivated.'.format(updated))
 
     @admin.action(description="⏰ Extend expiry by 30 days")
@@ -1012,7 +1018,7 @@ admin.site.index_title = "CodingBull Management Dashboard"
 @admin.register(ErrorLog)
 class ErrorLogAdmin(admin.ModelAdmin):
     list_display = [
-        'timestamp', 'error_type', 'severity', 'message_preview', 
+        'timestamp', 'error_type', 'severity', 'message_preview', 'count',
         'url_preview', 'user_id', 'browser_info_preview', 'is_resolved'
     ]
     list_filter = [
@@ -1021,7 +1027,7 @@ class ErrorLogAdmin(admin.ModelAdmin):
     ]
     search_fields = ['message', 'url', 'user_id', 'session_id']
     readonly_fields = [
-        'timestamp', 'first_seen', 'last_seen', 'formatted_stack_trace',
+        'timestamp', 'first_seen', 'last_seen', 'fingerprint', 'formatted_stack_trace',
         'formatted_breadcrumbs', 'formatted_browser_info', 'formatted_extra_data'
     ]
     fieldsets = (
@@ -1029,7 +1035,7 @@ class ErrorLogAdmin(admin.ModelAdmin):
             'fields': ('timestamp', 'error_type', 'severity', 'message', 'count')
         }),
         ('Technical Details', {
-            'fields': ('formatted_stack_trace', 'component_stack'),
+            'fields': ('fingerprint', 'formatted_stack_trace', 'component_stack'),
             'classes': ('collapse',)
         }),
         ('Context', {
@@ -1148,7 +1154,16 @@ class ErrorLogAdmin(admin.ModelAdmin):
 
     @admin.action(description='Mark selected errors as unresolved')
     def mark_as_unresolved(self, request, queryset):
-        updated = queryset.update(
+        # Only one row per fingerprint may be open: reopen the latest of each
+        # and skip errors that already have an open row
+        open_fingerprints = set(ErrorLog.objects.filter(
+            is_resolved=False, fingerprint__in=queryset.values('fingerprint')
+        ).values_list('fingerprint', flat=True))
+        reopen = {}
+        for pk, fingerprint in queryset.filter(is_resolved=True).order_by('last_seen').values_list('pk', 'fingerprint'):
+            if fingerprint not in open_fingerprints:
+                reopen[fingerprint] = pk
+        updated = ErrorLog.objects.filter(pk__in=reopen.values()).update(
             is_resolved=False, 
             resolved_at=None,
             resolved_by=None
@@ -5,9 +5,10 @@ Custom admin context processor to provide dashboard statistics
 from django.utils import timezone
 from datetime import timedelta
 from .models import (
-    BlogPost, Project, Service, ContactInquiry, ErrorLog, SecurityLog,
+    BlogPost, Project, Service, ContactInquiry, ErrorLog,
     SecurityAlert, IPAddress
 )
+from .rollups import log_total
 
 
 def admin_dashboard_context(request):
@@ -27,7 +28,7 @@ def admin_dashboard_context(request):
             'service_count': Service.objects.count(),
             'inquiry_count': ContactInquiry.objects.filter(created_at__gte=last_24h).count(),
             'error_count': ErrorLog.objects.filter(is_resolved=False).count(),
-            'security_count': SecurityLog.objects.filter(timestamp__gte=last_24h, is_suspicious=True).count(),
+            'security_count': log_total('security', 'suspicious', start=last_24h, end=now),
         }
         
         return context
@@ -4,14 +4,15 @@ Custom Admin Views for Error Tracking Dashboard
 
 from django.shortcuts import render
 from django.contrib.admin.views.decorators import staff_member_required
-from django.db.models import Count, Q, Avg, Max, Sum
+from django.db.models import Q, Avg, Max, Sum
 from django.utils import timezone
 from datetime import timedelta
 from .models import (
-    ErrorLog, PerformanceLog, UserSession, BlogPost, Project, Service, 
+    ErrorLog, UserSession, BlogPost, Project, Service, 
     Testimonial, ContactInquiry, Category, SecurityLog, IPAddress, 
     SecurityAlert, BlacklistRule, RateLimitRule, UserAgent
 )
+from .rollups import log_counts, log_total, log_trend, performance_by_path, performance_summary, performance_trend
 import json
 
 
@@ -36,11 +37,11 @@ def admin_dashboard_overview(request):
         'new_inquiries_24h': ContactInquiry.objects.filter(created_at__gte=last_24h).count(),
     }
     
-    # Security Statistics
+    # Security Statistics (log volumes from the rollups)
     security_stats = {
-        'total_security_logs': SecurityLog.objects.count(),
-        'security_logs_24h': SecurityLog.objects.filter(timestamp__gte=last_24h).count(),
-        'suspicious_activities': SecurityLog.objects.filter(is_suspicious=True).count(),
+        'total_security_logs': log_total('security'),
+        'security_logs_24h': log_total('security', start=last_24h, end=now),
+        'suspicious_activities': log_total('security', 'suspicious'),
         'blocked_requests': SecurityLog.objects.filter(blocked=True).count(),
         'critical_alerts': SecurityAlert.objects.filter(severity='critical', is_acknowledged=False).count(),
         'total_ip_addresses': IPAddress.objects.count(),
@@ -51,13 +52,11 @@ def admin_dashboard_overview(request):
     
     # Error & Performance Statistics
     error_stats = {
-        'total_errors': ErrorLog.objects.count(),
-        'errors_24h': ErrorLog.objects.filter(timestamp__gte=last_24h).count(),
+        'total_errors': log_total('error'),
+        'errors_24h': log_total('error', start=last_24h, end=now),
         'critical_errors': ErrorLog.objects.filter(severity='critical', is_resolved=False).count(),
         'unresolved_errors': ErrorLog.objects.filter(is_resolved=False).count(),
-        'avg_page_load_time': PerformanceLog.objects.filter(
-            metric_type='page_load', timestamp__gte=last_7d
-        ).aggregate(avg_duration=Avg('duration'))['avg_duration'] or 0,
+        'avg_page_load_time': performance_summary('page_load', last_7d, now)['avg_duration'],
         'total_sessions': UserSession.objects.count(),
         'sessions_24h': UserSession.objects.filter(start_time__gte=last_24h).count(),
     }
@@ -77,12 +76,14 @@ def admin_dashboard_overview(request):
     
     # Top Statistics
     top_stats = {
-        'top_error_types': ErrorLog.objects.values('error_type').annotate(
-            count=Count('id')
-        ).order_by('-count')[:5],
-        'top_affected_urls': ErrorLog.objects.values('url').annotate(
-            error_count=Count('id')
-        ).order_by('-error_count')[:5],
+        'top_error_types': [
+            {'error_type': error_type, 'count': count}
+            for error_type, count in log_counts('error', 'error_type', limit=5)
+        ],
+        'top_affected_urls': [
+            {'url': url, 'error_count': count}
+            for url, count in log_counts('error', 'url', limit=5)
+        ],
         'top_suspicious_ips': IPAddress.objects.filter(
             suspicious_requests__gt=0
         ).order_by('-suspicious_requests')[:5],
@@ -111,56 +112,43 @@ def error_tracking_dashboard(request):
     last_7d = now - timedelta(days=7)
     last_30d = now - timedelta(days=30)
     
-    # Error Statistics
-    total_errors = ErrorLog.objects.count()
-    errors_24h = ErrorLog.objects.filter(timestamp__gte=last_24h).count()
-    errors_7d = ErrorLog.objects.filter(timestamp__gte=last_7d).count()
-    errors_30d = ErrorLog.objects.filter(timestamp__gte=last_30d).count()
+    # Error Statistics (occurrence counts from the rollups)
+    total_errors = log_total('error')
+    errors_24h = log_total('error', start=last_24h, end=now)
+    errors_7d = log_total('error', start=last_7d, end=now)
+    errors_30d = log_total('error', start=last_30d, end=now)
     
     unresolved_errors = ErrorLog.objects.filter(is_resolved=False).count()
     critical_errors = ErrorLog.objects.filter(severity='critical', is_resolved=False).count()
     
     # Error Types Breakdown
-    error_types = ErrorLog.objects.values('error_type').annotate(
-        count=Count('id')
-    ).order_by('-count')[:10]
+    error_types = [
+        {'error_type': error_type, 'count': count}
+        for error_type, count in log_counts('error', 'error_type', limit=10)
+    ]
     
     # Severity Breakdown
-    severity_breakdown = ErrorLog.objects.values('severity').annotate(
-        count=Count('id')
-    ).order_by('-count')
+    severity_breakdown = [
+        {'severity': severity, 'count': count}
+        for severity, count in log_counts('error', 'severity')
+    ]
     
     # Most Affected URLs
-    affected_urls = ErrorLog.objects.values('url').annotate(
-        error_count=Count('id'),
-        unique_users=Count('user_id', distinct=True)
-    ).order_by('-error_count')[:10]
+    affected_urls = [
+        {'url': url, 'error_count': count}
+        for url, count in log_counts('error', 'url', limit=10)
+    ]
     
     # Browser/OS Statistics
-    browser_stats = {}
-    for error in ErrorLog.objects.exclude(browser_info__isnull=True):
-        if error.browser_info:
-            browser = error.browser_info.get('browser', 'Unknown')
-            os = error.browser_info.get('os', 'Unknown')
-            key = f"{browser} on {os}"
-            browser_stats[key] = browser_stats.get(key, 0) + 1
-    
-    browser_stats = sorted(browser_stats.items(), key=lambda x: x[1], reverse=True)[:10]
+    browser_stats = log_counts('error', 'browser', limit=10)
     
-    # Performance Statistics
-    avg_page_load = PerformanceLog.objects.filter(
-        metric_type='page_load',
-        timestamp__gte=last_7d
-    ).aggregate(avg_duration=Avg('duration'))['avg_duration'] or 0
+    # Performance Statistics (from the rollups)
+    avg_page_load = performance_summary('page_load', last_7d, now)['avg_duration']
     
-    slow_pages = PerformanceLog.objects.filter(
-        metric_type='page_load',
-        duration__gt=3000,  # > 3 seconds
-        timestamp__gte=last_7d
-    ).values('url').annotate(
-        avg_duration=Avg('duration'),
-        count=Count('*')
-    ).order_by('-avg_duration')[:10]
+    slow_pages = sorted(
+        (page for page in performance_by_path('page_load', last_7d, now) if page['p90'] > 3000),  # > 3 seconds
+        key=lambda page: page['p90'], reverse=True
+    )[:10]
     
     # User Session Statistics
     total_sessions = UserSession.objects.count()
@@ -179,28 +167,16 @@ def error_tracking_dashboard(request):
     ).order_by('-timestamp')[:10]
     
     # Error Trends (last 7 days)
-    error_trends = []
-    for i in range(7):
-        date = now - timedelta(days=i)
-        start_of_day = date.replace(hour=0, minute=0, second=0, microsecond=0)
-        end_of_day = start_of_day + timedelta(days=1)
-        
-        daily_errors = ErrorLog.objects.filter(
-            timestamp__gte=start_of_day,
-            timestamp__lt=end_of_day
-        ).count()
-        
-        error_trends.append({
-            'date': start_of_day.strftime('%Y-%m-%d'),
-            'errors': daily_errors
-        })
-    
-    error_trends.reverse()  # Show oldest to newest
+    error_trends = [
+        {'date': day['date'], 'errors': day['count']}
+        for day in log_trend('error', days=7, now=now)
+    ]
     
-    # Top Error Messages
-    top_error_messages = ErrorLog.objects.values('message').annotate(
-        count=Count('id'),
-        latest_occurrence=Max('timestamp')
+    # Top Error Messages (one group per fingerprint)
+    top_error_messages = ErrorLog.objects.values('fingerprint').annotate(
+        message=Max('message'),
+        count=Sum('count'),
+        latest_occurrence=Max('last_seen')
     ).order_by('-count')[:10]
     
     context = {
@@ -238,10 +214,9 @@ def error_detail_view(request, error_id):
     try:
         error: ErrorLog = ErrorLog.objects.get(id=error_id)
         
-        # Find similar errors
+        # Earlier (resolved) rows of the same error
         similar_errors = ErrorLog.objects.filter(
-            message=error.message,
-            error_type=error.error_type
+            fingerprint=error.fingerprint
         ).exclude(id=error.pk).order_by('-timestamp')[:5]
         
         # Get user session if available
@@ -275,50 +250,30 @@ def performance_dashboard(request):
     last_24h = now - timedelta(hours=24)
     last_7d = now - timedelta(days=7)
     
-    # Performance metrics
-    avg_page_load_24h = PerformanceLog.objects.filter(
-        metric_type='page_load',
-        timestamp__gte=last_24h
-    ).aggregate(avg_duration=Avg('duration'))['avg_duration'] or 0
+    # Latency from the hourly/daily rollups (api.rollups), not raw rows
+    page_load_24h = performance_summary('page_load', last_24h, now)
+    api_response_24h = performance_summary('api_call', last_24h, now)
     
-    avg_api_response_24h = PerformanceLog.objects.filter(
-        metric_type='api_call',
-        timestamp__gte=last_24h
-    ).aggregate(avg_duration=Avg('duration'))['avg_duration'] or 0
-    
-    # Slowest pages
-    slowest_pages = PerformanceLog.objects.filter(
-        metric_type='page_load',
-        timestamp__gte=last_7d
-    ).values('url').annotate(
-        avg_duration=Avg('duration'),
-        count=Count('*')
-    ).order_by('-avg_duration')[:15]
+    # Slowest pages, by 90th percentile
+    slowest_pages = sorted(
+        performance_by_path('page_load', last_7d, now), key=lambda page: page['p90'], reverse=True
+    )[:15]
+    for page in slowest_pages:
+        # The raw rows under a route: its URLs contain the unmasked prefix
+        page['url_prefix'] = page['path'].split('<', 1)[0]
     
     # Performance trends
-    performance_trends = []
-    for i in range(7):
-        date = now - timedelta(days=i)
-        start_of_day = date.replace(hour=0, minute=0, second=0, microsecond=0)
-        end_of_day = start_of_day + timedelta(days=1)
-        
-        daily_avg = PerformanceLog.objects.filter(
-            metric_type='page_load',
-            timestamp__gte=start_of_day,
-            timestamp__lt=end_of_day
-        ).aggregate(avg_duration=Avg('duration'))['avg_duration'] or 0
-        
-        performance_trends.append({
-            'date': start_of_day.strftime('%Y-%m-%d'),
-            'avg_load_time': round(daily_avg, 2)
-        })
-    
-    performance_trends.reverse()
+    performance_trends = [
+        {'date': day['date'], 'avg_load_time': round(day['avg_duration'], 2), 'p50': day['p50'], 'p90': day['p90']}
+        for day in performance_trend('page_load', days=7, now=now)
+    ]
     
     context = {
         'title': 'Performance Dashboard',
-        'avg_page_load_24h': round(avg_page_load_24h, 2),
-        'avg_api_response_24h': round(avg_api_response_24h, 2),
+        'avg_page_load_24h': round(page_load_24h['avg_duration'], 2),
+        'avg_api_response_24h': round(api_response_24h['avg_duration'], 2),
+        'page_load_24h': page_load_24h,
+        'api_response_24h': api_response_24h,
         'slowest_pages': slowest_pages,
         'performance_trends': performance_trends,
         'performance_trends_json': json.dumps(performance_trends),
@@ -0,0 +1,230 @@
+"""
+Blacklist Rule Snapshot
+Per-worker compiled copy of the active blacklist rules, invalidated through a
+generation counter stored in the shared Django cache
+"""
+
+import ipaddress
+import logging
+import re
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .models import BlacklistRule, IPAddress
+from .generations import GenerationSnapshot, bump_generation, get_generation
+from .ip_index import IPPrefixIndex
+from .pattern_matcher import PatternSet
+
+logger = logging.getLogger(__name__)
+
+BLACKLIST_GENERATION_KEY = 'security:blacklist:generation'
+
+# Rule types whose pattern is a regular expression
+REGEX_RULE_TYPES = ('user_agent', 'path', 'referer')
+
+# Rule types served from the IP prefix index
+IP_RULE_TYPES = ('ip', 'ip_range')
+
+# Backreferences would point at the wrong group once patterns are joined
+BACKREFERENCE_RE = re.compile(r'\\[1-9]|\(\?P=')
+
+# Request field each rule type is matched against
+RULE_TYPE_FIELDS = {
+    'ip': 'remote_addr',
+    'ip_range': 'remote_addr',
+    'user_agent': 'user_agent',
+    'path': 'path',
+    'referer': 'referer',
+}
+
+
+def get_blacklist_generation() -> int:
+    """Return the current blacklist generation"""
+    return get_generation(BLACKLIST_GENERATION_KEY)
+
+
+def bump_blacklist_generation():
+    """Invalidate every worker's snapshot by advancing the generation"""
+    bump_generation(BLACKLIST_GENERATION_KEY)
+
+
+class CompiledBlacklistRule:
+    """A BlacklistRule with its pattern parsed once"""
+
+    __slots__ = ('pk', 'rule_type', 'pattern', 'reason', 'expires_at', 'field', 'matcher', 'position')
+
+    def __init__(self, rule: BlacklistRule, matcher: Any, position: int = 0):
+        self.pk = rule.pk
+        self.rule_type = rule.rule_type
+        self.pattern = rule.pattern
+        self.reason = rule.reason
+        self.expires_at = rule.expires_at
+        self.field = RULE_TYPE_FIELDS[rule.rule_type]
+        self.matcher = matcher
+        # Index in database order; the lowest matching position wins
+        self.position = position
+
+    @classmethod
+    def compile(cls, rule: BlacklistRule, position: int = 0) -> Optional['CompiledBlacklistRule']:
+        """Compile a rule, returning None for rules that can never match a request"""
+        if rule.rule_type not in RULE_TYPE_FIELDS:
+            # Country rules need a geolocation lookup and are not evaluated per request
+            return None
+
+        try:
+            if rule.rule_type in REGEX_RULE_TYPES:
+                matcher = re.compile(rule.pattern, re.IGNORECASE)
+            elif rule.rule_type == 'ip_range':
+                matcher = ipaddress.ip_network(rule.pattern, strict=False)
+            else:
+                # Single addresses are indexed as /32 or /128 networks
+                matcher = ipaddress.ip_network(ipaddress.ip_address(rule.pattern))
+        except (re.error, ValueError) as e:
+            logger.warning(f"Skipping invalid blacklist rule {rule.pk} ({rule.pattern}): {e}")
+            return None
+
+        return cls(rule, matcher, position)
+
+    def matches(self, value: str, ip_obj: Any = None) -> bool:
+        """Check the value against this rule (same semantics as BlacklistRule.matches)"""
+        if self.rule_type in IP_RULE_TYPES:
+            return ip_obj is not None and ip_obj in self.matcher
+        return self.matcher.search(value) is not None
+
+    def is_expired(self, now) -> bool:
+        return self.expires_at is not None and now > self.expires_at
+
+    def record_match(self):
+        """Record the match with a single UPDATE that does not invalidate the snapshot"""
+        if self.pk is None:
+            # Built from IPAddress.is_blacklisted rather than a BlacklistRule
+            return
+        BlacklistRule.objects.filter(pk=self.pk).update(
+            match_count=F('match_count') + 1,
+            last_matched=timezone.now(),
+        )
+
+
+class CompiledBlacklist:
+    """
+    The compiled rules of one snapshot.
+
+    ip and ip_range rules live in an IPPrefixIndex, so their cost does not grow
+    with the number of CIDRs. Regex rules are also joined into one PatternSet
+    per request field: a value that none of them matches (nearly every
+    request) costs one scan, and only on a hit are that field's rules checked
+    one by one, in database order.
+    """
+
+    __slots__ = ('rules', 'ip_index', 'pattern_rules', 'pattern_sets')
+
+    def __init__(self, rules: List[CompiledBlacklistRule]):
+        self.rules = rules
+        self.ip_index = IPPrefixIndex()
+        self.pattern_rules = []
+        patterns_by_field: Dict[str, List[str]] = {}
+        for rule in rules:
+            if rule.rule_type in IP_RULE_TYPES:
+                self.ip_index.add(rule.matcher, rule)
+            else:
+                self.pattern_rules.append(rule)
+                patterns_by_field.setdefault(rule.field, []).append(rule.pattern)
+
+        # None: the patterns cannot be joined, so the field's rules are always scanned
+        self.pattern_sets: Dict[str, Optional[PatternSet]] = {}
+        for field, patterns in patterns_by_field.items():
+            pattern_set = None
+            if not any(BACKREFERENCE_RE.search(pattern) for pattern in patterns):
+                try:
+                    pattern_set = PatternSet(patterns)
+                except re.error as e:
+                    # e.g. an inline global flag like (?i) in the middle of the alternation
+                    logger.debug(f"Blacklist {field} patterns not combined: {e}")
+            self.pattern_sets[field] = pattern_set
+
+    def find_match(self, request_info: Dict[str, Any]) -> Optional[CompiledBlacklistRule]:
+        """Return the first rule, in database order, matching the request"""
+        now = timezone.now()
+
+        ip_match = None
+        if len(self.ip_index):
+            remote_addr = request_info.get('remote_addr')
+            try:
+                ip_obj = ipaddress.ip_address(remote_addr) if remote_addr else None
+            except ValueError:
+                ip_obj = None
+            if ip_obj is not None:
+                for rule in self.ip_index.lookup(ip_obj):
+                    if (ip_match is None or rule.position < ip_match.position) and not rule.is_expired(now):
+                        ip_match = rule
+
+        hit_fields = set()
+        for field, pattern_set in self.pattern_sets.items():
+            value = request_info.get(field)
+            if value and (pattern_set is None or pattern_set.search_any(value)):
+                hit_fields.add(field)
+        if not hit_fields:
+            return ip_match
+
+        for rule in self.pattern_rules:
+            if ip_match is not None and rule.position > ip_match.position:
+                break
+            if rule.field not in hit_fields or rule.is_expired(now):
+                continue
+            value = request_info.get(rule.field)
+            if rule.matches(value):
+                return rule
+
+        return ip_match
+
+
+class BlacklistSnapshot(GenerationSnapshot):
+    """
+    In-memory view of the active blacklist rules for this worker process.
+
+    The rules are loaded and compiled once; afterwards each request only reads
+    the generation counter from the cache. Saving or deleting a BlacklistRule,
+    or changing IPAddress.is_blacklisted, bumps the generation (see
+    api.signals) and every worker rebuilds on its next request.
+    """
+
+    generation_key = BLACKLIST_GENERATION_KEY
+
+    def get_max_age(self) -> int:
+        security_settings = getattr(settings, 'SECURITY_MIDDLEWARE_SETTINGS', {})
+        return security_settings.get('RULE_SNAPSHOT_MAX_AGE', self.max_age)
+
+    def load(self) -> CompiledBlacklist:
+        compiled = []
+        for rule in BlacklistRule.objects.filter(is_active=True):
+            compiled_rule = CompiledBlacklistRule.compile(rule, len(compiled))
+            if compiled_rule is not None:
+                compiled.append(compiled_rule)
+
+        # Addresses blacklisted from the IPAddress admin match after every rule
+        blacklisted_ips = IPAddress.objects.filter(is_blacklisted=True).values_list('ip_address', flat=True)
+        for ip in blacklisted_ips.iterator():
+            compiled_rule = CompiledBlacklistRule.compile(
+                BlacklistRule(rule_type='ip', pattern=ip, reason='IP address blacklisted'),
+                len(compiled),
+            )
+            if compiled_rule is not None:
+                compiled.append(compiled_rule)
+
+        logger.debug(f"Blacklist snapshot rebuilt: {len(compiled)} rules")
+        return CompiledBlacklist(compiled)
+
+    def get_rules(self) -> List[CompiledBlacklistRule]:
+        """Return the compiled rules, rebuilding them if the generation moved"""
+        return self.get().rules
+
+    def find_match(self, request_info: Dict[str, Any]) -> Optional[CompiledBlacklistRule]:
+        """Return the first rule matching the request, in the same order as the database query"""
+        return self.get().find_match(request_info)
+
+
+# One snapshot per worker process
+blacklist_snapshot = BlacklistSnapshot()
@@ -0,0 +1,145 @@
+"""
+Response Compression
+Negotiated gzip/brotli compression of dynamic responses, and the
+precompressed variants the response cache stores with each entry
+"""
+
+import gzip
+import re
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+# Text formats worth compressing. HTML is left out on purpose: admin pages
+# reflect request input next to the CSRF token, which compression would
+# expose to BREACH
+COMPRESSIBLE_CONTENT_TYPES = (
+    'application/json',
+    'application/xml',
+    'text/xml',
+    'text/plain',
+    'text/css',
+    'text/javascript',
+    'application/javascript',
+)
+
+ACCEPT_ENCODING_RE = re.compile(r'\s*([^\s;,]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?\s*(?:,|$)')
+
+
+def get_compression_settings() -> Dict[str, Any]:
+    compression_settings = getattr(settings, 'RESPONSE_COMPRESSION', {})
+    return {
+        'enabled': compression_settings.get('ENABLED', True),
+        'min_size': compression_settings.get('MIN_SIZE', 1024),
+        'gzip_level': compression_settings.get('GZIP_LEVEL', 6),
+        'brotli_quality': compression_settings.get('BROTLI_QUALITY', 5),
+    }
+
+
+def available_encodings():
+    """Content codings this process can produce, preferred first"""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate_encoding(request, encodings=None) -> Optional[str]:
+    """The first of encodings the client's Accept-Encoding allows, or None"""
+    header = request.META.get('HTTP_ACCEPT_ENCODING', '')
+    if not header:
+        return None
+
+    accepted = {}
+    for coding, quality in ACCEPT_ENCODING_RE.findall(header.lower()):
+        try:
+            accepted[coding] = float(quality) if quality else 1.0
+        except ValueError:
+            accepted[coding] = 0.0
+
+    for encoding in encodings if encodings is not None else available_encodings():
+        quality = accepted.get(encoding, accepted.get('*', 0.0))
+        if quality > 0:
+            return encoding
+    return None
+
+
+def compress(content: bytes, encoding: str, options: Dict[str, Any]) -> bytes:
+    """content encoded with encoding"""
+    if encoding == 'br':
+        return brotli.compress(content, quality=options['brotli_quality'])
+    # mtime=0 keeps the output stable for identical content
+    return gzip.compress(content, compresslevel=options['gzip_level'], mtime=0)
+
+
+def is_compressible_type(content_type: str) -> bool:
+    media_type = content_type.split(';')[0].strip().lower()
+    return media_type in COMPRESSIBLE_CONTENT_TYPES or media_type.endswith(('+json', '+xml'))
+
+
+def is_compressible(response, options: Dict[str, Any]) -> bool:
+    if response.streaming or response.has_header('Content-Encoding'):
+        return False
+    return len(response.content) >= options['min_size'] and is_compressible_type(response.get('Content-Type', ''))
+
+
+def precompress(content: bytes, content_type: str, options: Optional[Dict[str, Any]] = None) -> Dict[str, bytes]:
+    """
+    Every available encoding of content that is worth keeping, for a cache
+    entry. This runs on every cache miss, which a client can cause at will,
+    so it uses the same levels as live responses.
+    """
+    options = options or get_compression_settings()
+    if not options['enabled'] or len(content) < options['min_size'] or not is_compressible_type(content_type):
+        return {}
+
+    variants = {}
+    for encoding in available_encodings():
+        compressed = compress(content, encoding, options)
+        if len(compressed) < len(content):
+            variants[encoding] = compressed
+    return variants
+
+
+def apply_encoding(response, encoding: str, content: bytes):
+    """Swap in an encoded body and mark the response accordingly"""
+    response.content = content
+    response['Content-Length'] = str(len(content))
+    response['Content-Encoding'] = encoding
+    # The bytes differ from the identity representation, so a strong ETag
+    # becomes weak (RFC 9110 8.8.1); If-None-Match still matches it
+    etag = response.get('ETag')
+    if etag and etag.startswith('"'):
+        response['ETag'] = 'W/' + etag
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Compress text responses above RESPONSE_COMPRESSION['MIN_SIZE'] with the
+    best coding the client accepts (brotli when the module is installed,
+    otherwise gzip).
+
+    Responses that already carry a Content-Encoding, such as response cache
+    hits served from their precompressed variants, are passed through
+    untouched.
+    """
+
+    def process_response(self, request, response):
+        options = get_compression_settings()
+        if not options['enabled'] or not is_compressible(response, options):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        encoding = negotiate_encoding(request)
+        if encoding is None:
+            return response
+
+        compressed = compress(response.content, encoding, options)
+        if len(compressed) < len(response.content):
+            apply_encoding(response, encoding, compressed)
+        return response
@@ -0,0 +1,143 @@
+"""
+Request Counters
+In-memory deltas for IPAddress and UserAgent statistics, flushed to the
+database as one atomic increment per row
+"""
+
+import atexit
+import logging
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import IPAddress, UserAgent
+
+logger = logging.getLogger(__name__)
+
+IP_COUNTER_FIELDS = ('total_requests', 'suspicious_requests', 'blocked_requests')
+
+
+class CounterAccumulator:
+    """
+    Collects request counter deltas per IP and per user agent hash.
+
+    Instead of a read-modify-write save() per request, which loses increments
+    when two workers touch the same row, deltas are summed in memory and
+    written as UPDATE ... SET total_requests = total_requests + %s, once per
+    key. Callers add deltas and then call maybe_flush(), which writes them once
+    SECURITY_COUNTER_FLUSH_EVENTS events are pending or
+    SECURITY_COUNTER_FLUSH_INTERVAL seconds have passed since the last flush.
+    Reputation is only saved for IPs whose recomputed score actually changed.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._ip_deltas: Dict[str, List[int]] = defaultdict(lambda: [0, 0, 0])
+        self._ua_deltas: Dict[str, int] = defaultdict(int)
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    @property
+    def options(self) -> Dict[str, float]:
+        security_settings = getattr(settings, 'SECURITY_MIDDLEWARE_SETTINGS', {})
+        return {
+            'flush_events': security_settings.get('SECURITY_COUNTER_FLUSH_EVENTS', 500),
+            'flush_interval': security_settings.get('SECURITY_COUNTER_FLUSH_INTERVAL', 5.0),
+        }
+
+    def add_ip(self, ip: str, total: int = 1, suspicious: int = 0, blocked: int = 0):
+        """Record requests from a (normalized) IP address"""
+        with self._lock:
+            deltas = self._ip_deltas[ip]
+            deltas[0] += total
+            deltas[1] += suspicious
+            deltas[2] += blocked
+            # Per call: a blocked request's delta has no total
+            self._pending += 1
+
+    def add_user_agent(self, ua_hash: str, count: int = 1):
+        """Record requests from an existing UserAgent row"""
+        with self._lock:
+            self._ua_deltas[ua_hash] += count
+            self._pending += 1
+
+    def maybe_flush(self):
+        """Flush if enough events are pending or the interval has elapsed"""
+        if not self._pending:
+            return
+        options = self.options
+        if (self._pending >= options['flush_events']
+                or time.monotonic() - self._last_flush >= options['flush_interval']):
+            self.flush()
+
+    def flush(self):
+        """Write all pending deltas"""
+        # Concurrent callers skip rather than queue up behind a flush in progress
+        if not self._flush_lock.acquire(blocking=False):
+            return
+        try:
+            with self._lock:
+                ip_deltas, self._ip_deltas = self._ip_deltas, defaultdict(lambda: [0, 0, 0])
+                ua_deltas, self._ua_deltas = self._ua_deltas, defaultdict(int)
+                self._pending = 0
+                self._last_flush = time.monotonic()
+
+            if not ip_deltas and not ua_deltas:
+                return
+
+            try:
+                with transaction.atomic():
+                    self._write_ip_deltas(ip_deltas)
+                    self._write_user_agent_deltas(ua_deltas)
+            except Exception as e:
+                logger.error(f"Error flushing request counters for {len(ip_deltas)} IPs: {e}")
+        finally:
+            self._flush_lock.release()
+
+    def _write_ip_deltas(self, ip_deltas: Dict[str, List[int]]):
+        if not ip_deltas:
+            return
+        now = timezone.now()
+
+        # Rows may not exist yet for IPs that were blocked before being logged
+        IPAddress.objects.bulk_create(
+            [IPAddress(ip_address=ip, reputation_score=50) for ip in ip_deltas],
+            ignore_conflicts=True,
+        )
+
+        for ip, (total, suspicious, blocked) in ip_deltas.items():
+            IPAddress.objects.filter(ip_address=ip).update(
+                total_requests=F('total_requests') + total,
+                suspicious_requests=F('suspicious_requests') + suspicious,
+                blocked_requests=F('blocked_requests') + blocked,
+                last_seen=now,
+            )
+
+        for ip_obj in IPAddress.objects.filter(ip_address__in=list(ip_deltas)).only(
+            'pk', 'is_whitelisted', 'is_blacklisted', 'reputation_score', *IP_COUNTER_FIELDS
+        ):
+            score = ip_obj.calculate_reputation()
+            if score != ip_obj.reputation_score:
+                IPAddress.objects.filter(pk=ip_obj.pk).update(reputation_score=score)
+
+    def _write_user_agent_deltas(self, ua_deltas: Dict[str, int]):
+        if not ua_deltas:
+            return
+        now = timezone.now()
+        for ua_hash, count in ua_deltas.items():
+            UserAgent.objects.filter(user_agent_hash=ua_hash).update(
+                request_count=F('request_count') + count,
+                last_seen=now,
+            )
+
+
+# One accumulator per worker process
+request_counters = CounterAccumulator()
+atexit.register(request_counters.flush)
@@ -0,0 +1,80 @@
+"""
+Error Fingerprints
+Stable grouping keys for frontend errors, so repeat occurrences update one
+ErrorLog row instead of inserting another
+"""
+
+import hashlib
+import re
+from urllib.parse import urlsplit
+
+# Values that differ between occurrences of the same error, most specific first
+MESSAGE_PATTERNS = [
+    (re.compile(r'https?://\S+'), '<url>'),
+    (re.compile(r'\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b', re.I), '<uuid>'),
+    (re.compile(r'\b0x[0-9a-f]+\b|\b[0-9a-f]{12,}\b', re.I), '<hex>'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '<n>'),
+    (re.compile(r'\s+'), ' '),
+]
+
+# Chrome: "    at fn (https://host/static/js/main.1a2b3c4d.js:1:2345)"
+# Firefox/Safari: "fn@https://host/static/js/main.1a2b3c4d.js:1:2345"
+STACK_FRAME_RE = re.compile(r'^\s*(?:at\s+(?:(?P<chrome_fn>[^(]*?)\s+\()?(?P<chrome_src>[^()]+?)\)?|(?P<fn>[^@]*)@(?P<src>.+?))\s*$')
+LINE_COLUMN_RE = re.compile(r'(?::\d+)+$')
+# Content hashes bundlers put in file names change on every deploy
+BUNDLE_HASH_RE = re.compile(r'\.[0-9a-f]{6,}(?=\.(?:chunk\.)?m?js$)', re.I)
+# Path segments that identify a record by number, UUID or hex id
+ID_SEGMENT_RE = re.compile(r'^(?:\d+|[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}|[0-9a-f]{12,})$', re.I)
+
+STACK_FRAMES = 5
+MAX_MESSAGE_LENGTH = 500
+
+
+def normalize_message(message: str) -> str:
+    message = (message or '')[:MAX_MESSAGE_LENGTH * 2]
+    for pattern, replacement in MESSAGE_PATTERNS:
+        message = pattern.sub(replacement, message)
+    return message.strip()[:MAX_MESSAGE_LENGTH]
+
+
+def top_stack_frames(stack_trace: str, limit: int = STACK_FRAMES):
+    """Function and bundle file of the first frames, without line/column or build hash"""
+    frames = []
+    for line in (stack_trace or '').splitlines():
+        match = STACK_FRAME_RE.match(line)
+        if not match or not (match['chrome_src'] or match['src']):
+            continue
+        function = (match['chrome_fn'] or match['fn'] or '').strip()
+        source = LINE_COLUMN_RE.sub('', (match['chrome_src'] or match['src']).strip())
+        source = BUNDLE_HASH_RE.sub('', urlsplit(source).path or source)
+        frames.append(f"{function}@{source.rsplit('/', 1)[-1]}")
+        if len(frames) == limit:
+            break
+    return frames
+
+
+def url_path_template(url: str) -> str:
+    """
+    A page URL's path with its id and slug segments masked: /blog/<slug>.
+    The site's pages are a section (/blog, /services) and at most a record
+    below it, so everything past the first segment is masked. Deliberately
+    independent of the URLconf, so renaming a route does not regroup
+    errors, and it works for frontend URLs Django does not serve.
+    """
+    segments = [segment for segment in urlsplit(url or '').path.split('/') if segment]
+    for index, segment in enumerate(segments):
+        if ID_SEGMENT_RE.match(segment):
+            segments[index] = '<id>'
+        elif index:
+            segments[index] = '<slug>'
+    return '/' + '/'.join(segments)
+
+
+def error_fingerprint(error_type: str, message: str, stack_trace: str, url: str) -> str:
+    parts = [
+        error_type or '',
+        normalize_message(message),
+        *top_stack_frames(stack_trace),
+        url_path_template(url),
+    ]
+    return hashlib.sha256('\n'.join(parts).encode('utf-8')).hexdigest()
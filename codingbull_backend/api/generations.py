@@ -0,0 +1,83 @@
+"""
+Cache Generations
+Generation counters in the shared Django cache and per-worker snapshots that
+reload themselves when their generation moves
+"""
+
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional
+
+from django.core.cache import cache
+
+
+def get_generation(key: str) -> int:
+    """Return the current generation for key, seeding it if the cache lost it"""
+    generation = cache.get(key)
+    if generation is None:
+        # Seed with a timestamp so an evicted counter never repeats an old value
+        cache.add(key, int(time.time() * 1000), None)
+        generation = cache.get(key)
+    return generation
+
+
+def get_generations(keys) -> Dict[str, int]:
+    """Return the current generations for several keys with one cache round trip"""
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            generations[key] = get_generation(key)
+    return generations
+
+
+def bump_generation(key: str):
+    """Advance the generation so every worker drops data built from the old one"""
+    try:
+        cache.incr(key)
+    except ValueError:
+        get_generation(key)
+
+
+class GenerationSnapshot(ABC):
+    """
+    Per-worker copy of some database state, rebuilt when its generation changes.
+
+    Subclasses set generation_key and implement load(). Each lookup costs one
+    cache read; the database is only queried after a bump_generation() call or
+    once max_age seconds have passed, whichever comes first.
+    """
+
+    generation_key: str = ''
+    max_age: int = 300
+
+    def __init__(self):
+        self._data: Any = None
+        self._generation: Optional[int] = None
+        self._built_at = 0.0
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def load(self) -> Any:
+        """Build the snapshot data from the database"""
+
+    def get_max_age(self) -> int:
+        return self.max_age
+
+    def _is_stale(self, generation: int) -> bool:
+        return generation != self._generation or time.monotonic() - self._built_at > self.get_max_age()
+
+    def get(self) -> Any:
+        """Return the snapshot data, rebuilding it if it is stale"""
+        generation = get_generation(self.generation_key)
+        if self._is_stale(generation):
+            with self._lock:
+                if self._is_stale(generation):
+                    self._data = self.load()
+                    self._generation = generation
+                    self._built_at = time.monotonic()
+        return self._data
+
+    def invalidate(self):
+        """Force a rebuild on the next lookup in this process"""
+        self._generation = None
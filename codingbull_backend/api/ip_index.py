@@ -0,0 +1,63 @@
+"""
+IP Prefix Index
+Longest-prefix style lookups of an address against many IPv4/IPv6 networks
+"""
+
+import ipaddress
+from typing import Any, Dict, Iterator, List, Tuple, Union
+
+IPNetwork = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+IPAddressObject = Union[ipaddress.IPv4Address, ipaddress.IPv6Address]
+
+
+class IPPrefixIndex:
+    """
+    Maps IPv4 and IPv6 networks to values and finds every network containing
+    an address.
+
+    This is a prefix trie flattened into one hash table per prefix length: a
+    lookup masks the address to each prefix length that is actually in use and
+    does a dict probe, so the cost is bounded by the address length (32 or 128)
+    and in practice by the handful of distinct lengths in a rule set. Memory
+    stays at one dict entry per network, which lets a worker hold tens of
+    thousands of imported CIDRs without a node per bit.
+    """
+
+    __slots__ = ('_tables', '_lengths', '_size')
+
+    def __init__(self):
+        # version -> prefix length -> network address as int -> values
+        self._tables: Dict[int, Dict[int, Dict[int, List[Any]]]] = {4: {}, 6: {}}
+        # version -> prefix lengths in use, longest first
+        self._lengths: Dict[int, Tuple[Tuple[int, int], ...]] = {4: (), 6: ()}
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, network: IPNetwork, value: Any):
+        """Index value under network"""
+        tables = self._tables[network.version]
+        table = tables.setdefault(network.prefixlen, {})
+        table.setdefault(int(network.network_address), []).append(value)
+        self._size += 1
+
+        max_bits = network.max_prefixlen
+        self._lengths[network.version] = tuple(
+            (prefixlen, ((1 << prefixlen) - 1) << (max_bits - prefixlen))
+            for prefixlen in sorted(tables, reverse=True)
+        )
+
+    def lookup(self, address: IPAddressObject) -> Iterator[Any]:
+        """Yield the values of every network containing address, most specific first"""
+        tables = self._tables[address.version]
+        if not tables:
+            return
+        address_int = int(address)
+        for prefixlen, mask in self._lengths[address.version]:
+            values = tables[prefixlen].get(address_int & mask)
+            if values:
+                yield from values
+
+    def __contains__(self, address: IPAddressObject) -> bool:
+        return next(self.lookup(address), None) is not None
@@ -0,0 +1,146 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import RequestFactory, override_settings
+from django.urls import resolve
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from api.models import BlogPost, Category, Project, Service, Testimonial
+from api.renderers import FastJSONParser, FastJSONRenderer, orjson
+import io
+import time
+
+
+class Command(BaseCommand):
+    help = 'Benchmark FastJSONRenderer/FastJSONParser against the stock DRF classes on every /api/v1/ GET endpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=100,
+            help='Generated rows per content model (default: 100)',
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=200,
+            help='Renders per endpoint (default: 200)',
+        )
+
+    def handle(self, *args, **options):
+        if options['rows'] < 1 or options['iterations'] < 1:
+            raise CommandError('--rows and --iterations must be at least 1')
+        if orjson is None:
+            self.stdout.write(self.style.WARNING("⚠️  orjson is not installed, FastJSONRenderer uses stdlib json"))
+
+        self.stdout.write("⏱️  JSON renderer benchmark")
+        self.stdout.write("=" * 60)
+
+        # Generated content is rolled back; the response cache would hand back
+        # pre-rendered bytes instead of response.data
+        with transaction.atomic(), override_settings(API_RESPONSE_CACHE={'ENABLED': False}):
+            self.generate_content(options['rows'])
+            self.compare(options['iterations'])
+            transaction.set_rollback(True)
+
+    def generate_content(self, rows):
+        category = Category.objects.create(name='Benchmark engineering')
+        BlogPost.objects.bulk_create(
+            BlogPost(
+                title=f"Benchmark post {index}", slug=f"benchmark-post-{index}", author='Benchmark',
+                excerpt='Notes on shipping software — “quotes”, emoji 🚀 and accents: déjà vu.',
+                content='<p>Paragraph with <strong>markup</strong>.</p>' * 80,
+                category=category, image=f"blog_images/post-{index}.jpg", tags=['django', 'react', 'ops'],
+            )
+            for index in range(rows)
+        )
+        projects = Project.objects.bulk_create(
+            Project(
+                title=f"Benchmark project {index}", client_name='Client', category='Web',
+                description='Description ' * 20, challenge='Challenge ' * 40, solution='Solution ' * 40,
+                outcome='Outcome ' * 40, tech_used=['Django', 'React', 'PostgreSQL', 'Redis'],
+                stats={'users': 120000, 'uptime': 99.95, 'response_ms': 84.5, 'regions': ['eu', 'us']},
+                client_logo=f"project_logos/client-{index}.png", project_image=f"project_images/project-{index}.jpg",
+            )
+            for index in range(rows)
+        )
+        Testimonial.objects.bulk_create(
+            Testimonial(quote='Great work ' * 10, author=f"Author {index}", title='CTO', company='Client', project=project)
+            for index, project in enumerate(projects)
+        )
+        Service.objects.bulk_create(
+            Service(
+                name=f"Benchmark service {index}", slug=f"benchmark-service-{index}", summary='Summary ' * 10,
+                description='Description ' * 30, long_description='Long description ' * 120,
+                icon_emoji='⚙️', features=[f"Feature {n}" for n in range(8)],
+                detailed_features=[{'icon': '✅', 'title': f"Feature {n}", 'description': 'Detail ' * 25} for n in range(8)],
+                process_steps=[{'step': n, 'title': f"Step {n}", 'description': 'Step detail ' * 20} for n in range(6)],
+                technologies=['Python', 'Django', 'React', 'AWS'],
+                faqs=[{'question': f"Question {n}?", 'answer': 'Answer ' * 40} for n in range(10)],
+                related_services=[f"benchmark-service-{(index + 1) % rows}"],
+            )
+            for index in range(rows)
+        )
+
+    def endpoints(self):
+        post = BlogPost.objects.order_by('pk').first()
+        project = Project.objects.order_by('pk').first()
+        service = Service.objects.order_by('pk').first()
+        return [
+            '/api/v1/categories/',
+            '/api/v1/categories/with_post_count/',
+            '/api/v1/blogs/',
+            '/api/v1/blogs/featured/',
+            '/api/v1/blogs/by_category/?category=Benchmark%20engineering',
+            f"/api/v1/blogs/{post.slug}/",
+            '/api/v1/projects/',
+            f"/api/v1/projects/{project.pk}/",
+            '/api/v1/services/',
+            f"/api/v1/services/{service.slug}/",
+            '/api/v1/testimonials/',
+            '/api/v1/technologies/',
+        ]
+
+    def compare(self, iterations):
+        factory = RequestFactory()
+        stock_renderer, fast_renderer = JSONRenderer(), FastJSONRenderer()
+        stock_parser, fast_parser = JSONParser(), FastJSONParser()
+        totals = {'stock': 0.0, 'fast': 0.0, 'stock_parse': 0.0, 'fast_parse': 0.0}
+
+        self.stdout.write(f"\n{'Endpoint':<52} {'bytes':>8} {'stdlib µs':>10} {'fast µs':>9}")
+        for url in self.endpoints():
+            path = url.split('?')[0]
+            match = resolve(path)
+            response = match.func(factory.get(url, HTTP_HOST='api.codingbullz.com', secure=True), *match.args, **match.kwargs)
+            if response.status_code != 200:
+                raise CommandError(f"{url} returned {response.status_code}")
+            data = response.data
+
+            expected = stock_renderer.render(data)
+            if fast_renderer.render(data) != expected:
+                raise CommandError(f"FastJSONRenderer output differs for {url}")
+            if fast_parser.parse(io.BytesIO(expected)) != stock_parser.parse(io.BytesIO(expected)):
+                raise CommandError(f"FastJSONParser output differs for {url}")
+
+            stock = self._time(lambda: stock_renderer.render(data), iterations)
+            fast = self._time(lambda: fast_renderer.render(data), iterations)
+            totals['stock'] += stock
+            totals['fast'] += fast
+            totals['stock_parse'] += self._time(lambda: stock_parser.parse(io.BytesIO(expected)), iterations)
+            totals['fast_parse'] += self._time(lambda: fast_parser.parse(io.BytesIO(expected)), iterations)
+            self.stdout.write(f"{url[:52]:<52} {len(expected):>8} {stock * 1e6:>10.1f} {fast * 1e6:>9.1f}")
+
+        self.stdout.write("\n✅ Identical bytes from both renderers and identical data from both parsers")
+        self.stdout.write(self.style.SUCCESS(
+            f"  - Rendering, all endpoints: {totals['stock'] / totals['fast']:.1f}x faster"
+        ))
+        self.stdout.write(self.style.SUCCESS(
+            f"  - Parsing, all endpoints:   {totals['stock_parse'] / totals['fast_parse']:.1f}x faster"
+        ))
+
+    def _time(self, func, iterations):
+        """Average seconds per call"""
+        start = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        return (time.perf_counter() - start) / iterations
@@ -0,0 +1,114 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from api.models import BlogPost, Category
+from api.search import SearchBackend, get_search_backend
+import random
+import time
+
+
+# Common words make up most of every post; the rarer topic words are what
+# visitors actually search for
+FILLER_WORDS = (
+    'the a of and to in is for on with as that this it by are be from at or an we our can your will '
+    'team project build time work data users system code design support process business results'
+).split()
+TOPIC_WORDS = (
+    'django react python postgresql caching kubernetes docker security performance accessibility '
+    'analytics migration testing deployment architecture microservices typescript graphql redis '
+    'monitoring scalability authentication payments automation'
+).split()
+SEARCH_TERMS = ['django', 'react performance', 'kubernetes', 'security testing', 'redis caching', 'payments']
+
+
+class Command(BaseCommand):
+    help = 'Benchmark blog search: full-text index against the old LIKE scan on generated posts'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--posts',
+            type=int,
+            default=10000,
+            help='Generated blog posts (default: 10000)',
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=5,
+            help='Passes over the search terms (default: 5)',
+        )
+
+    def handle(self, *args, **options):
+        if options['posts'] < 1 or options['iterations'] < 1:
+            raise CommandError('--posts and --iterations must be at least 1')
+
+        backend = get_search_backend()
+        if backend.vendor is None:
+            raise CommandError('No full-text index on this database, run the migrations first')
+
+        self.stdout.write("⏱️  Blog search benchmark")
+        self.stdout.write("=" * 60)
+
+        # Everything is generated inside a transaction that is rolled back
+        with transaction.atomic():
+            self.generate_posts(options['posts'])
+            if backend.vendor == 'sqlite':
+                backend.rebuild()
+            self.compare(backend, options['iterations'], options['posts'])
+            transaction.set_rollback(True)
+
+    def generate_posts(self, count):
+        rng = random.Random(42)
+        categories = Category.objects.bulk_create(
+            Category(name=f"Benchmark {topic}") for topic in TOPIC_WORDS[:8]
+        )
+        start = time.perf_counter()
+        posts = []
+        for index in range(count):
+            topics = rng.sample(TOPIC_WORDS, 3)
+            words = [rng.choice(topics) if rng.random() < 0.02 else rng.choice(FILLER_WORDS) for _ in range(600)]
+            posts.append(BlogPost(
+                title=f"{topics[0].title()} notes {index}",
+                slug=f"benchmark-{index}",
+                excerpt=' '.join(words[:40]),
+                content=' '.join(words),
+                author='Benchmark',
+                category=rng.choice(categories),
+            ))
+        BlogPost.objects.bulk_create(posts, batch_size=1000)
+        self.stdout.write(f"📝 Generated {count} posts in {time.perf_counter() - start:.1f}s")
+
+    def compare(self, backend, iterations, count):
+        like = SearchBackend()
+        base = BlogPost.objects.select_related('category').defer('content')
+
+        def list_page(search_backend, term):
+            # What a search request does: COUNT for the paginator, then one page
+            queryset = search_backend.search(base, term)
+            if 'search_rank' in queryset.query.extra or 'search_rank' in queryset.query.annotations:
+                queryset = queryset.order_by('search_rank')
+            else:
+                queryset = queryset.order_by('-published_date')
+            return queryset.count(), list(queryset[:20])
+
+        self.stdout.write(f"\n🔎 Matches per term ({count} posts)")
+        for term in SEARCH_TERMS:
+            like_count, _ = list_page(like, term)
+            indexed_count, page = list_page(backend, term)
+            snippets = backend.snippets(page, term)
+            self.stdout.write(f"  - {term!r:22} LIKE {like_count:6}  full-text {indexed_count:6}  snippets {len(snippets)}")
+
+        total = iterations * len(SEARCH_TERMS)
+        like_time = self._time(lambda term: list_page(like, term), iterations) / total
+        indexed_time = self._time(lambda term: list_page(backend, term), iterations) / total
+
+        self.stdout.write(f"\n⚡ Search list page, COUNT + first 20 rows ({total} searches)")
+        self.stdout.write(f"  - LIKE scan:             {like_time * 1e3:8.2f} ms/search")
+        self.stdout.write(f"  - Full-text ({backend.vendor}): {indexed_time * 1e3:8.2f} ms/search")
+        self.stdout.write(self.style.SUCCESS(f"  - Speedup: {like_time / indexed_time:.1f}x"))
+
+    def _time(self, func, iterations):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            for term in SEARCH_TERMS:
+                func(term)
+        return time.perf_counter() - start
@@ -0,0 +1,335 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from django.utils import timezone
+from api.blacklist import CompiledBlacklist, CompiledBlacklistRule
+from api.models import BlacklistRule
+from api.security_middleware import SecurityAnalyzer, EnhancedSecurityMiddleware
+import ipaddress
+import random
+import re
+import time
+import tracemalloc
+
+
+# Representative mix of production traffic: mostly legitimate browser and
+# API requests, plus crawlers, scripts and the usual vulnerability probes
+SAMPLE_REQUESTS = [
+    {'path': '/api/v1/blogs/', 'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36', 'method': 'GET', 'content_type': '', 'query_string': 'page=2', 'referer': 'https://codingbullz.com/blog/', 'host': 'api.codingbullz.com'},
+    {'path': '/api/v1/services/web-development/', 'user_agent': 'Mozilla/5.0 (iPhone; CPU iPhone OS 17_5 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.5 Mobile/15E148 Safari/604.1', 'method': 'GET', 'content_type': '', 'query_string': '', 'referer': 'https://codingbullz.com/services', 'host': 'api.codingbullz.com'},
+    {'path': '/api/v1/projects/', 'user_agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 14_5) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.5 Safari/605.1.15', 'method': 'GET', 'content_type': '', 'query_string': '', 'referer': '', 'host': 'api.codingbullz.com'},
+    {'path': '/static/frontend/static/js/main.43fe5c11.js', 'user_agent': 'Mozilla/5.0 (X11; Linux x86_64; rv:126.0) Gecko/20100101 Firefox/126.0', 'method': 'GET', 'content_type': '', 'query_string': '', 'referer': 'https://codingbullz.com/', 'host': 'codingbullz.com'},
+    {'path': '/api/v1/contact/', 'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36 Edg/125.0.0.0', 'method': 'POST', 'content_type': 'application/json', 'query_string': '', 'referer': 'https://codingbullz.com/contact', 'host': 'api.codingbullz.com'},
+    {'path': '/sitemap.xml', 'user_agent': 'Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)', 'method': 'GET', 'content_type': '', 'query_string': '', 'referer': '', 'host': 'codingbullz.com'},
+    {'path': '/robots.txt', 'user_agent': 'Mozilla/5.0 (compatible; bingbot/2.0; +http://www.bing.com/bingbot.htm)', 'method': 'GET', 'content_type': '', 'query_string': '', 'referer': '', 'host': 'codingbullz.com'},
+    {'path': '/admin/api/securitylog/', 'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36', 'method': 'GET', 'content_type': '', 'query_string': 'risk_level__exact=high', 'referer': 'https://codingbullz.com/admin/', 'host': 'codingbullz.com'},
+    {'path': '/api/v1/blogs/', 'user_agent': 'python-requests/2.32.3', 'method': 'GET', 'content_type': '', 'query_string': 'search=django', 'referer': '', 'host': 'api.codingbullz.com'},
+    {'path': '/wp-login.php', 'user_agent': 'Mozilla/5.0 (Windows NT 6.1; rv:60.0) Gecko/20100101 Firefox/60.0', 'method': 'POST', 'content_type': 'application/x-www-form-urlencoded', 'query_string': '', 'referer': 'http://bit.ly/x', 'host': 'codingbullz.com'},
+    {'path': '/.env', 'user_agent': 'curl/8.5.0', 'method': 'GET', 'content_type': '', 'query_string': '', 'referer': '', 'host': ''},
+    {'path': '/api/v1/blogs/', 'user_agent': 'sqlmap/1.8#stable (https://sqlmap.org)', 'method': 'GET', 'content_type': '', 'query_string': "id=1 UNION SELECT username,password FROM auth_user--", 'referer': '', 'host': 'api.codingbullz.com'},
+    {'path': '/../../etc/passwd', 'user_agent': '', 'method': 'GET', 'content_type': '', 'query_string': '', 'referer': '', 'host': 'codingbullz.com'},
+    {'path': '/search', 'user_agent': 'Go-http-client/1.1', 'method': 'GET', 'content_type': '', 'query_string': 'q=<script>alert(1)</script>&cb=' + 'PHNjcmlwdD5ldmFsKCk8L3NjcmlwdD4=' * 4, 'referer': 'http://localhost/', 'host': 'codingbullz.com'},
+]
+
+
+class LegacySecurityAnalyzer(SecurityAnalyzer):
+    """Pattern checks as they were before PatternSet: one re.search() per pattern per request"""
+
+    @classmethod
+    def _analyze_path(cls, path):
+        indicators = []
+        score = 0
+        for pattern in cls.SUSPICIOUS_PATHS:
+            if re.search(pattern, path, re.IGNORECASE):
+                indicators.append(f"Suspicious path pattern: {pattern}")
+                score += 25
+        is_legitimate = any(re.match(pattern, path, re.IGNORECASE) for pattern in cls.LEGITIMATE_PATHS)
+        if not is_legitimate and path != '/':
+            indicators.append("Path not in legitimate paths")
+            score += 10
+        if '../' in path or '..\\' in path:
+            indicators.append("Path traversal attempt")
+            score += 30
+        if '%' in path and any(encoded in path.lower() for encoded in ['%2e', '%2f', '%5c']):
+            indicators.append("URL encoding evasion attempt")
+            score += 20
+        sql_patterns = [r'union.*select', r'drop.*table', r'insert.*into', r'delete.*from']
+        for pattern in sql_patterns:
+            if re.search(pattern, path, re.IGNORECASE):
+                indicators.append(f"SQL injection pattern in path: {pattern}")
+                score += 35
+        return len(indicators) > 0, score, indicators
+
+    @classmethod
+    def _analyze_user_agent(cls, user_agent):
+        indicators = []
+        score = 0
+        if not user_agent or user_agent.lower() in ['', 'unknown', '-']:
+            indicators.append("Empty or missing user agent")
+            score += 15
+            return True, score, indicators
+        for pattern in cls.SUSPICIOUS_USER_AGENTS:
+            if re.search(pattern, user_agent, re.IGNORECASE):
+                indicators.append(f"Suspicious user agent pattern: {pattern}")
+                score += 30
+        is_legitimate_bot = any(re.search(pattern, user_agent, re.IGNORECASE)
+                                for pattern in cls.LEGITIMATE_BOTS)
+        if len(user_agent) < 10 and not is_legitimate_bot:
+            indicators.append("Unusually short user agent")
+            score += 10
+        script_patterns = [r'python', r'perl', r'ruby', r'java', r'go-http', r'libwww']
+        for pattern in script_patterns:
+            if re.search(pattern, user_agent, re.IGNORECASE) and not is_legitimate_bot:
+                indicators.append(f"Script-like user agent: {pattern}")
+                score += 15
+        return len(indicators) > 0, score, indicators
+
+    @classmethod
+    def _analyze_query_string(cls, query_string):
+        if not query_string:
+            return False, 0, []
+        indicators = []
+        score = 0
+        sql_patterns = [
+            r'union.*select', r'drop.*table', r'insert.*into', r'delete.*from',
+            r'exec.*\(', r'script.*alert', r'javascript:', r'<script',
+            r'onload=', r'onerror=', r'onclick='
+        ]
+        for pattern in sql_patterns:
+            if re.search(pattern, query_string, re.IGNORECASE):
+                indicators.append(f"Injection pattern in query: {pattern}")
+                score += 25
+        if len(query_string) > 2000:
+            indicators.append("Excessively long query string")
+            score += 15
+        if 'base64' in query_string.lower() or len(query_string) > 100:
+            import base64
+            try:
+                parts = query_string.split('&')
+                for part in parts:
+                    if '=' in part:
+                        value = part.split('=', 1)[1]
+                        if len(value) > 20 and value.replace('+', '').replace('/', '').replace('=', '').isalnum():
+                            try:
+                                decoded = base64.b64decode(value).decode('utf-8', errors='ignore')
+                                if any(pattern in decoded.lower() for pattern in ['script', 'eval', 'exec']):
+                                    indicators.append("Suspicious base64 encoded content")
+                                    score += 20
+                                    break
+                            except Exception:
+                                pass
+            except Exception:
+                pass
+        return len(indicators) > 0, score, indicators
+
+    @classmethod
+    def _analyze_headers(cls, request_info):
+        indicators = []
+        score = 0
+        referer = request_info.get('referer', '')
+        if referer and referer != 'None':
+            suspicious_referer_patterns = [
+                r'\.tk$', r'\.ml$', r'\.ga$', r'\.cf$',
+                r'bit\.ly', r'tinyurl', r'goo\.gl',
+                r'localhost', r'127\.0\.0\.1',
+            ]
+            for pattern in suspicious_referer_patterns:
+                if re.search(pattern, referer, re.IGNORECASE):
+                    indicators.append(f"Suspicious referer pattern: {pattern}")
+                    score += 10
+        if not request_info.get('host'):
+            indicators.append("Missing Host header")
+            score += 15
+        return len(indicators) > 0, score, indicators
+
+
+def legacy_extract_request_info(middleware, request):
+    """request_info dict as built by the MiddlewareMixin version, once per hook"""
+    return {
+        'timestamp': timezone.now(),
+        'method': request.method,
+        'path': request.path,
+        'query_string': request.META.get('QUERY_STRING', ''),
+        'remote_addr': middleware._get_client_ip(request),
+        'user_agent': request.META.get('HTTP_USER_AGENT', ''),
+        'referer': request.META.get('HTTP_REFERER', ''),
+        'host': request.META.get('HTTP_HOST', ''),
+        'content_type': request.META.get('CONTENT_TYPE', ''),
+        'x_forwarded_for': request.META.get('HTTP_X_FORWARDED_FOR', ''),
+        'x_real_ip': request.META.get('HTTP_X_REAL_IP', ''),
+        'x_forwarded_proto': request.META.get('HTTP_X_FORWARDED_PROTO', ''),
+        'user': request.user if hasattr(request, 'user') and request.user.is_authenticated else None,
+        'session_key': request.session.session_key if hasattr(request, 'session') else None,
+    }
+
+
+def legacy_is_localhost_request(request_info):
+    """Localhost check as it was, re-reading settings on every call"""
+    security_settings = getattr(settings, 'SECURITY_MIDDLEWARE_SETTINGS', {})
+    if not security_settings.get('DISABLE_RATE_LIMITING_FOR_LOCALHOST', True):
+        return False
+    remote_addr = request_info['remote_addr']
+    localhost_ips = security_settings.get('LOCALHOST_IPS', ['127.0.0.1', '::1', 'localhost'])
+    if remote_addr in localhost_ips:
+        return True
+    local_ranges = security_settings.get('LOCAL_NETWORK_RANGES', ['192.168.', '10.', '172.'])
+    if any(remote_addr.startswith(prefix) for prefix in local_ranges):
+        return True
+    if security_settings.get('RESPECT_DEBUG_MODE', True) and getattr(settings, 'DEBUG', False):
+        return True
+    return False
+
+
+class Command(BaseCommand):
+    help = 'Micro-benchmark the per-request cost of the security analysis pipeline'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=2000,
+            help='Passes over the sample request set (default: 2000)',
+        )
+        parser.add_argument(
+            '--blacklist-size',
+            type=int,
+            default=20000,
+            help='Synthetic ip_range rules for the blacklist benchmark (default: 20000)',
+        )
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        if iterations < 1:
+            raise CommandError('--iterations must be at least 1')
+        if options['blacklist_size'] < 1:
+            raise CommandError('--blacklist-size must be at least 1')
+
+        self.stdout.write("⏱️  Security analysis micro-benchmark")
+        self.stdout.write("=" * 60)
+
+        self.benchmark_analyzer(iterations)
+        self.benchmark_request_context(iterations)
+        # The linear scan is slow enough that a few passes give a stable figure
+        self.benchmark_blacklist(max(iterations // 200, 1), options['blacklist_size'])
+
+    def benchmark_analyzer(self, iterations):
+        """Compare SecurityAnalyzer against the per-pattern re.search() implementation"""
+        # Results must be identical before timing means anything
+        for request_info in SAMPLE_REQUESTS:
+            expected = LegacySecurityAnalyzer.analyze_request(request_info)
+            actual = SecurityAnalyzer.analyze_request(request_info)
+            if expected != actual:
+                raise CommandError(
+                    f"Analyzer output differs for {request_info['path']}: {expected} != {actual}"
+                )
+        self.stdout.write(f"✅ Identical results for {len(SAMPLE_REQUESTS)} sample requests")
+
+        total = iterations * len(SAMPLE_REQUESTS)
+        legacy = self._time(LegacySecurityAnalyzer.analyze_request, iterations) / total
+        current = self._time(SecurityAnalyzer.analyze_request, iterations) / total
+
+        self.stdout.write(f"\n🔍 SecurityAnalyzer.analyze_request ({total} requests)")
+        self.stdout.write(f"  - Per-pattern re.search: {legacy * 1e6:8.2f} µs/request")
+        self.stdout.write(f"  - Precompiled PatternSet: {current * 1e6:7.2f} µs/request")
+        self.stdout.write(self.style.SUCCESS(f"  - Speedup: {legacy / current:.1f}x"))
+
+    def benchmark_request_context(self, iterations):
+        """Compare per-request extraction: two request_info dicts vs one RequestContext"""
+        factory = RequestFactory()
+        requests = [
+            factory.generic(
+                info['method'], info['path'] + (f"?{info['query_string']}" if info['query_string'] else ''),
+                content_type=info['content_type'] or None,
+                HTTP_USER_AGENT=info['user_agent'],
+                HTTP_REFERER=info['referer'],
+                HTTP_HOST=info['host'] or 'testserver',
+                REMOTE_ADDR='203.0.113.7',
+            )
+            for info in SAMPLE_REQUESTS
+        ]
+        middleware = EnhancedSecurityMiddleware(lambda request: None)
+
+        def legacy(request):
+            # process_request built one dict and checked localhost twice
+            # (blacklist and rate limit stages); process_response built another
+            request_info = legacy_extract_request_info(middleware, request)
+            legacy_is_localhost_request(request_info)
+            legacy_is_localhost_request(request_info)
+            return request_info, legacy_extract_request_info(middleware, request)
+
+        def current(request):
+            context = middleware._build_context(request)
+            context.update_identity(request)
+            return context
+
+        total = iterations * len(requests)
+        legacy_time = self._time(legacy, iterations, requests) / total
+        current_time = self._time(current, iterations, requests) / total
+        legacy_bytes = self._retained_bytes(legacy, requests)
+        current_bytes = self._retained_bytes(current, requests)
+
+        self.stdout.write(f"\n📦 Request context extraction ({total} requests)")
+        self.stdout.write(f"  - Two request_info dicts: {legacy_time * 1e6:7.2f} µs/request, {legacy_bytes:5.0f} bytes retained")
+        self.stdout.write(f"  - One RequestContext:     {current_time * 1e6:7.2f} µs/request, {current_bytes:5.0f} bytes retained")
+        self.stdout.write(self.style.SUCCESS(
+            f"  - Speedup: {legacy_time / current_time:.1f}x, {legacy_bytes / current_bytes:.1f}x less memory per request"
+        ))
+
+    def benchmark_blacklist(self, iterations, size):
+        """Compare a linear scan of ip/ip_range rules against the IP prefix index"""
+        rng = random.Random(42)
+        rules = []
+        for position in range(size):
+            if position % 10 == 0:
+                network = ipaddress.IPv6Network((rng.getrandbits(48) << 80, 48))
+            else:
+                prefixlen = rng.choice((16, 20, 24, 24, 24, 28, 32))
+                network = ipaddress.IPv4Network((rng.getrandbits(32), prefixlen), strict=False)
+            rule = BlacklistRule(pk=position + 1, rule_type='ip_range', pattern=str(network), reason='benchmark')
+            rules.append(CompiledBlacklistRule.compile(rule, position))
+        compiled = CompiledBlacklist(rules)
+
+        addresses = [str(ipaddress.IPv4Address(rng.getrandbits(32))) for _ in range(45)]
+        addresses += [str(ipaddress.IPv6Address(rng.getrandbits(128))) for _ in range(5)]
+        # Some addresses that are certainly inside a rule
+        addresses += [str(rule.matcher.network_address) for rule in rules[:: max(size // 10, 1)]]
+        requests = [{'remote_addr': address, 'path': '/', 'user_agent': '', 'referer': ''} for address in addresses]
+
+        def linear(request_info):
+            ip_obj = ipaddress.ip_address(request_info['remote_addr'])
+            for rule in rules:
+                if rule.matches(request_info['remote_addr'], ip_obj):
+                    return rule
+            return None
+
+        for request_info in requests:
+            if linear(request_info) is not compiled.find_match(request_info):
+                raise CommandError(f"Blacklist results differ for {request_info['remote_addr']}")
+        self.stdout.write(f"\n✅ Identical blacklist results for {len(requests)} addresses")
+
+        total = iterations * len(requests)
+        linear_time = self._time(linear, iterations, requests) / total
+        indexed_time = self._time(compiled.find_match, iterations, requests) / total
+
+        self.stdout.write(f"\n🛡️  Blacklist lookup against {size} CIDR rules ({total} requests)")
+        self.stdout.write(f"  - Linear scan:     {linear_time * 1e6:10.2f} µs/request")
+        self.stdout.write(f"  - IP prefix index: {indexed_time * 1e6:10.2f} µs/request")
+        self.stdout.write(self.style.SUCCESS(f"  - Speedup: {linear_time / indexed_time:.0f}x"))
+
+    def _retained_bytes(self, func, requests, rounds=200):
+        """Average bytes still allocated per call while the results are kept alive"""
+        tracemalloc.start()
+        try:
+            before = tracemalloc.get_traced_memory()[0]
+            kept = [func(request) for _ in range(rounds) for request in requests]
+            after = tracemalloc.get_traced_memory()[0]
+        finally:
+            tracemalloc.stop()
+        return (after - before) / len(kept)
+
+    def _time(self, func, iterations, samples=SAMPLE_REQUESTS):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            for sample in samples:
+                func(sample)
+        return time.perf_counter() - start
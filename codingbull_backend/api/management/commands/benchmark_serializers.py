@@ -0,0 +1,150 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from rest_framework import serializers
+from rest_framework.request import Request
+from api.media_urls import storage_urls
+from api.models import BlogPost, Category, Project, Service, Testimonial
+from api.serializers import (
+    BlogPostListSerializer, ProjectListSerializer, ServiceListSerializer, TestimonialSerializer,
+)
+import time
+
+
+def legacy_absolute_url(serializer, file):
+    """What every media field did before MediaURLResolver"""
+    if not file:
+        return None
+    request = serializer.context.get('request')
+    if request:
+        return request.build_absolute_uri(file.url)
+    return file.url
+
+
+# The current serializers with DRF's stock file fields and per-field build_absolute_uri()
+LEGACY_FIELD_MAPPING = serializers.ModelSerializer.serializer_field_mapping
+
+
+class LegacyBlogPostListSerializer(BlogPostListSerializer):
+    serializer_field_mapping = LEGACY_FIELD_MAPPING
+
+    def get_image_url(self, obj):
+        return legacy_absolute_url(self, obj.image)
+
+
+class LegacyProjectListSerializer(ProjectListSerializer):
+    serializer_field_mapping = LEGACY_FIELD_MAPPING
+
+    def get_image(self, obj):
+        return legacy_absolute_url(self, obj.project_image)
+
+    def get_logo(self, obj):
+        return legacy_absolute_url(self, obj.client_logo)
+
+
+class LegacyTestimonialSerializer(TestimonialSerializer):
+    serializer_field_mapping = LEGACY_FIELD_MAPPING
+
+    def get_image(self, obj):
+        if obj.image:
+            return legacy_absolute_url(self, obj.image)
+        elif obj.project and obj.project.client_logo:
+            return legacy_absolute_url(self, obj.project.client_logo)
+        return None
+
+
+class LegacyServiceListSerializer(ServiceListSerializer):
+    serializer_field_mapping = LEGACY_FIELD_MAPPING
+
+    def get_image(self, obj):
+        if obj.image_url:
+            return obj.image_url
+        return legacy_absolute_url(self, obj.icon)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark media URL building in the content serializers over unsaved objects'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--objects',
+            type=int,
+            default=1000,
+            help='Objects per serializer (default: 1000)',
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=5,
+            help='Serializations per serializer (default: 5)',
+        )
+
+    def handle(self, *args, **options):
+        count = options['objects']
+        iterations = options['iterations']
+        if count < 1 or iterations < 1:
+            raise CommandError('--objects and --iterations must be at least 1')
+
+        self.stdout.write("⏱️  Serializer media URL benchmark")
+        self.stdout.write("=" * 60)
+
+        category = Category(pk=1, name='Engineering')
+        projects = [
+            Project(
+                pk=index, title=f"Project {index}", client_name='Client', category='Web',
+                description='Description', challenge='Challenge', solution='Solution', outcome='Outcome',
+                tech_used=['Django', 'React'], stats={}, client_logo=f"project_logos/client-{index}.png",
+                project_image=f"project_images/project-{index}.jpg",
+            )
+            for index in range(count)
+        ]
+        cases = [
+            ('BlogPostListSerializer', LegacyBlogPostListSerializer, BlogPostListSerializer, [
+                BlogPost(
+                    pk=index, title=f"Post {index}", slug=f"post-{index}", excerpt='Excerpt', author='Author',
+                    category=category, image=f"blog_images/post-{index}.jpg", tags=['django'],
+                )
+                for index in range(count)
+            ]),
+            ('ProjectListSerializer', LegacyProjectListSerializer, ProjectListSerializer, projects),
+            ('TestimonialSerializer', LegacyTestimonialSerializer, TestimonialSerializer, [
+                Testimonial(
+                    pk=index, quote='Great work', author=f"Author {index}", title='CTO', company='Client',
+                    project=projects[index], image=f"testimonial_images/author-{index}.jpg" if index % 2 else None,
+                )
+                for index in range(count)
+            ]),
+            ('ServiceListSerializer', LegacyServiceListSerializer, ServiceListSerializer, [
+                Service(
+                    pk=index, name=f"Service {index}", slug=f"service-{index}", summary='Summary',
+                    description='Description', icon=f"service_icons/icon-{index}.png",
+                )
+                for index in range(count)
+            ]),
+        ]
+
+        factory = RequestFactory()
+        for name, legacy_class, current_class, objects in cases:
+            # A fresh request per run, as in production
+            def serialize(serializer_class):
+                request = Request(factory.get('/api/v1/', HTTP_HOST='api.codingbullz.com', secure=True))
+                return serializer_class(objects, many=True, context={'request': request}).data
+
+            if serialize(legacy_class) != serialize(current_class):
+                raise CommandError(f"{name} output differs from the build_absolute_uri() version")
+
+            legacy_time = self._time(lambda: serialize(legacy_class), iterations)
+            current_time = self._time(lambda: serialize(current_class), iterations)
+            self.stdout.write(f"\n🖼️  {name} ({count} objects, identical output)")
+            self.stdout.write(f"  - build_absolute_uri per field: {legacy_time * 1e3:8.2f} ms")
+            self.stdout.write(f"  - MediaURLResolver:             {current_time * 1e3:8.2f} ms")
+            self.stdout.write(self.style.SUCCESS(f"  - Speedup: {legacy_time / current_time:.2f}x"))
+
+        stats = storage_urls.stats()
+        self.stdout.write(f"\n📦 Storage URL cache: {stats['size']} entries, hit rate {stats['hit_rate']:.1%}")
+
+    def _time(self, func, iterations):
+        """Average seconds per call"""
+        start = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        return (time.perf_counter() - start) / iterations
@@ -0,0 +1,479 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from api.blacklist import bump_blacklist_generation
+from api.ip_index import IPPrefixIndex
+from api.models import BlacklistRule
+from datetime import timedelta
+from pathlib import Path
+import bisect
+import csv
+import ipaddress
+import json
+import re
+import time
+
+
+PATTERN_RULE_TYPES = ('user_agent', 'path', 'referer')
+IMPORTABLE_RULE_TYPES = ('ip', 'ip_range') + PATTERN_RULE_TYPES
+
+# Column / key names recognised in CSV headers and JSON objects
+VALUE_KEYS = ('value', 'indicator', 'pattern', 'ip', 'cidr', 'network', 'user_agent')
+TYPE_KEYS = ('type', 'rule_type')
+REASON_KEYS = ('reason', 'description', 'comment')
+# Keys of a JSON object feed that may hold the entry array
+ENTRY_KEYS = ('entries', 'data', 'indicators')
+
+REASON_MAX_LENGTH = BlacklistRule._meta.get_field('reason').max_length
+
+# An escape sequence, or a run of characters outside one
+ESCAPE_OR_TEXT_RE = re.compile(r'\\.|[^\\]+', re.DOTALL)
+
+
+def pattern_key(pattern):
+    """
+    Key under which equivalent regex patterns collapse to one rule.
+
+    Blacklist patterns are searched case-insensitively and unanchored, so an
+    inline (?i) and leading/trailing .* change nothing, and neither does the
+    case of anything but an escape sequence (\\D is not \\d).
+    """
+    key = pattern.strip()
+    if key.startswith('(?i)'):
+        key = key[4:]
+    while key.startswith('.*'):
+        key = key[2:]
+    while key.endswith('.*') and not key.endswith('\\.*'):
+        key = key[:-2]
+    return ESCAPE_OR_TEXT_RE.sub(
+        lambda match: match.group() if match.group().startswith('\\') else match.group().lower(), key
+    )
+
+
+class JSONArrayStream:
+    """
+    Reads the entries of a JSON feed a chunk at a time, so a plain JSON feed
+    needs no more memory than the JSON Lines form of it: only one entry is
+    decoded and held at a time.
+    """
+
+    def __init__(self, handle, chunk_size=1 << 16):
+        self.handle = handle
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        chunk = self.handle.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """The next non-whitespace character, '' at the end of the file"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in ' \t\r\n':
+                self.pos += 1
+            if self.pos < len(self.buffer) or not self._fill():
+                return self.buffer[self.pos:self.pos + 1]
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"expected {char!r} but found {found or 'end of file'!r}")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self.eof or not self._fill():
+                    raise
+                continue
+            # A number or literal at the end of the buffer may continue in the next chunk
+            if end == len(self.buffer) and not self.eof and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def array(self):
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            if self.peek() != ',':
+                self.expect(']')
+                return
+            self.pos += 1
+
+    def entries(self):
+        """Items of the root array, or of the first ENTRY_KEYS array in a root object"""
+        if self.peek() == '[':
+            yield from self.array()
+            return
+        self.expect('{')
+        while self.peek() not in ('}', ''):
+            key = self.value()
+            self.expect(':')
+            if key in ENTRY_KEYS and self.peek() == '[':
+                yield from self.array()
+                return
+            self.value()
+            if self.peek() == ',':
+                self.pos += 1
+
+
+class Command(BaseCommand):
+    help = 'Import IPs, CIDRs and user agent/path patterns from threat feed files into BlacklistRule'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'files',
+            nargs='+',
+            help='Feed files: plain text (one entry per line), CSV, JSON or JSON Lines',
+        )
+        parser.add_argument(
+            '--format',
+            choices=['auto', 'txt', 'csv', 'json', 'jsonl'],
+            default='auto',
+            help='Feed format (default: from the file extension)',
+        )
+        parser.add_argument(
+            '--source',
+            help='Feed name stored in the rule reason (default: first file name)',
+        )
+        parser.add_argument(
+            '--pattern-type',
+            choices=PATTERN_RULE_TYPES,
+            default='user_agent',
+            help='Rule type for entries that are not IPs or CIDRs (default: user_agent)',
+        )
+        parser.add_argument(
+            '--regex',
+            action='store_true',
+            help='Treat pattern entries as regular expressions instead of literal strings',
+        )
+        parser.add_argument(
+            '--expires-in-days',
+            type=int,
+            help='Expire imported rules after this many days',
+        )
+        parser.add_argument(
+            '--replace',
+            action='store_true',
+            help='Deactivate rules from the same source that are no longer in the feed',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Rows per bulk_create/bulk_update statement (default: 1000)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show what would be changed without making changes',
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        dry_run = options['dry_run']
+        chunk_size = options['chunk_size']
+        if chunk_size < 1:
+            raise CommandError('--chunk-size must be at least 1')
+
+        paths = [Path(name) for name in options['files']]
+        for path in paths:
+            if not path.is_file():
+                raise CommandError(f"Feed file not found: {path}")
+
+        source = options['source'] or paths[0].stem
+        default_reason = f"Threat feed: {source}"[:REASON_MAX_LENGTH]
+        expires_at = None
+        if options['expires_in_days'] is not None:
+            expires_at = timezone.now() + timedelta(days=options['expires_in_days'])
+
+        self.stdout.write(f"📥 Importing threat feed '{source}'...")
+        self.stdout.write("=" * 60)
+
+        # 1. Read and normalise every entry
+        self.read_count = 0
+        self.invalid_count = 0
+        # Network -> reason of its first entry, in feed order
+        networks = {4: {}, 6: {}}
+        patterns = {}
+
+        for path in paths:
+            feed_format = options['format']
+            if feed_format == 'auto':
+                feed_format = self._detect_format(path)
+            self.stdout.write(f"\n📄 Reading {path} ({feed_format})...")
+
+            for value, rule_type, reason in self._read_entries(path, feed_format):
+                self.read_count += 1
+                self._add_entry(
+                    value, rule_type, reason, options['pattern_type'], options['regex'],
+                    networks, patterns,
+                )
+
+        # 2. Collapse overlapping and adjacent networks; desired maps
+        # (rule_type, normalised pattern) -> (pattern, reason, network)
+        desired = {}
+        network_count = len(networks[4]) + len(networks[6])
+        for version_networks in networks.values():
+            for network, reason in self._collapse(version_networks):
+                key = self._network_key(network)
+                desired[key] = (key[1], self._reason(default_reason, reason), network)
+        for key, (pattern, reason) in patterns.items():
+            desired[key] = (pattern, self._reason(default_reason, reason), None)
+
+        self.stdout.write(f"\n🔍 Normalised {self.read_count} entries:")
+        self.stdout.write(f"  - {network_count} IPs/CIDRs collapsed to {len(desired) - len(patterns)} networks")
+        self.stdout.write(f"  - {len(patterns)} distinct patterns")
+        if self.invalid_count:
+            self.stdout.write(self.style.WARNING(f"  - {self.invalid_count} invalid entries skipped"))
+
+        # 3. Diff against existing rules
+        to_create, to_update, to_deactivate, covered, unchanged = self._diff(
+            desired, default_reason, expires_at, options['replace'],
+        )
+
+        self.stdout.write(f"\n📋 Changes:")
+        self.stdout.write(f"  - New rules: {len(to_create)}")
+        self.stdout.write(f"  - Reactivated/updated rules: {len(to_update)}")
+        self.stdout.write(f"  - Already present: {unchanged}")
+        self.stdout.write(f"  - Covered by a broader existing range: {covered}")
+        if options['replace']:
+            self.stdout.write(f"  - Rules no longer in feed (deactivated): {len(to_deactivate)}")
+
+        # 4. Apply in chunks
+        if dry_run:
+            self.stdout.write("\n" + "=" * 60)
+            self.stdout.write("🧪 DRY RUN - No changes made")
+            return
+
+        with transaction.atomic():
+            BlacklistRule.objects.bulk_create(to_create, batch_size=chunk_size)
+            if to_update:
+                BlacklistRule.objects.bulk_update(
+                    to_update, ['is_active', 'expires_at', 'updated_at'], batch_size=chunk_size
+                )
+            if to_deactivate:
+                BlacklistRule.objects.bulk_update(
+                    to_deactivate, ['is_active', 'updated_at'], batch_size=chunk_size
+                )
+
+        # Bulk operations skip model signals, so invalidate the snapshots here
+        if to_create or to_update or to_deactivate:
+            bump_blacklist_generation()
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write("\n" + "=" * 60)
+        self.stdout.write(self.style.SUCCESS(f"✅ Threat feed imported in {elapsed:.1f}s"))
+        self.stdout.write(f"  - Total active rules now: {BlacklistRule.objects.filter(is_active=True).count()}")
+
+    def _collapse(self, entries):
+        """
+        Collapse {network: reason} to the fewest covering networks. Each one
+        keeps the reason of the first entry it absorbed, in feed order, and
+        a count of the others, so merged entries still say where they came from.
+        """
+        collapsed = list(ipaddress.collapse_addresses(entries))
+        starts = [network.network_address for network in collapsed]
+        absorbed = [[None, 0] for _ in collapsed]  # first reason, entries
+        for network, reason in entries.items():
+            merged = absorbed[bisect.bisect_right(starts, network.network_address) - 1]
+            merged[1] += 1
+            if reason and merged[0] is None:
+                merged[0] = reason
+        for network, (reason, count) in zip(collapsed, absorbed):
+            if count > 1:
+                reason = f"{reason} (+{count - 1} more)" if reason else f"{count} entries merged"
+            yield network, reason
+
+    def _network_key(self, network):
+        if network.prefixlen == network.max_prefixlen:
+            return ('ip', str(network.network_address))
+        return ('ip_range', str(network))
+
+    def _reason(self, default_reason, entry_reason):
+        """Rule reason: the feed name, plus the entry's own reason if it has one"""
+        if not entry_reason:
+            return default_reason
+        return f"{default_reason} - {entry_reason}"[:REASON_MAX_LENGTH]
+
+    def _detect_format(self, path):
+        suffix = path.suffix.lower()
+        if suffix == '.csv':
+            return 'csv'
+        if suffix == '.json':
+            return 'json'
+        if suffix in ('.jsonl', '.ndjson'):
+            return 'jsonl'
+        return 'txt'
+
+    def _read_entries(self, path, feed_format):
+        """Yield (value, rule_type, reason) tuples; rule_type and reason may be None"""
+        with path.open(encoding='utf-8', errors='replace', newline='' if feed_format == 'csv' else None) as handle:
+            if feed_format == 'txt':
+                for line in handle:
+                    value = line.strip()
+                    if value and not value.startswith(('#', ';', '//')):
+                        yield value, None, None
+
+            elif feed_format == 'csv':
+                reader = csv.reader(handle)
+                header = None
+                for row in reader:
+                    if not row or row[0].lstrip().startswith('#'):
+                        continue
+                    if header is None:
+                        lowered = [column.strip().lower() for column in row]
+                        if any(key in lowered for key in VALUE_KEYS):
+                            header = lowered
+                            continue
+                        header = []
+                    if header:
+                        yield self._from_mapping(dict(zip(header, row)))
+                    else:
+                        yield row[0].strip(), None, None
+
+            elif feed_format == 'jsonl':
+                for line in handle:
+                    line = line.strip()
+                    if line:
+                        yield from self._from_json(json.loads(line))
+
+            else:
+                try:
+                    for item in JSONArrayStream(handle).entries():
+                        yield from self._from_json(item)
+                except ValueError as e:
+                    raise CommandError(f"Invalid JSON feed {path}: {e}")
+
+    def _from_json(self, item):
+        if isinstance(item, str):
+            yield item.strip(), None, None
+        elif isinstance(item, dict):
+            yield self._from_mapping({str(key).lower(): value for key, value in item.items()})
+        else:
+            self.invalid_count += 1
+
+    def _from_mapping(self, mapping):
+        value = next((mapping[key] for key in VALUE_KEYS if mapping.get(key)), '')
+        rule_type = next((mapping[key] for key in TYPE_KEYS if mapping.get(key)), None)
+        reason = next((mapping[key] for key in REASON_KEYS if mapping.get(key)), None)
+        return str(value).strip(), rule_type and str(rule_type).strip().lower(), reason
+
+    def _add_entry(self, value, rule_type, reason, pattern_type, regex, networks, patterns):
+        if not value:
+            self.invalid_count += 1
+            return
+        if rule_type is not None and rule_type not in IMPORTABLE_RULE_TYPES:
+            self.invalid_count += 1
+            return
+        if reason:
+            reason = str(reason).strip()
+
+        if rule_type in (None, 'ip', 'ip_range'):
+            try:
+                network = ipaddress.ip_network(value, strict=False)
+            except ValueError:
+                network = None
+            if network is not None:
+                version_networks = networks[network.version]
+                if not version_networks.get(network):
+                    version_networks[network] = reason or None
+                return
+            if rule_type is not None:
+                self.invalid_count += 1
+                return
+
+        pattern = value if regex else re.escape(value)
+        try:
+            re.compile(pattern)
+        except re.error:
+            self.invalid_count += 1
+            return
+
+        key = (rule_type or pattern_type, pattern_key(pattern))
+        if key not in patterns:
+            patterns[key] = (pattern, reason)
+        elif reason and not patterns[key][1]:
+            patterns[key] = (patterns[key][0], reason)
+
+    def _diff(self, desired, default_reason, expires_at, replace):
+        """Split the desired rules into creates, updates and deactivations"""
+        now = timezone.now()
+        existing = {}
+        active_networks = IPPrefixIndex()
+
+        # Plain tuples: model instances are only built for rows that change
+        rows = BlacklistRule.objects.filter(rule_type__in=IMPORTABLE_RULE_TYPES).values_list(
+            'pk', 'rule_type', 'pattern', 'reason', 'is_active', 'expires_at'
+        )
+        for row in rows.iterator(chunk_size=2000):
+            pk, rule_type, pattern, reason, is_active, rule_expires_at = row
+            if rule_type in ('ip', 'ip_range'):
+                try:
+                    network = ipaddress.ip_network(pattern.strip(), strict=False)
+                except ValueError:
+                    continue
+                key = self._network_key(network)
+                if is_active and not (rule_expires_at is not None and rule_expires_at < now):
+                    active_networks.add(network, network)
+            else:
+                key = (rule_type, pattern_key(pattern))
+            existing.setdefault(key, row)
+
+        to_create = []
+        to_update = []
+        covered = 0
+        unchanged = 0
+
+        for key, (pattern, reason, network) in desired.items():
+            rule_type = key[0]
+
+            row = existing.get(key)
+            if row is not None:
+                pk, _, _, _, is_active, rule_expires_at = row
+                is_current = is_active and not (rule_expires_at is not None and rule_expires_at < now)
+                if is_current and (expires_at is None or rule_expires_at == expires_at):
+                    unchanged += 1
+                    continue
+                # Reactivated rules take the feed's expiry, clearing a stale one
+                to_update.append(BlacklistRule(pk=pk, is_active=True, expires_at=expires_at, updated_at=now))
+                continue
+
+            if network is not None and any(
+                existing_network.prefixlen <= network.prefixlen
+                for existing_network in active_networks.lookup(network.network_address)
+            ):
+                covered += 1
+                continue
+
+            to_create.append(BlacklistRule(
+                rule_type=rule_type,
+                pattern=pattern,
+                reason=reason,
+                is_active=True,
+                expires_at=expires_at,
+            ))
+
+        to_deactivate = []
+        if replace:
+            for key, (pk, _, _, reason, is_active, _) in existing.items():
+                from_source = reason == default_reason or reason.startswith(f"{default_reason} - ")
+                if is_active and from_source and key not in desired:
+                    to_deactivate.append(BlacklistRule(pk=pk, is_active=False, updated_at=now))
+
+        return to_create, to_update, to_deactivate, covered, unchanged
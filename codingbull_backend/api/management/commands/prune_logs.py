@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.template.defaultfilters import filesizeformat
+from api.retention import RETAINED_MODELS, get_retention_settings, prune_logs, vacuum
+import time
+
+
+class Command(BaseCommand):
+    help = 'Delete log rows older than their LOG_RETENTION policy, in chunks or by dropping expired partitions'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--model',
+            action='append',
+            choices=list(RETAINED_MODELS),
+            help='Only prune this model (repeatable; default: every model with a policy)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Count what would be removed without deleting anything',
+        )
+        parser.add_argument(
+            '--vacuum',
+            action='store_true',
+            help='VACUUM afterwards (PostgreSQL: the pruned tables; SQLite: the whole file)',
+        )
+
+    def handle(self, *args, **options):
+        policies = get_retention_settings()['policies']
+        for name in options['model'] or []:
+            if policies.get(name) is None:
+                raise CommandError(f"{name} has no retention policy (kept forever)")
+
+        dry_run = options['dry_run']
+        self.stdout.write(f"🧹 {'Checking' if dry_run else 'Pruning'} log tables...")
+        start = time.perf_counter()
+        results = prune_logs(options['model'], dry_run=dry_run)
+
+        total_rows, total_bytes = 0, 0
+        for result in results:
+            size = 'size unknown' if result.bytes is None else f"~{filesizeformat(result.bytes)}"
+            line = f"  - {result.model}: {result.rows} rows older than {result.cutoff:%Y-%m-%d %H:%M}, {size}"
+            if result.partitions:
+                line += f" ({len(result.partitions)} partitions: {', '.join(result.partitions)})"
+            self.stdout.write(line)
+            total_rows += result.rows
+            total_bytes += result.bytes or 0
+
+        verb = 'Would remove' if dry_run else 'Removed'
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {verb} {total_rows} rows (~{filesizeformat(total_bytes)}) in {time.perf_counter() - start:.1f}s"
+        ))
+        for name, days in policies.items():
+            if days is None:
+                self.stdout.write(f"  - {name} is kept forever")
+
+        if options['vacuum'] and not dry_run:
+            vacuum([result.model for result in results])
+            self.stdout.write(self.style.SUCCESS("✅ Vacuumed"))
+        elif not dry_run and total_rows:
+            self.stdout.write("  - Deleted space is reused by new rows; run with --vacuum to shrink the files")
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from api.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the blog full-text search index (needed after bulk writes that bypass signals)'
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        if backend.vendor is None:
+            self.stdout.write(self.style.WARNING("⚠️  No full-text index on this database, search uses LIKE scans"))
+            return
+
+        count = backend.rebuild()
+        if backend.vendor == 'postgresql':
+            # The GIN expression index follows the rows by itself
+            self.stdout.write(self.style.SUCCESS(f"✅ Refreshed the category names of {count} blog posts"))
+            return
+        self.stdout.write(self.style.SUCCESS(f"✅ Re-indexed {count} blog posts"))
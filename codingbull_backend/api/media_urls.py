@@ -0,0 +1,64 @@
+"""
+Media URLs
+Absolute URLs for uploaded files, with the origin resolved once per request
+and storage URLs cached per file name
+"""
+
+from typing import Optional
+
+from django.conf import settings
+
+from .lru_cache import LRUCache
+
+# (storage, file name) -> storage URL, usually the relative '/media/...' path
+storage_urls = LRUCache(maxsize=getattr(settings, 'MEDIA_URL_CACHE_SIZE', 4096))
+
+
+class MediaURLResolver:
+    """
+    Turns a FieldFile into the absolute URL a serializer returns.
+
+    The origin comes from settings.MEDIA_BASE_URL (a CDN or media host) when
+    set, otherwise from the request, exactly as request.build_absolute_uri()
+    would produce it. It is computed once per request instead of once per
+    field. Without either, URLs stay relative as they did with no request.
+    """
+
+    __slots__ = ('origin',)
+
+    def __init__(self, request=None):
+        base_url = getattr(settings, 'MEDIA_BASE_URL', '')
+        if base_url:
+            self.origin = base_url.rstrip('/')
+        elif request is not None:
+            self.origin = request.build_absolute_uri('/')[:-1]
+        else:
+            self.origin = ''
+
+    def url(self, file) -> Optional[str]:
+        """Absolute URL of file, or None for an empty file field"""
+        if not file:
+            return None
+        key = (file.storage, file.name)
+        url = storage_urls.get(key)
+        if url is None:
+            url = file.storage.url(file.name)
+            storage_urls.set(key, url)
+        return self.absolute(url)
+
+    def absolute(self, url: str) -> str:
+        # Storages that already return absolute URLs (S3, a CDN) are left alone
+        if url.startswith('/') and not url.startswith('//'):
+            return self.origin + url
+        return url
+
+
+def get_media_url_resolver(request=None) -> MediaURLResolver:
+    """The resolver for request, built on first use and kept on the request"""
+    if request is None:
+        return MediaURLResolver()
+    resolver = getattr(request, '_media_url_resolver', None)
+    if resolver is None:
+        resolver = MediaURLResolver(request)
+        request._media_url_resolver = resolver
+    return resolver
@@ -0,0 +1,27 @@
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def populate_post_counts(apps, schema_editor):
+    Category = apps.get_model('api', 'Category')
+    BlogPost = apps.get_model('api', 'BlogPost')
+    post_counts = BlogPost.objects.filter(category=models.OuterRef('pk')).order_by().values('category').annotate(
+        total=models.Count('pk')
+    ).values('total')
+    Category.objects.update(post_count=Coalesce(models.Subquery(post_counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_usersession_errorlog_performancelog'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='post_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_post_counts, migrations.RunPython.noop),
+    ]
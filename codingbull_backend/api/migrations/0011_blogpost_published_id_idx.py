@@ -0,0 +1,17 @@
+# Generated by Django 5.2.1 on 2026-10-17 10:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_category_post_count'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='blogpost',
+            index=models.Index(fields=['-published_date', '-id'], name='blogpost_published_id_idx'),
+        ),
+    ]
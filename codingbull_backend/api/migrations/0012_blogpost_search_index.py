@@ -0,0 +1,69 @@
+import logging
+
+from django.db import migrations
+
+logger = logging.getLogger(__name__)
+
+# Frozen copies of api.search as of this migration; later changes to the
+# index need a migration of their own (see 0016)
+SEARCH_CONFIG = 'english'
+SEARCH_INDEX_NAME = 'blogpost_search_idx'
+FTS_TABLE = 'api_blogpost_fts'
+FTS_REBUILD_SQL = (
+    f"INSERT INTO {FTS_TABLE} (rowid, title, excerpt, content, category) "
+    f"SELECT post.id, post.title, COALESCE(post.excerpt, ''), post.content, COALESCE(category.name, '') "
+    f"FROM api_blogpost AS post LEFT JOIN api_category AS category ON category.id = post.category_id"
+)
+
+
+def search_vector():
+    from django.contrib.postgres.search import SearchVector
+    return (
+        SearchVector('title', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('excerpt', weight='B', config=SEARCH_CONFIG)
+        + SearchVector('content', weight='C', config=SEARCH_CONFIG)
+    )
+
+
+def create_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        from django.contrib.postgres.indexes import GinIndex
+        schema_editor.add_index(
+            apps.get_model('api', 'BlogPost'), GinIndex(search_vector(), name=SEARCH_INDEX_NAME)
+        )
+    elif vendor == 'sqlite':
+        try:
+            schema_editor.execute(
+                f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+                f"title, excerpt, content, category, tokenize='porter unicode61')"
+            )
+        except Exception as e:
+            # SQLite built without FTS5: search falls back to LIKE
+            logger.warning(f"FTS5 unavailable, blog search will use LIKE scans: {e}")
+            return
+        schema_editor.execute(FTS_REBUILD_SQL)
+
+
+def drop_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(f"DROP INDEX IF EXISTS {SEARCH_INDEX_NAME}")
+    elif vendor == 'sqlite':
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+    """
+    Full-text index for blog search: a GIN expression index on PostgreSQL,
+    an FTS5 table (filled from the existing posts) on SQLite. Not part of the
+    model state because neither can be expressed portably in Meta.indexes.
+    """
+
+    dependencies = [
+        ('api', '0011_blogpost_published_id_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.1 on 2026-10-17 11:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_errorlog_fingerprint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PerformanceRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day')], max_length=4)),
+                ('bucket_start', models.DateTimeField()),
+                ('metric_type', models.CharField(choices=[('page_load', 'Page Load'), ('api_call', 'API Call'), ('component_render', 'Component Render'), ('user_interaction', 'User Interaction')], max_length=20)),
+                ('path', models.CharField(max_length=255)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('total_duration', models.BigIntegerField(default=0)),
+                ('min_duration', models.PositiveIntegerField(blank=True, null=True)),
+                ('max_duration', models.PositiveIntegerField(blank=True, null=True)),
+                ('sketch', models.JSONField(default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-bucket_start'],
+                'indexes': [models.Index(fields=['period', 'metric_type', 'bucket_start'], name='perfrollup_period_metric_idx')],
+                'constraints': [models.UniqueConstraint(fields=('period', 'bucket_start', 'metric_type', 'path'), name='performancerollup_bucket_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.1 on 2026-10-17 11:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_performancerollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LogRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('security', 'Security Log'), ('error', 'Error Log')], max_length=10)),
+                ('period', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day')], max_length=4)),
+                ('bucket_start', models.DateTimeField()),
+                ('dimension', models.CharField(max_length=20)),
+                ('value', models.CharField(blank=True, default='', max_length=255)),
+                ('count', models.PositiveBigIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-bucket_start'],
+                'constraints': [models.UniqueConstraint(fields=('source', 'period', 'dimension', 'bucket_start', 'value'), name='logrollup_bucket_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,61 @@
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+SEARCH_CONFIG = 'english'
+SEARCH_INDEX_NAME = 'blogpost_search_idx'
+
+
+def search_vector(with_category):
+    """The GIN index expression before (0012) and after this migration"""
+    from django.contrib.postgres.search import SearchVector
+    vector = (
+        SearchVector('title', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('excerpt', weight='B', config=SEARCH_CONFIG)
+    )
+    if with_category:
+        vector += SearchVector('category_name', weight='B', config=SEARCH_CONFIG)
+    return vector + SearchVector('content', weight='C', config=SEARCH_CONFIG)
+
+
+def rebuild_search_index(apps, schema_editor, with_category):
+    if schema_editor.connection.vendor != 'postgresql':
+        # The SQLite FTS5 table indexes the category name already
+        return
+    from django.contrib.postgres.indexes import GinIndex
+    schema_editor.execute(f"DROP INDEX IF EXISTS {SEARCH_INDEX_NAME}")
+    schema_editor.add_index(
+        apps.get_model('api', 'BlogPost'), GinIndex(search_vector(with_category), name=SEARCH_INDEX_NAME)
+    )
+
+
+def populate_category_names(apps, schema_editor):
+    Category = apps.get_model('api', 'Category')
+    BlogPost = apps.get_model('api', 'BlogPost')
+    names = Category.objects.filter(pk=models.OuterRef('category_id')).values('name')[:1]
+    BlogPost.objects.update(category_name=Coalesce(models.Subquery(names), models.Value('')))
+    rebuild_search_index(apps, schema_editor, with_category=True)
+
+
+def restore_search_index(apps, schema_editor):
+    rebuild_search_index(apps, schema_editor, with_category=False)
+
+
+class Migration(migrations.Migration):
+    """
+    Denormalise the category name onto BlogPost so the PostgreSQL GIN
+    expression index can cover it, as the SQLite FTS5 table and the LIKE
+    fallback already do.
+    """
+
+    dependencies = [
+        ('api', '0015_logrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blogpost',
+            name='category_name',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100),
+        ),
+        migrations.RunPython(populate_category_names, restore_search_index),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.1 on 2026-10-17 11:33
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_blogpost_category_name'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='securitylog',
+            name='timestamp',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, editable=False),
+        ),
+    ]
@@ -1,16 +1,32 @@
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
 import ipaddress
 import re
 
+from .fingerprints import error_fingerprint
+
 class Category(models.Model):
     name = models.CharField(max_length=100, unique=True)
+    # Denormalised number of blog posts, kept current by api.signals
+    post_count = models.PositiveIntegerField(default=0, editable=False)
 
     def __str__(self):
         return self.name
 
+    @classmethod
+    def refresh_post_counts(cls, category_ids=None):
+        """Recount post_count from BlogPost in one UPDATE (all categories if no ids given)"""
+        post_counts = BlogPost.objects.filter(category=models.OuterRef('pk')).order_by().values('category').annotate(
+            total=models.Count('pk')
+        ).values('total')
+        categories = cls.objects.all()
+        if category_ids is not None:
+            categories = categories.filter(pk__in=[pk for pk in category_ids if pk is not None])
+        return categories.update(post_count=Coalesce(models.Subquery(post_counts), 0))
+
 class BlogPost(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(max_length=200, unique=True, blank=True)
@@ -19,12 +35,28 @@ class BlogPost(models.Model):
     author = models.CharField(max_length=100)
     published_date = models.DateTimeField(auto_now_add=True)
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, related_name='blog_posts')
+    # Denormalised category name, so the PostgreSQL full-text index (an
+    # expression over this table's columns) covers it; kept current by api.signals
+    category_name = models.CharField(max_length=100, blank=True, default='', editable=False)
     image = models.ImageField(upload_to='blog_images/', blank=True, null=True)
     tags = models.JSONField(default=list, blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            # Keyset pagination of the blog listing (see api.pagination)
+            models.Index(fields=['-published_date', '-id'], name='blogpost_published_id_idx'),
+        ]
+
     def __str__(self):
         return self.title
 
+    @classmethod
+    def refresh_category_names(cls, posts=None):
+        """Copy Category.name onto category_name in one UPDATE (all posts if none given)"""
+        names = Category.objects.filter(pk=models.OuterRef('category_id')).values('name')[:1]
+        posts = cls.objects.all() if posts is None else posts
+        return posts.update(category_name=Coalesce(models.Subquery(names), models.Value('')))
+
 class Project(models.Model):
     title = models.CharField(max_length=200)
     client_name = models.CharField(max_length=200)
@@ -156,8 +188,8 @@ class IPAddress(models.Model):
             return 0
         return (self.suspicious_requests / self.total_requests) * 100
     
-    def update_reputation(self):
-        """Update reputation score based on activity"""
+    def calculate_reputation(self):
+        """Reputation score implied by the current counters and overrides"""
         base_score = 50
         
         # Reduce score for high suspicious ratio
@@ -180,7 +212,11 @@ class IPAddress(models.Model):
         elif self.is_blacklisted:
             base_score = 0
         
-        self.reputation_score = max(0, min(100, base_score))
+        return max(0, min(100, base_score))
+    
+    def update_reputation(self):
+        """Update reputation score based on activity"""
+        self.reputation_score = self.calculate_reputation()
         self.save(update_fields=['reputation_score'])
 
 
@@ -258,7 +294,8 @@ class SecurityLog(models.Model):
     ]
     
     # Request identification
-    timestamp = models.DateTimeField(auto_now_add=True, db_index=True)
+    # Set by the log writer when the request is queued; timezone.now otherwise
+    timestamp = models.DateTimeField(default=timezone.now, editable=False, db_index=True)
     ip_address = models.ForeignKey(IPAddress, on_delete=models.CASCADE, related_name='security_logs')
     user_agent = models.ForeignKey(UserAgent, on_delete=models.CASCADE, related_name='security_logs')
     
@@ -602,6 +639,9 @@ class ErrorLog(models.Model):
     extra_data = models.JSONField(default=dict, blank=True)
     
     # Tracking
+    # Groups occurrences of the same error (see api.fingerprints); repeats
+    # increment count on the open row instead of adding rows
+    fingerprint = models.CharField(max_length=64, blank=True, default='', db_index=True, editable=False)
     count = models.PositiveIntegerField(default=1)  # How many times this error occurred
     first_seen = models.DateTimeField(auto_now_add=True)
     last_seen = models.DateTimeField(auto_now=True)
@@ -618,10 +658,25 @@ class ErrorLog(models.Model):
             models.Index(fields=['url', 'timestamp']),
             models.Index(fields=['is_resolved', 'severity']),
         ]
+        constraints = [
+            # At most one open row per error; a resolved error that recurs gets a new one
+            models.UniqueConstraint(
+                fields=['fingerprint'], condition=models.Q(is_resolved=False),
+                name='errorlog_open_fingerprint_uniq',
+            ),
+        ]
     
     def __str__(self):
         return f"{self.error_type}: {self.message[:50]}..."
 
+    def compute_fingerprint(self):
+        return error_fingerprint(self.error_type, self.message, self.stack_trace, self.url)
+
+    def save(self, *args, **kwargs):
+        if not self.fingerprint:
+            self.fingerprint = self.compute_fingerprint()
+        super().save(*args, **kwargs)
+
 
 class PerformanceLog(models.Model):
     """Performance monitoring model"""
@@ -656,6 +711,75 @@ class PerformanceLog(models.Model):
         ]
 
 
+class PerformanceRollup(models.Model):
+    """Latency sketch of one metric type and page route over an hour or a day"""
+    
+    PERIODS = [
+        ('hour', 'Hour'),
+        ('day', 'Day'),
+    ]
+    
+    period = models.CharField(max_length=4, choices=PERIODS)
+    bucket_start = models.DateTimeField()
+    metric_type = models.CharField(max_length=20, choices=PerformanceLog.METRIC_TYPES)
+    path = models.CharField(max_length=255)  # Path with ids masked, see api.fingerprints.url_path_template
+    
+    # Exact aggregates, milliseconds
+    count = models.PositiveIntegerField(default=0)
+    total_duration = models.BigIntegerField(default=0)
+    min_duration = models.PositiveIntegerField(null=True, blank=True)
+    max_duration = models.PositiveIntegerField(null=True, blank=True)
+    
+    # api.sketches.LatencySketch.to_dict(), for percentiles
+    sketch = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['-bucket_start']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['period', 'bucket_start', 'metric_type', 'path'], name='performancerollup_bucket_uniq',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['period', 'metric_type', 'bucket_start'], name='perfrollup_period_metric_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.metric_type} {self.path} @ {self.bucket_start:%Y-%m-%d %H:%M} ({self.period})"
+
+
+class LogRollup(models.Model):
+    """
+    Number of SecurityLog requests or ErrorLog occurrences in an hour or a
+    day, broken down by one dimension (risk level, status, path, IP, error
+    type, URL...). dimension 'total' with an empty value counts everything.
+    """
+    
+    SOURCES = [
+        ('security', 'Security Log'),
+        ('error', 'Error Log'),
+    ]
+    
+    source = models.CharField(max_length=10, choices=SOURCES)
+    period = models.CharField(max_length=4, choices=PerformanceRollup.PERIODS)
+    bucket_start = models.DateTimeField()
+    dimension = models.CharField(max_length=20)
+    value = models.CharField(max_length=255, blank=True, default='')
+    count = models.PositiveBigIntegerField(default=0)
+    
+    class Meta:
+        ordering = ['-bucket_start']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['source', 'period', 'dimension', 'bucket_start', 'value'], name='logrollup_bucket_uniq',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.source} {self.dimension}={self.value} @ {self.bucket_start:%Y-%m-%d %H:%M} ({self.period}): {self.count}"
+
+
 class UserSession(models.Model):
     """Track user sessions for impact analysis"""
     
@@ -0,0 +1,40 @@
+"""
+Pattern Matcher
+Precompiled regex sets for the security analyzer
+"""
+
+import re
+from typing import Iterable, List, Tuple
+
+
+class PatternSet:
+    """
+    An ordered list of regex patterns compiled once.
+
+    All patterns are also joined into a single alternation, so text that
+    matches none of them (the common case for legitimate traffic) is rejected
+    with one scan instead of one scan per pattern. Only when the combined
+    regex hits are the individual patterns checked, which keeps the results,
+    and their order, identical to looping over re.search() per pattern.
+    """
+
+    __slots__ = ('patterns', '_compiled', '_combined')
+
+    def __init__(self, patterns: Iterable[str], flags: int = re.IGNORECASE):
+        self.patterns: Tuple[str, ...] = tuple(patterns)
+        self._compiled = tuple(re.compile(pattern, flags) for pattern in self.patterns)
+        self._combined = re.compile('|'.join(f'(?:{pattern})' for pattern in self.patterns), flags)
+
+    def search_any(self, text: str) -> bool:
+        """Equivalent to any(re.search(p, text) for p in patterns)"""
+        return self._combined.search(text) is not None
+
+    def match_any(self, text: str) -> bool:
+        """Equivalent to any(re.match(p, text) for p in patterns)"""
+        return self._combined.match(text) is not None
+
+    def search_all(self, text: str) -> List[str]:
+        """Return every pattern found in text, in declaration order"""
+        if self._combined.search(text) is None:
+            return []
+        return [pattern for pattern, regex in zip(self.patterns, self._compiled) if regex.search(text)]
@@ -0,0 +1,237 @@
+"""
+Rate Limit Backends
+Pluggable request counters for RateLimiter. The default backend keeps its
+counters in the Django cache (local-memory, file-based or Redis, depending on
+CACHES) and only touches the database when a block actually happens.
+"""
+
+import logging
+import re
+import time
+from abc import ABC, abstractmethod
+from datetime import timedelta
+from typing import List, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import RateLimitRule, RateLimitTracker
+from .generations import GenerationSnapshot, bump_generation
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_GENERATION_KEY = 'security:ratelimit:generation'
+
+DEFAULT_RATE_LIMIT_BACKEND = 'api.rate_limit.CacheRateLimitBackend'
+
+
+def bump_rate_limit_generation():
+    """Invalidate every worker's rate limit rule snapshot"""
+    bump_generation(RATE_LIMIT_GENERATION_KEY)
+
+
+class CompiledRateLimitRule:
+    """A RateLimitRule with its path pattern compiled once"""
+
+    __slots__ = (
+        'pk', 'name', 'path_pattern', 'path_regex', 'max_requests',
+        'time_window', 'block_duration', 'applies_to', 'priority',
+    )
+
+    def __init__(self, rule: RateLimitRule, path_regex):
+        self.pk = rule.pk
+        self.name = rule.name
+        self.path_pattern = rule.path_pattern
+        self.path_regex = path_regex
+        self.max_requests = rule.max_requests
+        self.time_window = rule.time_window
+        self.block_duration = rule.block_duration
+        self.applies_to = rule.applies_to
+        self.priority = rule.priority
+
+    def matches_path(self, path: str) -> bool:
+        """Check if this rule applies to the given path"""
+        return self.path_regex.match(path) is not None
+
+
+class RateLimitRuleSnapshot(GenerationSnapshot):
+    """Active rate limit rules for this worker, in priority order"""
+
+    generation_key = RATE_LIMIT_GENERATION_KEY
+
+    def get_max_age(self) -> int:
+        security_settings = getattr(settings, 'SECURITY_MIDDLEWARE_SETTINGS', {})
+        return security_settings.get('RULE_SNAPSHOT_MAX_AGE', self.max_age)
+
+    def load(self) -> List[CompiledRateLimitRule]:
+        compiled = []
+        for rule in RateLimitRule.objects.filter(is_active=True).order_by('priority'):
+            try:
+                compiled.append(CompiledRateLimitRule(rule, re.compile(rule.path_pattern)))
+            except re.error as e:
+                # RateLimitRule.matches_path treats an invalid pattern as never matching
+                logger.warning(f"Skipping invalid rate limit rule {rule.name} ({rule.path_pattern}): {e}")
+        return compiled
+
+
+class BaseRateLimitBackend(ABC):
+    """Interface for rate limit counter storage"""
+
+    @abstractmethod
+    def hit(self, identifier: str, rule: CompiledRateLimitRule) -> bool:
+        """
+        Count one request from identifier against rule.
+        Returns True if the identifier is blocked (already, or by this request).
+        """
+
+    def record_block(self, identifier: str, rule: CompiledRateLimitRule, request_count: int,
+                     window_start, blocked_until):
+        """Persist a block as a RateLimitTracker row so it shows up in the admin"""
+        try:
+            RateLimitTracker.objects.update_or_create(
+                identifier=identifier,
+                rule_id=rule.pk,
+                defaults={
+                    'request_count': request_count,
+                    'window_start': window_start,
+                    'is_blocked': True,
+                    'blocked_until': blocked_until,
+                }
+            )
+        except Exception as e:
+            logger.error(f"Error recording rate limit block for {identifier}: {e}")
+
+
+class CacheRateLimitBackend(BaseRateLimitBackend):
+    """
+    Window counters kept in the Django cache with atomic incr().
+
+    algorithm='fixed' counts requests per aligned time_window. The default
+    'sliding' algorithm also weights the previous window's count by how much of
+    it still overlaps the last time_window seconds, which smooths out the burst
+    a fixed window allows at its boundary.
+    """
+
+    def __init__(self, cache_alias: str = 'default', algorithm: str = 'sliding', key_prefix: str = 'ratelimit'):
+        if algorithm not in ('fixed', 'sliding'):
+            raise ValueError(f"Unknown rate limit algorithm: {algorithm}")
+        self.cache = caches[cache_alias]
+        self.algorithm = algorithm
+        self.key_prefix = key_prefix
+
+    def _counter_key(self, identifier: str, rule: CompiledRateLimitRule, window: int) -> str:
+        return f"{self.key_prefix}:{rule.pk}:{identifier}:{window}"
+
+    def _block_key(self, identifier: str, rule: CompiledRateLimitRule) -> str:
+        return f"{self.key_prefix}:block:{rule.pk}:{identifier}"
+
+    def _incr(self, key: str, timeout: int) -> int:
+        self.cache.add(key, 0, timeout)
+        try:
+            return self.cache.incr(key)
+        except ValueError:
+            # The counter expired between add() and incr()
+            self.cache.set(key, 1, timeout)
+            return 1
+
+    def hit(self, identifier: str, rule: CompiledRateLimitRule) -> bool:
+        now = time.time()
+        time_window = max(rule.time_window, 1)
+        window = int(now // time_window)
+
+        block_key = self._block_key(identifier, rule)
+        previous_key = self._counter_key(identifier, rule, window - 1)
+        if self.algorithm == 'sliding':
+            cached = self.cache.get_many([block_key, previous_key])
+        else:
+            cached = {block_key: self.cache.get(block_key)}
+
+        if cached.get(block_key):
+            return True
+
+        # Counters live for two windows so the sliding estimate can read the previous one
+        count = self._incr(self._counter_key(identifier, rule, window), time_window * 2)
+
+        if self.algorithm == 'sliding':
+            overlap = 1 - (now - window * time_window) / time_window
+            estimated = count + cached.get(previous_key, 0) * overlap
+        else:
+            estimated = count
+
+        if estimated <= rule.max_requests:
+            return False
+
+        blocked_until = timezone.now() + timedelta(seconds=rule.block_duration)
+        self.cache.set(block_key, True, rule.block_duration)
+        self.record_block(
+            identifier, rule, int(estimated),
+            timezone.now() - timedelta(seconds=now - window * time_window),
+            blocked_until,
+        )
+        return True
+
+
+class DatabaseRateLimitBackend(BaseRateLimitBackend):
+    """
+    Original RateLimitTracker row per identifier and rule.
+    Two writes per request; kept for setups without a shared cache.
+    """
+
+    def hit(self, identifier: str, rule: CompiledRateLimitRule) -> bool:
+        now = timezone.now()
+
+        # Get or create tracker
+        tracker, created = RateLimitTracker.objects.get_or_create(
+            identifier=identifier,
+            rule_id=rule.pk,
+            defaults={
+                'request_count': 0,
+                'window_start': now,
+                'is_blocked': False,
+            }
+        )
+
+        # Check if currently blocked
+        if tracker.is_currently_blocked:
+            return True
+
+        # Check if we need to reset the window
+        window_end = tracker.window_start + timedelta(seconds=rule.time_window)
+        if now > window_end:
+            tracker.request_count = 0
+            tracker.window_start = now
+            tracker.is_blocked = False
+            tracker.blocked_until = None
+
+        # Increment counter
+        tracker.request_count += 1
+        tracker.last_request = now
+
+        # Check if limit exceeded
+        if tracker.request_count > rule.max_requests:
+            tracker.is_blocked = True
+            tracker.blocked_until = now + timedelta(seconds=rule.block_duration)
+            tracker.save()
+            return True
+
+        tracker.save()
+        return False
+
+
+_backend: Optional[BaseRateLimitBackend] = None
+
+
+def get_rate_limit_backend() -> BaseRateLimitBackend:
+    """Return the configured rate limit backend, created once per worker"""
+    global _backend
+    if _backend is None:
+        security_settings = getattr(settings, 'SECURITY_MIDDLEWARE_SETTINGS', {})
+        backend_class = import_string(security_settings.get('RATE_LIMIT_BACKEND', DEFAULT_RATE_LIMIT_BACKEND))
+        _backend = backend_class(**security_settings.get('RATE_LIMIT_BACKEND_OPTIONS', {}))
+    return _backend
+
+
+# One rule snapshot per worker process
+rate_limit_rules = RateLimitRuleSnapshot()
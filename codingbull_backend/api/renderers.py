@@ -0,0 +1,109 @@
+"""
+Fast JSON
+orjson-backed DRF renderer and parser that fall back to the stock stdlib
+classes when orjson is not installed
+"""
+
+import math
+from decimal import Decimal
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+if orjson is not None:
+    # Datetimes and dataclasses go through DRF's encoder so they are formatted
+    # exactly as before; non-str dict keys are stringified like json.dumps does
+    ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+    ORJSON_DEFAULT = JSONEncoder().default
+
+# orjson leaves these raw, DRF escapes them so the output is also valid JavaScript
+LINE_SEPARATOR = '\u2028'.encode()
+PARAGRAPH_SEPARATOR = '\u2029'.encode()
+
+
+def has_non_finite_float(data) -> bool:
+    """Whether data holds a NaN or infinite float (or Decimal) anywhere"""
+    stack = [data]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, float):
+            if not math.isfinite(value):
+                return True
+        elif isinstance(value, Decimal):
+            if not value.is_finite():
+                return True
+        elif isinstance(value, dict):
+            stack.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            stack.extend(value)
+    return False
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer with orjson doing the encoding.
+
+    Output parses to the same values as JSONRenderer's with the repo's
+    settings (compact, UTF-8, strict) and matches it byte for byte except
+    for the notation of small floats: orjson writes 2.5e-05 as 0.000025 and
+    1e-07 as 1e-7. Indented output (an Accept header with indent=N) and any
+    non-default settings use the stdlib path, as does everything when
+    orjson is missing.
+
+    orjson writes NaN and Infinity as null where the strict stdlib encoder
+    raises. Both can only appear in output that contains null, so only that
+    output is scanned, and a non-finite value sends the data down the stdlib
+    path to fail as it always did.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or not (self.compact and self.strict and not self.ensure_ascii):
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=ORJSON_DEFAULT, option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            # Integers beyond 64 bits and other cases orjson refuses
+            return super().render(data, accepted_media_type, renderer_context)
+
+        if b'null' in ret and has_non_finite_float(data):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        if LINE_SEPARATOR in ret or PARAGRAPH_SEPARATOR in ret:
+            ret = ret.replace(LINE_SEPARATOR, b'\\u2028').replace(PARAGRAPH_SEPARATOR, b'\\u2029')
+        return ret
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser with orjson doing the decoding (UTF-8 bodies only)"""
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or not self.strict or encoding.lower().replace('_', '-') != 'utf-8':
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            # orjson rejects NaN and Infinity, as the strict stdlib parser does
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
+
+
+class PlainTextJSONParser(FastJSONParser):
+    """
+    JSON sent as text/plain, which is what navigator.sendBeacon() uses for a
+    string body (a JSON content type would need a CORS preflight it cannot do)
+    """
+    media_type = 'text/plain'
@@ -0,0 +1,67 @@
+"""
+Request Context
+Compact per-request state shared by every stage of the security middleware
+"""
+
+from typing import Any
+
+
+class RequestContext:
+    """
+    Everything the security middleware knows about one request.
+
+    Built once per request and passed through the blacklist, rate limit,
+    analysis and logging stages. __slots__ keeps it to a single small
+    allocation; item access (context['path'], context.get('host')) is kept so
+    code written against the old request_info dict works unchanged.
+    """
+
+    __slots__ = (
+        'method', 'path', 'query_string', 'remote_addr', 'user_agent', 'referer',
+        'host', 'content_type', 'x_forwarded_for', 'x_real_ip', 'x_forwarded_proto',
+        'user', 'session_key', 'is_local', 'start_time', 'route_class', 'blocked',
+        'is_suspicious', 'risk_score', 'threat_indicators',
+        'response_status', 'response_time',
+    )
+
+    def __init__(self, request, remote_addr: str, start_time: float, route_class=None):
+        meta = request.META
+        self.method = request.method
+        self.path = request.path
+        self.query_string = meta.get('QUERY_STRING', '')
+        self.remote_addr = remote_addr
+        self.user_agent = meta.get('HTTP_USER_AGENT', '')
+        self.referer = meta.get('HTTP_REFERER', '')
+        self.host = meta.get('HTTP_HOST', '')
+        self.content_type = meta.get('CONTENT_TYPE', '')
+        self.x_forwarded_for = meta.get('HTTP_X_FORWARDED_FOR', '')
+        self.x_real_ip = meta.get('HTTP_X_REAL_IP', '')
+        self.x_forwarded_proto = meta.get('HTTP_X_FORWARDED_PROTO', '')
+        self.user = None
+        self.session_key = None
+        self.is_local = False
+        self.start_time = start_time
+        self.route_class = route_class
+        self.blocked = False
+        self.is_suspicious = False
+        self.risk_score = 0
+        self.threat_indicators = ()
+        self.response_status = None
+        self.response_time = None
+        self.update_identity(request)
+
+    def update_identity(self, request):
+        """Pick up the user and session once the auth middleware has set them"""
+        user = getattr(request, 'user', None)
+        self.user = user if user is not None and user.is_authenticated else None
+        session = getattr(request, 'session', None)
+        self.session_key = session.session_key if session is not None else None
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key, default)
@@ -0,0 +1,187 @@
+"""
+Response Cache
+Rendered responses of the read-only content API, keyed by request and the
+content generation of every model the response depends on
+"""
+
+import hashlib
+import logging
+import time
+from typing import Any, Dict, Iterable, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from rest_framework.settings import api_settings
+
+from .compression import apply_encoding, negotiate_encoding, precompress
+from .generations import bump_generation, get_generations
+
+logger = logging.getLogger(__name__)
+
+CONTENT_GENERATION_KEY_PREFIX = 'content:generation:'
+
+# Attributes naming the query parameters of DRF filter backends and paginators
+QUERY_PARAM_ATTRIBUTES = (
+    'search_param', 'ordering_param', 'page_query_param', 'page_size_query_param', 'cursor_query_param',
+    'limit_query_param', 'offset_query_param', 'selector_query_param', 'fields_query_param',
+)
+
+
+def content_generation_key(model) -> str:
+    return f"{CONTENT_GENERATION_KEY_PREFIX}{model._meta.label_lower}"
+
+
+def bump_content_generation(model):
+    """Invalidate every cached response built from model's rows"""
+    bump_generation(content_generation_key(model))
+
+
+def get_response_cache_settings() -> Dict[str, Any]:
+    cache_settings = getattr(settings, 'API_RESPONSE_CACHE', {})
+    return {
+        'enabled': cache_settings.get('ENABLED', True),
+        'cache_alias': cache_settings.get('CACHE_ALIAS', 'default'),
+        'timeout': cache_settings.get('TIMEOUT', 60 * 60),
+        'key_prefix': cache_settings.get('KEY_PREFIX', 'apiresponse'),
+    }
+
+
+def payload_etag(content: bytes) -> str:
+    """Strong ETag for a rendered payload"""
+    return f'"{hashlib.sha256(content).hexdigest()[:32]}"'
+
+
+class CachedResponseMixin:
+    """
+    Serve GET/HEAD responses of a read-only viewset from the Django cache.
+
+    The key covers the host and scheme (serializers build absolute media
+    URLs), the path, the query parameters the view reads (see
+    get_cache_query_params, including a serializer's ?fields=) and the current generation of each model in
+    cache_models. Any other parameter is left out, so ?x=<random> cannot
+    force a miss. Saving or deleting any of those models bumps
+    its generation (see api.signals), so stale entries are simply never read
+    again and expire on their own. A hit costs two cache reads and no
+    database queries.
+
+    Every successful GET also carries a strong ETag (a hash of the payload,
+    stored with the cache entry) and a Last-Modified of the time it was
+    rendered, and If-None-Match/If-Modified-Since are answered with 304.
+
+    Entries also hold the gzip (and brotli, when installed) encodings of the
+    payload, compressed once when the entry is stored. Clients that accept
+    one get it as is, and CompressionMiddleware leaves the response alone.
+    """
+
+    # Models whose rows appear in this viewset's responses
+    cache_models: Iterable = ()
+    # Query parameters the view reads itself, besides those of its filter
+    # backends and pagination class
+    cache_query_params: Iterable[str] = ()
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return super().dispatch(request, *args, **kwargs)
+
+        options = get_response_cache_settings()
+        cache_key = self.get_response_cache_key(request, options)
+        response_cache = caches[options['cache_alias']] if cache_key is not None else None
+
+        cached = response_cache.get(cache_key) if response_cache is not None else None
+        if cached is not None:
+            response = self.build_cached_response(cached)
+        else:
+            response = super().dispatch(request, *args, **kwargs)
+            if response.status_code != 200 or response.has_header('Set-Cookie'):
+                return response
+            try:
+                cached = self.prepare_response(response)
+                if response_cache is not None:
+                    response_cache.set(cache_key, cached, options['timeout'])
+                    response['X-Response-Cache'] = 'MISS'
+            except Exception as e:
+                logger.error(f"Error caching response for {request.path}: {e}")
+                return response
+
+        self.encode_response(request, response, cached)
+        # Returns response itself unless the client's copy is still current
+        return get_conditional_response(
+            request, etag=cached['etag'], last_modified=cached['last_modified'], response=response
+        )
+
+    def get_response_cache_key(self, request, options: Dict[str, Any]) -> Optional[str]:
+        """Cache key for request, or None if it must not be cached"""
+        if request.method not in ('GET', 'HEAD') or not self.cache_models or not options['enabled']:
+            return None
+
+        generation_keys = [content_generation_key(model) for model in self.cache_models]
+        generations = get_generations(generation_keys)
+
+        used = self.get_cache_query_params()
+        query = '&'.join(sorted(
+            f"{key}={value}" for key, values in request.GET.lists() if key in used for value in values
+        ))
+        raw_key = '|'.join([
+            request.scheme,
+            request.get_host(),
+            request.path,
+            query,
+            *(str(generations[key]) for key in generation_keys),
+        ])
+        digest = hashlib.sha256(raw_key.encode('utf-8')).hexdigest()
+        return f"{options['key_prefix']}:{digest}"
+
+    def get_cache_query_params(self) -> set:
+        """Names of the query parameters that can change this view's response"""
+        params = set(self.cache_query_params)
+        if api_settings.URL_FORMAT_OVERRIDE:
+            params.add(api_settings.URL_FORMAT_OVERRIDE)
+        sources = list(self.filter_backends)
+        # The key is built before the action is known, so both serializers count
+        sources += [getattr(self, 'serializer_class', None), getattr(self, 'list_serializer_class', None)]
+        if self.pagination_class is not None:
+            # SelectablePagination delegates to one of two paginators
+            sources += [self.pagination_class, getattr(self.pagination_class, 'page_number_class', None),
+                        getattr(self.pagination_class, 'keyset_class', None)]
+        for source in sources:
+            for attribute in QUERY_PARAM_ATTRIBUTES:
+                name = getattr(source, attribute, None)
+                if name:
+                    params.add(name)
+        return params
+
+    def prepare_response(self, response) -> Dict[str, Any]:
+        """Render response, add its validators and return the cache entry for it"""
+        response.render()
+        cached = {
+            'content': response.content,
+            'content_type': response['Content-Type'],
+            'etag': payload_etag(response.content),
+            'last_modified': int(time.time()),
+        }
+        cached['encodings'] = precompress(cached['content'], cached['content_type'])
+        self.set_validators(response, cached)
+        return cached
+
+    def build_cached_response(self, cached: Dict[str, Any]) -> HttpResponse:
+        response = HttpResponse(cached['content'], content_type=cached['content_type'])
+        self.set_validators(response, cached)
+        response['X-Response-Cache'] = 'HIT'
+        return response
+
+    def set_validators(self, response, cached: Dict[str, Any]):
+        response['ETag'] = cached['etag']
+        response['Last-Modified'] = http_date(cached['last_modified'])
+
+    def encode_response(self, request, response, cached: Dict[str, Any]):
+        """Serve the precompressed variant of cached the client accepts, if any"""
+        encodings = cached.get('encodings') or {}
+        if not encodings:
+            return
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = negotiate_encoding(request, tuple(encodings))
+        if encoding is not None:
+            apply_encoding(response, encoding, encodings[encoding])
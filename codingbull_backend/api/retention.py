@@ -0,0 +1,268 @@
+"""
+Log Retention
+Age-based pruning of the high-volume log tables, in short chunked deletes,
+or by dropping whole time-range partitions where PostgreSQL has them
+"""
+
+import logging
+import re
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import (
+    ErrorLog, LogRollup, PerformanceLog, PerformanceRollup, RateLimitTracker, SecurityLog, UserSession,
+)
+
+logger = logging.getLogger(__name__)
+
+# Model, the column its age is measured by, and a filter (given the current
+# time) for rows that are kept regardless of age
+RETAINED_MODELS: Dict[str, Tuple[type, str, Optional[Callable[[datetime], Q]]]] = {
+    'SecurityLog': (SecurityLog, 'timestamp', None),
+    'ErrorLog': (ErrorLog, 'last_seen', None),
+    'PerformanceLog': (PerformanceLog, 'timestamp', None),
+    'UserSession': (UserSession, 'last_activity', None),
+    # A tracker still enforcing a block outlives its window
+    'RateLimitTracker': (RateLimitTracker, 'last_request', lambda now: Q(blocked_until__gt=now)),
+    'PerformanceRollup': (PerformanceRollup, 'bucket_start', None),
+    'LogRollup': (LogRollup, 'bucket_start', None),
+}
+
+DEFAULT_POLICIES = {
+    'SecurityLog': 30,
+    'ErrorLog': 90,
+    'PerformanceLog': 30,
+    'UserSession': 90,
+    'RateLimitTracker': 1,
+    'PerformanceRollup': None,
+    'LogRollup': None,
+}
+
+# FOR VALUES FROM ('2026-10-01 00:00:00+00') TO ('2026-11-01 00:00:00+00')
+PARTITION_UPPER_BOUND_RE = re.compile(r"\bTO \('([^']+)'\)")
+
+
+def get_retention_settings() -> Dict[str, Any]:
+    retention_settings = getattr(settings, 'LOG_RETENTION', {})
+    return {
+        'policies': {**DEFAULT_POLICIES, **retention_settings.get('POLICIES', {})},
+        'chunk_size': retention_settings.get('CHUNK_SIZE', 5000),
+        'chunk_pause': retention_settings.get('CHUNK_PAUSE', 0.1),
+        'partitions_ahead': retention_settings.get('PARTITIONS_AHEAD', 2),
+    }
+
+
+@dataclass
+class PruneResult:
+    model: str
+    cutoff: Optional[datetime]
+    rows: int = 0
+    # Estimated from the table's average row size, exact for dropped partitions;
+    # None when the database cannot report table sizes
+    bytes: Optional[int] = 0
+    partitions: List[str] = field(default_factory=list)
+
+
+def table_size(table: str) -> Optional[int]:
+    """On-disk bytes of a table with its indexes (and TOAST), None if unknown"""
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute('SELECT pg_total_relation_size(%s::regclass)', [table])
+            elif connection.vendor == 'sqlite':
+                # Needs SQLite built with SQLITE_ENABLE_DBSTAT_VTAB
+                cursor.execute('SELECT SUM(pgsize) FROM dbstat WHERE name = %s', [table])
+            else:
+                return None
+            size = cursor.fetchone()[0]
+    except DatabaseError:
+        return None
+    return int(size) if size is not None else None
+
+
+def average_row_size(model) -> Optional[float]:
+    table = model._meta.db_table
+    size = table_size(table)
+    if size is None:
+        return None
+    if connection.vendor == 'postgresql':
+        # The planner's estimate; a COUNT(*) would scan the whole table
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT reltuples FROM pg_class WHERE oid = %s::regclass', [table])
+            rows = cursor.fetchone()[0]
+    else:
+        rows = model.objects.count()
+    return size / rows if rows and rows > 0 else None
+
+
+def is_partitioned(model) -> bool:
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass', [model._meta.db_table]
+        )
+        return cursor.fetchone() is not None
+
+
+def partitions(model) -> List[Tuple[str, Optional[datetime]]]:
+    """(name, exclusive upper bound) of a partitioned table's children; None for DEFAULT/MAXVALUE"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT child.relname, pg_get_expr(child.relpartbound, child.oid) '
+            'FROM pg_inherits JOIN pg_class child ON child.oid = pg_inherits.inhrelid '
+            'WHERE pg_inherits.inhparent = %s::regclass ORDER BY child.relname',
+            [model._meta.db_table],
+        )
+        rows = cursor.fetchall()
+
+    result = []
+    for name, bound in rows:
+        match = PARTITION_UPPER_BOUND_RE.search(bound or '')
+        upper = None
+        if match:
+            try:
+                upper = datetime.fromisoformat(match[1])
+                if timezone.is_naive(upper):
+                    upper = upper.replace(tzinfo=dt_timezone.utc)
+            except ValueError:
+                upper = None
+        result.append((name, upper))
+    return result
+
+
+def ensure_partitions(model, months_ahead: int, now: Optional[datetime] = None) -> List[str]:
+    """
+    Create monthly partitions of a partitioned table up to months_ahead
+    months past the current one. Months an existing partition already
+    covers are skipped. Returns the partitions created.
+    """
+    qn = connection.ops.quote_name
+    table = model._meta.db_table
+    # Bounds are UTC, like the connection's time zone
+    month = (now or timezone.now()).astimezone(dt_timezone.utc).date().replace(day=1)
+    existing = {name for name, _ in partitions(model)}
+    created = []
+    for _ in range(months_ahead + 1):
+        next_month = (month + timedelta(days=32)).replace(day=1)
+        name = f"{table}_p{month:%Y%m}"
+        if name not in existing:
+            try:
+                with transaction.atomic(), connection.cursor() as cursor:
+                    cursor.execute(
+                        f"CREATE TABLE {qn(name)} PARTITION OF {qn(table)} "
+                        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{next_month.isoformat()}')"
+                    )
+                created.append(name)
+            except DatabaseError as e:
+                # Usually a differently named partition overlapping the month
+                logger.warning(f"Could not create partition {name}: {e}")
+        month = next_month
+    return created
+
+
+def drop_partitions(model, cutoff: datetime, dry_run: bool = False) -> PruneResult:
+    """Detach and drop the partitions whose whole range is older than cutoff"""
+    qn = connection.ops.quote_name
+    table = model._meta.db_table
+    result = PruneResult(model.__name__, cutoff)
+    for name, upper in partitions(model):
+        if upper is None or upper > cutoff:
+            continue
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) FROM {qn(name)}")
+            result.rows += cursor.fetchone()[0]
+            result.bytes += table_size(name) or 0
+            if not dry_run:
+                cursor.execute(f"ALTER TABLE {qn(table)} DETACH PARTITION {qn(name)}")
+                cursor.execute(f"DROP TABLE {qn(name)}")
+        result.partitions.append(name)
+    return result
+
+
+def delete_in_chunks(queryset, chunk_size: int, pause: float = 0.0) -> int:
+    """
+    Delete queryset chunk_size rows at a time, each chunk in its own short
+    transaction so locks are held briefly. Returns the rows deleted.
+    """
+    model = queryset.model
+    deleted = 0
+    while True:
+        pks = list(queryset.order_by().values_list('pk', flat=True)[:chunk_size])
+        if not pks:
+            break
+        with transaction.atomic():
+            _, per_model = model.objects.filter(pk__in=pks).delete()
+        deleted += per_model.get(model._meta.label, 0)
+        if len(pks) < chunk_size:
+            break
+        if pause:
+            time.sleep(pause)
+    return deleted
+
+
+def expired_queryset(name: str, cutoff: datetime, now: datetime):
+    model, date_field, keep = RETAINED_MODELS[name]
+    queryset = model.objects.filter(**{f"{date_field}__lt": cutoff})
+    if keep is not None:
+        queryset = queryset.exclude(keep(now))
+    return queryset
+
+
+def prune_model(name: str, days: int, options: Dict[str, Any], dry_run: bool = False,
+                now: Optional[datetime] = None) -> PruneResult:
+    """
+    Remove rows of RETAINED_MODELS[name] older than days. Partitioned
+    tables lose their expired partitions first; whatever straddles the
+    cutoff is deleted in chunks.
+    """
+    model = RETAINED_MODELS[name][0]
+    now = now or timezone.now()
+    cutoff = now - timedelta(days=days)
+    result = PruneResult(name, cutoff)
+
+    if is_partitioned(model):
+        dropped = drop_partitions(model, cutoff, dry_run=dry_run)
+        result.rows, result.bytes, result.partitions = dropped.rows, dropped.bytes, dropped.partitions
+        if not dry_run:
+            ensure_partitions(model, options['partitions_ahead'], now)
+
+    row_size = average_row_size(model)
+    queryset = expired_queryset(name, cutoff, now)
+    rows = queryset.count() if dry_run else delete_in_chunks(queryset, options['chunk_size'], options['chunk_pause'])
+    result.rows += rows
+    if row_size is not None:
+        result.bytes += round(rows * row_size)
+    elif rows and not result.partitions:
+        result.bytes = None
+    return result
+
+
+def prune_logs(names: Optional[List[str]] = None, dry_run: bool = False,
+               now: Optional[datetime] = None) -> List[PruneResult]:
+    """Apply the retention policy of every model in names (default: all with one)"""
+    options = get_retention_settings()
+    results = []
+    for name in names or RETAINED_MODELS:
+        days = options['policies'].get(name)
+        if days is None:
+            continue
+        results.append(prune_model(name, days, options, dry_run=dry_run, now=now))
+    return results
+
+
+def vacuum(names: List[str]):
+    """Return freed space to the OS (SQLite) or to the free space map (PostgreSQL)"""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            for name in names:
+                cursor.execute(f"VACUUM ANALYZE {connection.ops.quote_name(RETAINED_MODELS[name][0]._meta.db_table)}")
+        elif connection.vendor == 'sqlite':
+            cursor.execute('VACUUM')
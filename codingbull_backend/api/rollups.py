@@ -0,0 +1,437 @@
+"""
+Rollups
+Hourly and daily aggregates of the raw log tables, maintained as rows are
+ingested, so dashboards read a bounded number of rows for any time range
+"""
+
+import atexit
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+from .fingerprints import url_path_template
+from .models import ErrorLog, LogRollup, PerformanceLog, PerformanceRollup, SecurityLog
+from .sketches import LatencySketch
+
+logger = logging.getLogger(__name__)
+
+PERIOD_LENGTHS = {
+    'hour': timedelta(hours=1),
+    'day': timedelta(days=1),
+}
+
+PERCENTILES = (0.5, 0.9, 0.99)
+
+# Rows per INSERT ... ON CONFLICT statement
+LOG_ROLLUP_CHUNK_SIZE = 500
+
+
+def bucket_start(moment: datetime, period: str) -> datetime:
+    """Start of the UTC hour or day containing moment"""
+    moment = moment.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+    if period == 'day':
+        moment = moment.replace(hour=0)
+    return moment
+
+
+def range_buckets(start: datetime, end: datetime) -> List[Tuple[str, datetime, datetime]]:
+    """
+    Cover [start, end) with the fewest rollup buckets: whole days in the
+    middle, hours at the ragged edges. Returned as (period, first bucket
+    start, last bucket start) ranges; the edges round outwards to the hour.
+    """
+    first_hour = bucket_start(start, 'hour')
+    last_hour = bucket_start(end - timedelta(microseconds=1), 'hour')
+    first_day = bucket_start(first_hour + timedelta(days=1) - timedelta(hours=1), 'day')
+    end_day = bucket_start(last_hour + timedelta(hours=1), 'day')
+
+    if first_day >= end_day:
+        return [('hour', first_hour, last_hour)]
+    ranges = []
+    if first_hour < first_day:
+        ranges.append(('hour', first_hour, first_day - timedelta(hours=1)))
+    ranges.append(('day', first_day, end_day - timedelta(days=1)))
+    if last_hour >= end_day:
+        ranges.append(('hour', end_day, last_hour))
+    return ranges
+
+
+def _merge_rollup(period: str, start: datetime, metric_type: str, path: str, sketch: LatencySketch):
+    """Fold sketch into its rollup row, creating the row if needed"""
+    lookup = {'period': period, 'bucket_start': start, 'metric_type': metric_type, 'path': path}
+    row = PerformanceRollup.objects.select_for_update().filter(**lookup).first()
+    if row is None:
+        row = PerformanceRollup(**lookup)
+        _apply_sketch(row, sketch)
+        try:
+            with transaction.atomic():
+                row.save()
+            return
+        except IntegrityError:
+            # Another worker created it first
+            row = PerformanceRollup.objects.select_for_update().get(**lookup)
+    stored = LatencySketch.from_dict(row.sketch)
+    stored.merge(sketch)
+    _apply_sketch(row, stored)
+    row.save()
+
+
+def _apply_sketch(row: PerformanceRollup, sketch: LatencySketch):
+    row.sketch = sketch.to_dict()
+    row.count = sketch.count
+    row.total_duration = round(sketch.total)
+    row.min_duration = None if sketch.min is None else round(sketch.min)
+    row.max_duration = None if sketch.max is None else round(sketch.max)
+
+
+def _add_performance_logs(sketches: Dict[Tuple[str, datetime, str, str], LatencySketch],
+                          performance_logs: Iterable[PerformanceLog]):
+    for log in performance_logs:
+        moment = log.timestamp or timezone.now()
+        path = url_path_template(log.url)[:255]
+        for period in PERIOD_LENGTHS:
+            sketches[(period, bucket_start(moment, period), log.metric_type, path)].add(log.duration)
+
+
+def record_performance_logs(performance_logs: Iterable[PerformanceLog]):
+    """
+    Add saved PerformanceLog rows to their hourly and daily rollups: one
+    locked read-modify-write per (period, metric type, route) touched
+    """
+    sketches: Dict[Tuple[str, datetime, str, str], LatencySketch] = defaultdict(LatencySketch)
+    _add_performance_logs(sketches, performance_logs)
+    _merge_sketches(sketches)
+
+
+def _merge_sketches(sketches: Dict[Tuple[str, datetime, str, str], LatencySketch]):
+    with transaction.atomic():
+        # A fixed order, so concurrent writers lock rows in the same sequence
+        for (period, start, metric_type, path), sketch in sorted(sketches.items(), key=lambda item: item[0]):
+            _merge_rollup(period, start, metric_type, path, sketch)
+
+
+class PerformanceRollupBuffer:
+    """
+    Collects the sketches of single performance events for a batched merge.
+
+    Merging each event as it arrives would lock the same hourly and daily
+    rows on every request, serialising concurrent beacons. Events are
+    instead summed in memory and merged like one batch, once
+    TELEMETRY_ROLLUP_FLUSH_EVENTS events are pending or
+    TELEMETRY_ROLLUP_FLUSH_INTERVAL seconds have passed since the last
+    flush. Events lost with a worker are recovered from the raw rows by
+    rebuild_performance_rollups.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._sketches: Dict[Tuple[str, datetime, str, str], LatencySketch] = defaultdict(LatencySketch)
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    def add(self, performance_logs: List[PerformanceLog]):
+        """Record saved PerformanceLog rows"""
+        with self._lock:
+            _add_performance_logs(self._sketches, performance_logs)
+            self._pending += len(performance_logs)
+
+    def maybe_flush(self):
+        """Flush if enough events are pending or the interval has elapsed"""
+        if not self._pending:
+            return
+        if (self._pending >= getattr(settings, 'TELEMETRY_ROLLUP_FLUSH_EVENTS', 200)
+                or time.monotonic() - self._last_flush >= getattr(settings, 'TELEMETRY_ROLLUP_FLUSH_INTERVAL', 5.0)):
+            self.flush()
+
+    def flush(self):
+        """Merge all pending sketches into their rollups"""
+        # Concurrent callers skip rather than queue up behind a flush in progress
+        if not self._flush_lock.acquire(blocking=False):
+            return
+        try:
+            with self._lock:
+                sketches, self._sketches = self._sketches, defaultdict(LatencySketch)
+                self._pending = 0
+                self._last_flush = time.monotonic()
+
+            if not sketches:
+                return
+
+            try:
+                _merge_sketches(sketches)
+            except Exception as e:
+                logger.error(f"Error flushing {len(sketches)} performance rollups: {e}")
+        finally:
+            self._flush_lock.release()
+
+
+# One buffer per worker process
+pending_performance_rollups = PerformanceRollupBuffer()
+atexit.register(pending_performance_rollups.flush)
+
+
+def rebuild_performance_rollups(since: datetime, until: Optional[datetime] = None, chunk_size: int = 5000) -> int:
+    """
+    Recompute the rollups of whole days in [since, until) from raw rows.
+    Returns the number of raw rows read.
+    """
+    start = bucket_start(since, 'day')
+    end = bucket_start(until or timezone.now(), 'day') + timedelta(days=1)
+    sketches: Dict[Tuple[str, datetime, str, str], LatencySketch] = defaultdict(LatencySketch)
+    paths: Dict[str, str] = {}
+
+    rows = PerformanceLog.objects.filter(timestamp__gte=start, timestamp__lt=end).order_by().values_list(
+        'timestamp', 'metric_type', 'url', 'duration'
+    )
+    read = 0
+    for moment, metric_type, url, duration in rows.iterator(chunk_size=chunk_size):
+        path = paths.get(url)
+        if path is None:
+            path = paths[url] = url_path_template(url)[:255]
+        for period in PERIOD_LENGTHS:
+            sketches[(period, bucket_start(moment, period), metric_type, path)].add(duration)
+        read += 1
+
+    with transaction.atomic():
+        PerformanceRollup.objects.filter(bucket_start__gte=start, bucket_start__lt=end).delete()
+        rollups = []
+        for (period, bucket, metric_type, path), sketch in sketches.items():
+            rollup = PerformanceRollup(period=period, bucket_start=bucket, metric_type=metric_type, path=path)
+            _apply_sketch(rollup, sketch)
+            rollups.append(rollup)
+        PerformanceRollup.objects.bulk_create(rollups, batch_size=500)
+    return read
+
+
+def _rollup_queryset(metric_type: str, start: datetime, end: datetime):
+    queryset = PerformanceRollup.objects.none()
+    for period, first, last in range_buckets(start, end):
+        queryset = queryset | PerformanceRollup.objects.filter(
+            metric_type=metric_type, period=period, bucket_start__gte=first, bucket_start__lte=last
+        )
+    return queryset.order_by()
+
+
+def summarize(sketch: LatencySketch) -> Dict[str, Any]:
+    summary = {
+        'count': sketch.count,
+        'avg_duration': sketch.mean or 0,
+        'min_duration': sketch.min,
+        'max_duration': sketch.max,
+    }
+    for q in PERCENTILES:
+        summary[f"p{round(q * 100)}"] = round(sketch.quantile(q) or 0)
+    return summary
+
+
+def performance_summary(metric_type: str, start: datetime, end: Optional[datetime] = None) -> Dict[str, Any]:
+    """Count, mean and p50/p90/p99 duration of metric_type over [start, end)"""
+    rows = _rollup_queryset(metric_type, start, end or timezone.now()).values_list('sketch', flat=True)
+    return summarize(LatencySketch.merged(LatencySketch.from_dict(sketch) for sketch in rows))
+
+
+def performance_by_path(metric_type: str, start: datetime, end: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """performance_summary per page route, with the route as 'path'"""
+    by_path: Dict[str, LatencySketch] = defaultdict(LatencySketch)
+    rows = _rollup_queryset(metric_type, start, end or timezone.now()).values_list('path', 'sketch')
+    for path, sketch in rows:
+        by_path[path].merge(LatencySketch.from_dict(sketch))
+    return [{'path': path, **summarize(sketch)} for path, sketch in by_path.items()]
+
+
+def performance_trend(metric_type: str, days: int = 7, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """performance_summary of each of the last days UTC days, oldest first"""
+    today = bucket_start(now or timezone.now(), 'day')
+    first_day = today - timedelta(days=days - 1)
+    by_day: Dict[datetime, LatencySketch] = defaultdict(LatencySketch)
+    rows = PerformanceRollup.objects.filter(
+        metric_type=metric_type, period='day', bucket_start__gte=first_day
+    ).order_by().values_list('bucket_start', 'sketch')
+    for day, sketch in rows:
+        by_day[day].merge(LatencySketch.from_dict(sketch))
+    return [
+        {'date': (first_day + timedelta(days=offset)).strftime('%Y-%m-%d'),
+         **summarize(by_day[first_day + timedelta(days=offset)])}
+        for offset in range(days)
+    ]
+
+
+def security_log_dimensions(entry: Dict[str, Any]) -> List[Tuple[str, str]]:
+    """(dimension, value) pairs a SecurityLog request is counted under"""
+    dimensions = [
+        ('total', ''),
+        ('risk_level', entry['risk_level'] or ''),
+        ('status', str(entry['response_status'] or '')),
+        ('path', (entry['path'] or '')[:255]),
+        ('ip', entry['ip_address']),
+    ]
+    if entry['is_suspicious']:
+        dimensions.append(('suspicious', ''))
+    return dimensions
+
+
+def error_log_dimensions(error_log) -> List[Tuple[str, str]]:
+    """(dimension, value) pairs an ErrorLog occurrence is counted under"""
+    browser_info = error_log.browser_info if isinstance(error_log.browser_info, dict) else {}
+    dimensions = [
+        ('total', ''),
+        ('error_type', error_log.error_type or ''),
+        ('severity', error_log.severity or ''),
+        ('url', (error_log.url or '').split('?', 1)[0][:255]),
+    ]
+    if browser_info:
+        browser = browser_info.get('browser', 'Unknown')
+        os = browser_info.get('os', 'Unknown')
+        dimensions.append(('browser', f"{browser} on {os}"[:255]))
+    return dimensions
+
+
+def add_log_counts(source: str, counts: Dict[Tuple[datetime, str, str], int]):
+    """
+    Add counts keyed by (moment, dimension, value) to the hourly and daily
+    LogRollup rows of source.
+
+    Each chunk is one INSERT ... ON CONFLICT DO UPDATE statement (PostgreSQL
+    and SQLite both support it), so concurrent writers add to the same row
+    instead of racing on a read-modify-write.
+    """
+    buckets: Counter = Counter()
+    for (moment, dimension, value), count in counts.items():
+        for period in PERIOD_LENGTHS:
+            buckets[(period, bucket_start(moment, period), dimension, value)] += count
+    if not buckets:
+        return
+
+    qn = connection.ops.quote_name
+    table = qn(LogRollup._meta.db_table)
+    columns = ('source', 'period', 'bucket_start', 'dimension', 'value', 'count')
+    conflict = ('source', 'period', 'dimension', 'bucket_start', 'value')
+    # A fixed order, so concurrent writers lock rows in the same sequence
+    rows = sorted(buckets.items(), key=lambda item: item[0])
+    with connection.cursor() as cursor:
+        for offset in range(0, len(rows), LOG_ROLLUP_CHUNK_SIZE):
+            chunk = rows[offset:offset + LOG_ROLLUP_CHUNK_SIZE]
+            params = []
+            for (period, start, dimension, value), count in chunk:
+                params.extend([
+                    source, period, connection.ops.adapt_datetimefield_value(start), dimension, value, count,
+                ])
+            placeholders = ', '.join(['(%s, %s, %s, %s, %s, %s)'] * len(chunk))
+            cursor.execute(
+                f"INSERT INTO {table} ({', '.join(qn(column) for column in columns)}) VALUES {placeholders} "
+                f"ON CONFLICT ({', '.join(qn(column) for column in conflict)}) "
+                f"DO UPDATE SET {qn('count')} = {table}.{qn('count')} + EXCLUDED.{qn('count')}",
+                params,
+            )
+
+
+def record_security_entries(entries: Iterable[Dict[str, Any]]):
+    """Count written SecurityLog entries, with their ip_address and timestamp, into the rollups"""
+    counts: Counter = Counter()
+    for entry in entries:
+        moment = bucket_start(entry['timestamp'], 'hour')
+        for dimension, value in security_log_dimensions(entry):
+            counts[(moment, dimension, value)] += 1
+    add_log_counts('security', counts)
+
+
+def record_error_occurrences(error_logs: Iterable[Any], moment: Optional[datetime] = None):
+    """Count ErrorLog occurrences (one per instance) into the rollups"""
+    moment = bucket_start(moment or timezone.now(), 'hour')
+    counts: Counter = Counter()
+    for error_log in error_logs:
+        for dimension, value in error_log_dimensions(error_log):
+            counts[(moment, dimension, value)] += 1
+    add_log_counts('error', counts)
+
+
+def rebuild_log_rollups(source: str, since: datetime, until: Optional[datetime] = None, chunk_size: int = 5000) -> int:
+    """
+    Recompute the LogRollup rows of source for whole days in [since, until)
+    from raw rows. Returns the number of raw rows read.
+
+    Security rollups come out exact. ErrorLog keeps one row per open
+    fingerprint, so each row's occurrences are all attributed to the hour it
+    was last seen in.
+    """
+    start = bucket_start(since, 'day')
+    end = bucket_start(until or timezone.now(), 'day') + timedelta(days=1)
+    counts: Counter = Counter()
+    read = 0
+
+    if source == 'security':
+        rows = SecurityLog.objects.filter(timestamp__gte=start, timestamp__lt=end).order_by().values(
+            'timestamp', 'ip_address__ip_address', 'path', 'risk_level', 'response_status', 'is_suspicious'
+        )
+        for row in rows.iterator(chunk_size=chunk_size):
+            row['ip_address'] = row.pop('ip_address__ip_address')
+            moment = bucket_start(row['timestamp'], 'hour')
+            for dimension, value in security_log_dimensions(row):
+                counts[(moment, dimension, value)] += 1
+            read += 1
+    else:
+        rows = ErrorLog.objects.filter(last_seen__gte=start, last_seen__lt=end).order_by().only(
+            'last_seen', 'count', 'error_type', 'severity', 'url', 'browser_info'
+        )
+        for error_log in rows.iterator(chunk_size=chunk_size):
+            moment = bucket_start(error_log.last_seen, 'hour')
+            for dimension, value in error_log_dimensions(error_log):
+                counts[(moment, dimension, value)] += error_log.count
+            read += 1
+
+    with transaction.atomic():
+        LogRollup.objects.filter(source=source, bucket_start__gte=start, bucket_start__lt=end).delete()
+        add_log_counts(source, counts)
+    return read
+
+
+def _log_rollup_queryset(source: str, dimension: str, start: Optional[datetime], end: datetime):
+    """LogRollup rows covering [start, end) once; start None means all time, by day"""
+    rows = LogRollup.objects.filter(source=source, dimension=dimension)
+    if start is None:
+        return rows.filter(period='day').order_by()
+    covering = Q()
+    for period, first, last in range_buckets(start, end):
+        covering |= Q(period=period, bucket_start__gte=first, bucket_start__lte=last)
+    return rows.filter(covering).order_by()
+
+
+def log_total(source: str, dimension: str = 'total', start: Optional[datetime] = None,
+              end: Optional[datetime] = None) -> int:
+    """Number of source events in [start, end) counted under dimension (all values)"""
+    rows = _log_rollup_queryset(source, dimension, start, end or timezone.now())
+    return rows.aggregate(total=Sum('count'))['total'] or 0
+
+
+def log_counts(source: str, dimension: str, start: Optional[datetime] = None, end: Optional[datetime] = None,
+               limit: Optional[int] = None) -> List[Tuple[str, int]]:
+    """(value, count) of dimension over [start, end), largest first"""
+    rows = _log_rollup_queryset(source, dimension, start, end or timezone.now()).values('value').annotate(
+        total=Sum('count')
+    ).order_by('-total', 'value').values_list('value', 'total')
+    return list(rows[:limit] if limit else rows)
+
+
+def log_trend(source: str, dimension: str = 'total', days: int = 7, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """Daily totals of dimension over the last days UTC days, oldest first"""
+    today = bucket_start(now or timezone.now(), 'day')
+    first_day = today - timedelta(days=days - 1)
+    by_day = dict(
+        LogRollup.objects.filter(
+            source=source, dimension=dimension, period='day', bucket_start__gte=first_day
+        ).order_by().values('bucket_start').annotate(total=Sum('count')).values_list('bucket_start', 'total')
+    )
+    return [
+        {'date': (first_day + timedelta(days=offset)).strftime('%Y-%m-%d'),
+         'count': by_day.get(first_day + timedelta(days=offset), 0)}
+        for offset in range(days)
+    ]
@@ -0,0 +1,90 @@
+"""
+Route Classes
+Per-path security policies so asset and crawler traffic skips the
+expensive parts of the security middleware
+"""
+
+import random
+import re
+from typing import Any, Dict, Iterable, Optional
+
+POLICY_SKIP = 'skip'        # Blacklist only: no rate limit, analysis or logging
+POLICY_SAMPLE = 'sample'    # Full checks, but only a fraction of requests is logged
+POLICY_FULL = 'full'        # Full checks and logging (the default)
+
+POLICIES = (POLICY_SKIP, POLICY_SAMPLE, POLICY_FULL)
+
+# Used when SECURITY_MIDDLEWARE_SETTINGS has no ROUTE_CLASSES entry. A path
+# ending in '/' covers everything below it; any other path only itself.
+DEFAULT_ROUTE_CLASSES = [
+    {'name': 'static', 'paths': ['/static/', '/favicon.ico'], 'policy': POLICY_SKIP},
+    {'name': 'media', 'paths': ['/media/'], 'policy': POLICY_SAMPLE, 'sample_rate': 0.01},
+    {
+        'name': 'crawler', 'paths': ['/robots.txt', '/sitemap.xml', '/sitemap-index.xml'],
+        'policy': POLICY_SAMPLE, 'sample_rate': 0.1,
+    },
+]
+
+
+class RouteClass:
+    """A named policy for a group of paths"""
+
+    __slots__ = ('name', 'policy', 'sample_rate')
+
+    def __init__(self, name: str, policy: str = POLICY_FULL, sample_rate: float = 1.0):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown route class policy for {name}: {policy}")
+        self.name = name
+        self.policy = policy
+        self.sample_rate = sample_rate
+
+    @property
+    def skips_checks(self) -> bool:
+        return self.policy == POLICY_SKIP
+
+    def should_log(self) -> bool:
+        """Decide whether an unremarkable request of this class is logged"""
+        if self.policy == POLICY_SAMPLE:
+            return random.random() < self.sample_rate
+        return self.policy == POLICY_FULL
+
+
+DEFAULT_ROUTE_CLASS = RouteClass('default', POLICY_FULL)
+
+
+class RouteClassifier:
+    """
+    Maps a request path to its RouteClass with a single regex match.
+
+    All paths are escaped and joined into one alternation, longest first so
+    the most specific path wins; the named group that matched identifies the
+    class. Paths ending in '/' match as prefixes, the rest only exactly, so
+    '/favicon.ico' does not also cover '/favicon.icon.php'.
+    """
+
+    __slots__ = ('_regex', '_classes')
+
+    def __init__(self, route_classes: Iterable[Dict[str, Any]]):
+        paths = []
+        for config in route_classes:
+            route_class = RouteClass(
+                config['name'], config.get('policy', POLICY_FULL), config.get('sample_rate', 1.0)
+            )
+            paths.extend((path, route_class) for path in config.get('paths', ()))
+
+        paths.sort(key=lambda item: len(item[0]), reverse=True)
+        self._classes: Dict[str, RouteClass] = {}
+        alternatives = []
+        for index, (path, route_class) in enumerate(paths):
+            group = f"p{index}"
+            self._classes[group] = route_class
+            pattern = re.escape(path) if path.endswith('/') else rf"{re.escape(path)}\Z"
+            alternatives.append(f"(?P<{group}>{pattern})")
+        self._regex: Optional[re.Pattern] = re.compile('|'.join(alternatives)) if alternatives else None
+
+    def classify(self, path: str) -> RouteClass:
+        if self._regex is not None:
+            match = self._regex.match(path)
+            if match is not None:
+                return self._classes[match.lastgroup]
+        return DEFAULT_ROUTE_CLASS
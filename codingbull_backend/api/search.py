@@ -0,0 +1,236 @@
+"""
+Blog Search
+Full-text search over blog posts: a GIN-indexed tsvector on PostgreSQL, an
+FTS5 table on SQLite, and a LIKE scan anywhere else
+"""
+
+import logging
+import re
+from typing import Dict, Iterable
+
+from django.db import connection
+from django.db.models import F, Q
+from rest_framework.filters import BaseFilterBackend
+
+logger = logging.getLogger(__name__)
+
+SEARCH_CONFIG = 'english'
+FTS_TABLE = 'api_blogpost_fts'
+SNIPPET_START = '<mark>'
+SNIPPET_STOP = '</mark>'
+SNIPPET_WORDS = 24
+# Relative weight of title, excerpt, content and category matches
+FIELD_WEIGHTS = (10.0, 4.0, 1.0, 2.0)
+
+FTS_REBUILD_SQL = (
+    f"INSERT INTO {FTS_TABLE} (rowid, title, excerpt, content, category) "
+    f"SELECT post.id, post.title, COALESCE(post.excerpt, ''), post.content, COALESCE(category.name, '') "
+    f"FROM api_blogpost AS post LEFT JOIN api_category AS category ON category.id = post.category_id"
+)
+
+
+def blog_post_search_vector():
+    """
+    The tsvector expression behind the PostgreSQL GIN index.
+
+    Queries must use this exact expression for the planner to pick the
+    index. Migrations keep their own frozen copy, so changing it here needs
+    a migration that rebuilds the index (as 0016 did to add category_name).
+    """
+    from django.contrib.postgres.search import SearchVector
+    return (
+        SearchVector('title', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('excerpt', weight='B', config=SEARCH_CONFIG)
+        + SearchVector('category_name', weight='B', config=SEARCH_CONFIG)
+        + SearchVector('content', weight='C', config=SEARCH_CONFIG)
+    )
+
+
+def fts5_query(term: str) -> str:
+    """Quote every word of user input so FTS5 syntax characters are inert (implicit AND)"""
+    return ' '.join(f'"{word}"' for word in re.findall(r'\w+', term))
+
+
+class SearchBackend:
+    """
+    LIKE scan over title, content and category name, as DRF's SearchFilter
+    did. Used on databases without a full-text index and as the benchmark
+    baseline.
+    """
+    vendor = None
+
+    def search(self, queryset, term: str):
+        """
+        Filter queryset to posts matching term. Ranking backends also add a
+        search_rank column, lower for better matches.
+        """
+        condition = Q()
+        for word in term.split():
+            condition &= Q(title__icontains=word) | Q(content__icontains=word) | Q(category__name__icontains=word)
+        return queryset.filter(condition)
+
+    def snippets(self, posts: Iterable, term: str) -> Dict[int, str]:
+        """Highlighted content excerpt per post id"""
+        return {}
+
+    def index_posts(self, posts: Iterable):
+        """Bring the index entries of posts up to date"""
+
+    def remove_posts(self, post_ids: Iterable[int]):
+        """Drop index entries of deleted posts"""
+
+    def rebuild(self) -> int:
+        """Re-index every post, returns the number indexed"""
+        return 0
+
+
+class PostgresSearchBackend(SearchBackend):
+    """
+    Ranked tsvector search. The vector is an expression GIN index over the
+    post's own columns, so PostgreSQL keeps it current and index_posts has
+    nothing to do. The category name is one of those columns, denormalised
+    onto BlogPost by api.signals.
+    """
+    vendor = 'postgresql'
+
+    def _query(self, term: str):
+        from django.contrib.postgres.search import SearchQuery
+        return SearchQuery(term, search_type='websearch', config=SEARCH_CONFIG)
+
+    def search(self, queryset, term: str):
+        from django.contrib.postgres.search import SearchRank
+        query = self._query(term)
+        vector = blog_post_search_vector()
+        # SearchRank is higher for better matches; negate it to sort like bm25()
+        return queryset.annotate(search_vector=vector).filter(search_vector=query).annotate(
+            search_rank=-SearchRank(F('search_vector'), query)
+        )
+
+    def snippets(self, posts: Iterable, term: str) -> Dict[int, str]:
+        from django.contrib.postgres.search import SearchHeadline
+        from .models import BlogPost
+        post_ids = [post.pk for post in posts]
+        if not post_ids:
+            return {}
+        headlines = BlogPost.objects.filter(pk__in=post_ids).annotate(
+            snippet=SearchHeadline(
+                'content', self._query(term), config=SEARCH_CONFIG,
+                start_sel=SNIPPET_START, stop_sel=SNIPPET_STOP,
+                max_words=SNIPPET_WORDS, min_words=SNIPPET_WORDS // 2,
+            )
+        ).values_list('pk', 'snippet')
+        return dict(headlines)
+
+    def rebuild(self) -> int:
+        # Only the denormalised category names can drift (bulk writes skip signals)
+        from .models import BlogPost
+        return BlogPost.refresh_category_names()
+
+
+class SQLiteSearchBackend(SearchBackend):
+    """
+    FTS5 search for development. api_blogpost_fts holds a copy of each post's
+    searchable text under the post id as rowid, kept in sync by api.signals;
+    bulk writes that skip signals need a rebuild_search_index.
+    """
+    vendor = 'sqlite'
+
+    def search(self, queryset, term: str):
+        match = fts5_query(term)
+        if not match:
+            return queryset.none()
+        weights = ', '.join(str(weight) for weight in FIELD_WEIGHTS)
+        # A join against the virtual table: Django has no model for it, and
+        # bm25() is only valid in the query that runs the MATCH
+        return queryset.extra(
+            tables=[FTS_TABLE],
+            where=[f"{FTS_TABLE}.rowid = api_blogpost.id", f"{FTS_TABLE} MATCH %s"],
+            params=[match],
+            select={'search_rank': f"bm25({FTS_TABLE}, {weights})"},
+        )
+
+    def snippets(self, posts: Iterable, term: str) -> Dict[int, str]:
+        post_ids = [post.pk for post in posts]
+        match = fts5_query(term)
+        if not post_ids or not match:
+            return {}
+        placeholders = ', '.join(['%s'] * len(post_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid, snippet({FTS_TABLE}, 2, %s, %s, '…', %s) FROM {FTS_TABLE} "
+                f"WHERE {FTS_TABLE} MATCH %s AND rowid IN ({placeholders})",
+                [SNIPPET_START, SNIPPET_STOP, SNIPPET_WORDS, match, *post_ids],
+            )
+            return dict(cursor.fetchall())
+
+    def index_posts(self, posts: Iterable):
+        rows = [
+            (post.pk, post.title, post.excerpt or '', post.content, post.category.name if post.category_id else '')
+            for post in posts
+        ]
+        if not rows:
+            return
+        with connection.cursor() as cursor:
+            cursor.executemany(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [(row[0],) for row in rows])
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE} (rowid, title, excerpt, content, category) VALUES (%s, %s, %s, %s, %s)",
+                rows,
+            )
+
+    def remove_posts(self, post_ids: Iterable[int]):
+        with connection.cursor() as cursor:
+            cursor.executemany(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [(pk,) for pk in post_ids])
+
+    def rebuild(self) -> int:
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+            cursor.execute(FTS_REBUILD_SQL)
+            return cursor.rowcount
+
+
+_search_backend = None
+
+
+def get_search_backend() -> SearchBackend:
+    """The backend for the default database, picked once per process"""
+    global _search_backend
+    if _search_backend is None:
+        if connection.vendor == 'postgresql':
+            _search_backend = PostgresSearchBackend()
+        elif connection.vendor == 'sqlite' and FTS_TABLE in connection.introspection.table_names():
+            _search_backend = SQLiteSearchBackend()
+        else:
+            _search_backend = SearchBackend()
+    return _search_backend
+
+
+class FullTextSearchFilter(BaseFilterBackend):
+    """
+    Drop-in replacement for SearchFilter on BlogPostViewSet: same ?search=
+    parameter, but matched through the full-text index and ordered by
+    relevance unless the client asked for an explicit ?ordering=. It must
+    come after OrderingFilter in filter_backends so its ordering wins.
+    """
+    search_param = 'search'
+
+    def get_search_term(self, request) -> str:
+        return request.query_params.get(self.search_param, '').replace('\x00', '').strip()
+
+    def filter_queryset(self, request, queryset, view):
+        term = self.get_search_term(request)
+        if not term:
+            return queryset
+        queryset = get_search_backend().search(queryset, term)
+        ranked = 'search_rank' in queryset.query.annotations or 'search_rank' in queryset.query.extra
+        if ranked and 'ordering' not in request.query_params:
+            queryset = queryset.order_by('search_rank', '-published_date')
+        return queryset
+
+    def attach_snippets(self, request, posts):
+        """Set search_snippet on the posts of one page (one query for the whole page)"""
+        term = self.get_search_term(request)
+        if not term or not posts:
+            return
+        snippets = get_search_backend().snippets(posts, term)
+        for post in posts:
+            post.search_snippet = snippets.get(post.pk)
@@ -7,6 +7,42 @@ from django.utils.deprecation import MiddlewareMixin
 from django.conf import settings
 
 
+# Header values are constant, so they are joined once at import rather than per response
+# Content Security Policy (CSP)
+CSP_DIRECTIVES = [
+    "default-src 'self'",
+    "script-src 'self' 'unsafe-inline' 'unsafe-eval' https://www.google-analytics.com https://www.googletagmanager.com",
+    "style-src 'self' 'unsafe-inline' https://fonts.googleapis.com",
+    "font-src 'self' https://fonts.gstatic.com",
+    "img-src 'self' data: https: blob:",
+    "connect-src 'self' https://www.google-analytics.com",
+    "frame-ancestors 'none'",
+    "base-uri 'self'",
+    "form-action 'self'",
+    "upgrade-insecure-requests"
+]
+CONTENT_SECURITY_POLICY = '; '.join(CSP_DIRECTIVES)
+
+# Permissions Policy (formerly Feature Policy)
+PERMISSIONS_POLICY_DIRECTIVES = [
+    "geolocation=()",
+    "microphone=()",
+    "camera=()",
+    "payment=()",
+    "usb=()",
+    "magnetometer=()",
+    "gyroscope=()",
+    "speaker=()",
+    "vibrate=()",
+    "fullscreen=(self)",
+    "sync-xhr=()"
+]
+PERMISSIONS_POLICY = ', '.join(PERMISSIONS_POLICY_DIRECTIVES)
+
+# API responses without an API_CACHE_POLICIES entry are private
+PRIVATE_CACHE_CONTROL = 'no-store, no-cache, must-revalidate, max-age=0'
+
+
 class SecurityHeadersMiddleware(MiddlewareMixin):
     """
     Middleware to add security headers to all responses
@@ -19,23 +55,9 @@ class SecurityHeadersMiddleware(MiddlewareMixin):
         if request.path.startswith('/media/'):
             return response
 
-        # Content Security Policy (CSP)
-        csp_directives = [
-            "default-src 'self'",
-            "script-src 'self' 'unsafe-inline' 'unsafe-eval' https://www.google-analytics.com https://www.googletagmanager.com",
-            "style-src 'self' 'unsafe-inline' https://fonts.googleapis.com",
-            "font-src 'self' https://fonts.gstatic.com",
-            "img-src 'self' data: https: blob:",
-            "connect-src 'self' https://www.google-analytics.com",
-            "frame-ancestors 'none'",
-            "base-uri 'self'",
-            "form-action 'self'",
-            "upgrade-insecure-requests"
-        ]
-        
         # Only add CSP in production or if explicitly enabled
         if getattr(settings, 'ENVIRONMENT', 'development') == 'production':
-            response['Content-Security-Policy'] = '; '.join(csp_directives)
+            response['Content-Security-Policy'] = CONTENT_SECURITY_POLICY
         
         # X-Content-Type-Options
         response['X-Content-Type-Options'] = 'nosniff'
@@ -51,20 +73,7 @@ class SecurityHeadersMiddleware(MiddlewareMixin):
         response['Referrer-Policy'] = 'strict-origin-when-cross-origin'
         
         # Permissions Policy (formerly Feature Policy)
-        permissions_policy = [
-            "geolocation=()",
-            "microphone=()",
-            "camera=()",
-            "payment=()",
-            "usb=()",
-            "magnetometer=()",
-            "gyroscope=()",
-            "speaker=()",
-            "vibrate=()",
-            "fullscreen=(self)",
-            "sync-xhr=()"
-        ]
-        response['Permissions-Policy'] = ', '.join(permissions_policy)
+        response['Permissions-Policy'] = PERMISSIONS_POLICY
         
         # Environment-aware Cross-Origin policies
         environment = getattr(settings, 'ENVIRONMENT', 'development')
@@ -96,7 +105,24 @@ class APISecurityHeadersMiddleware(MiddlewareMixin):
     """
     Specific security headers for API endpoints
     """
-    
+
+    def __init__(self, get_response=None):
+        super().__init__(get_response)
+        # Longest prefix first so the most specific policy wins
+        policies = []
+        for policy in getattr(settings, 'API_CACHE_POLICIES', ()):
+            policies.extend((prefix, policy['cache_control']) for prefix in policy.get('prefixes', ()))
+        self.cache_policies = tuple(sorted(policies, key=lambda item: len(item[0]), reverse=True))
+
+    def get_cache_control(self, request):
+        """Cache-Control for request, or None for the private no-store default"""
+        if request.method not in ('GET', 'HEAD'):
+            return None
+        for prefix, cache_control in self.cache_policies:
+            if request.path.startswith(prefix):
+                return cache_control
+        return None
+
     def process_response(self, request, response):
         """Add API-specific security headers"""
         
@@ -104,10 +130,15 @@ class APISecurityHeadersMiddleware(MiddlewareMixin):
         if not request.path.startswith('/api/'):
             return response
         
-        # Cache Control for API responses
-        response['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
-        response['Pragma'] = 'no-cache'
-        response['Expires'] = '0'
+        # Cache Control for API responses: public content endpoints get their
+        # configured policy, everything else is never stored
+        cache_control = self.get_cache_control(request)
+        if cache_control is not None:
+            response['Cache-Control'] = cache_control
+        else:
+            response['Cache-Control'] = PRIVATE_CACHE_CONTROL
+            response['Pragma'] = 'no-cache'
+            response['Expires'] = '0'
         
         # API-specific headers
         response['X-API-Version'] = 'v1.0'
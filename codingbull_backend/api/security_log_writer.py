@@ -0,0 +1,356 @@
+"""
+Security Log Writer
+Background pipeline that persists SecurityLog rows off the response path
+"""
+
+import atexit
+import hashlib
+import ipaddress
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+from django.utils.ipv6 import clean_ipv6_address
+
+from .counters import request_counters
+from .lru_cache import LRUCache
+from .models import SecurityLog, IPAddress, UserAgent, SecurityAlert
+from .rollups import record_security_entries
+
+logger = logging.getLogger(__name__)
+
+EMPTY_USER_AGENT_HASH = 'empty'
+
+# User agent string -> (user_agent_hash, UserAgent pk), so repeat user agents
+# skip both the SHA-256 and the lookup query
+user_agent_ids = LRUCache(
+    maxsize=getattr(settings, 'SECURITY_MIDDLEWARE_SETTINGS', {}).get('USER_AGENT_CACHE_SIZE', 2048)
+)
+
+
+def normalize_ip(value: str) -> Optional[str]:
+    """Return the IP in the form GenericIPAddressField stores, or None if invalid"""
+    try:
+        ipaddress.ip_address(value)
+    except ValueError:
+        return None
+    if ':' in value:
+        return clean_ipv6_address(value)
+    return value
+
+
+def user_agent_hash(user_agent_string: str) -> str:
+    """Hash used as the UserAgent lookup key"""
+    if not user_agent_string:
+        return EMPTY_USER_AGENT_HASH
+    return hashlib.sha256(user_agent_string.encode('utf-8')).hexdigest()
+
+
+class SecurityLogWriter:
+    """
+    Bounded queue of pending security log entries drained by a worker thread.
+
+    Each flush resolves the batch's IPs and user agents with one query per
+    table, hands request counts to the shared CounterAccumulator, and inserts
+    the SecurityLog rows with bulk_create. When the queue is full new entries are
+    dropped (and counted) rather than slowing down responses.
+
+    The thread is started lazily per process, so it survives gunicorn's
+    --preload fork, and pending entries are flushed at interpreter exit.
+    """
+
+    def __init__(self):
+        self._queue: Optional[queue.Queue] = None
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0
+        self.batches = 0
+
+    @property
+    def options(self) -> Dict[str, Any]:
+        security_settings = getattr(settings, 'SECURITY_MIDDLEWARE_SETTINGS', {})
+        return {
+            'async': security_settings.get('SECURITY_LOG_ASYNC', True),
+            'queue_size': security_settings.get('SECURITY_LOG_QUEUE_SIZE', 10000),
+            'batch_size': security_settings.get('SECURITY_LOG_BATCH_SIZE', 200),
+            'flush_interval': security_settings.get('SECURITY_LOG_FLUSH_INTERVAL', 2.0),
+        }
+
+    def submit(self, entry: Dict[str, Any]) -> bool:
+        """Queue an entry for writing. Returns False if it was dropped."""
+        # Stamped now, not when the batch is flushed seconds later
+        entry.setdefault('timestamp', timezone.now())
+        options = self.options
+        if not options['async']:
+            self.enqueued += 1
+            self.flush([entry])
+            request_counters.flush()
+            return True
+
+        self._ensure_worker(options)
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped % 1000 == 1:
+                logger.warning(f"Security log queue full, {self.dropped} entries dropped so far")
+            return False
+
+        self.enqueued += 1
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for monitoring the pipeline in this process"""
+        from .security_middleware import UserAgentParser
+
+        return {
+            'enqueued': self.enqueued,
+            'written': self.written,
+            'dropped': self.dropped,
+            'errors': self.errors,
+            'batches': self.batches,
+            'queue_depth': self._queue.qsize() if self._queue is not None else 0,
+            'user_agent_ids': user_agent_ids.stats(),
+            'user_agent_parser': UserAgentParser._parse_cache.stats(),
+        }
+
+    def _ensure_worker(self, options: Dict[str, Any]):
+        pid = os.getpid()
+        if self._pid == pid and self._thread is not None and self._thread.is_alive():
+            return
+
+        with self._lock:
+            if self._pid == pid and self._thread is not None and self._thread.is_alive():
+                return
+            if self._pid != pid or self._queue is None:
+                # A queue inherited across fork belongs to the parent process
+                self._queue = queue.Queue(maxsize=options['queue_size'])
+                self._pid = pid
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run,
+                args=(options['batch_size'], options['flush_interval']),
+                name='security-log-writer',
+                daemon=True,
+            )
+            self._thread.start()
+
+    def _run(self, batch_size: int, flush_interval: float):
+        batch: List[Dict[str, Any]] = []
+        deadline = time.monotonic() + flush_interval
+
+        try:
+            while True:
+                try:
+                    entry = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                    if entry is not None:
+                        batch.append(entry)
+                except queue.Empty:
+                    pass
+
+                stopping = self._stop.is_set()
+                if stopping:
+                    while True:
+                        try:
+                            entry = self._queue.get_nowait()
+                        except queue.Empty:
+                            break
+                        if entry is not None:
+                            batch.append(entry)
+
+                if len(batch) >= batch_size or time.monotonic() >= deadline or stopping:
+                    for start in range(0, len(batch), batch_size):
+                        self.flush(batch[start:start + batch_size])
+                    batch = []
+                    deadline = time.monotonic() + flush_interval
+                    if stopping:
+                        request_counters.flush()
+                    else:
+                        request_counters.maybe_flush()
+
+                if stopping:
+                    return
+        finally:
+            connection.close()
+
+    def shutdown(self, timeout: float = 5.0):
+        """Flush pending entries and stop the worker thread"""
+        thread = self._thread
+        if thread is None or self._pid != os.getpid() or not thread.is_alive():
+            return
+        self._stop.set()
+        try:
+            # Wake the worker if it is waiting on an empty queue
+            self._queue.put_nowait(None)
+        except queue.Full:
+            pass
+        thread.join(timeout)
+
+    def flush(self, batch: List[Dict[str, Any]]):
+        """Write a batch of entries in one transaction"""
+        if not batch:
+            return
+
+        close_old_connections()
+        try:
+            with transaction.atomic():
+                self._write_batch(batch)
+            self.written += len(batch)
+            self.batches += 1
+        except Exception as e:
+            self.errors += 1
+            # A cached UserAgent pk may point at a deleted row
+            user_agent_ids.clear()
+            logger.error(f"Error writing {len(batch)} security log entries: {e}")
+
+    def _write_batch(self, batch: List[Dict[str, Any]]):
+        entries = []
+        for entry in batch:
+            ip = normalize_ip(entry['remote_addr'])
+            if ip is None:
+                logger.warning(f"Skipping security log entry with invalid IP: {entry['remote_addr']!r}")
+                continue
+            entries.append((ip, entry))
+
+        if not entries:
+            return
+
+        ip_objects = self._resolve_ips({ip for ip, _ in entries})
+        ua_ids = self._resolve_user_agents({entry['user_agent'] for _, entry in entries})
+
+        logs = []
+        alerts = []
+
+        for ip, entry in entries:
+            ip_obj = ip_objects[ip]
+            is_suspicious = entry['is_suspicious']
+            risk_score = entry['risk_score']
+
+            logs.append(SecurityLog(
+                ip_address=ip_obj,
+                user_agent_id=ua_ids[entry['user_agent']][1],
+                method=entry['method'],
+                path=entry['path'],
+                query_string=entry['query_string'],
+                referer=entry['referer'],
+                host=entry['host'],
+                content_type=entry['content_type'],
+                is_suspicious=is_suspicious,
+                risk_level=entry['risk_level'],
+                risk_score=risk_score,
+                user_id=entry['user_id'],
+                session_key=entry['session_key'],
+                response_status=entry['response_status'],
+                response_time=entry['response_time'],
+                blocked=False,
+                x_forwarded_for=entry['x_forwarded_for'],
+                x_real_ip=normalize_ip(entry['x_real_ip']) if entry['x_real_ip'] else None,
+                x_forwarded_proto=entry['x_forwarded_proto'],
+                threat_indicators=entry['threat_indicators'],
+                timestamp=entry['timestamp'],
+            ))
+
+            # Create alerts for high-risk requests
+            if risk_score >= 60:
+                alerts.append(SecurityAlert(
+                    alert_type='suspicious_activity',
+                    severity='warning' if risk_score < 80 else 'error',
+                    title=f"Suspicious activity detected (Score: {risk_score})",
+                    description=f"Path: {entry['path']}, IP: {entry['remote_addr']}",
+                    ip_address=ip_obj,
+                    additional_data={
+                        'path': entry['path'],
+                        'method': entry['method'],
+                        'user_agent': entry['user_agent'],
+                        'referer': entry['referer'],
+                    }
+                ))
+
+        SecurityLog.objects.bulk_create(logs)
+        if alerts:
+            SecurityAlert.objects.bulk_create(alerts)
+        record_security_entries({**entry, 'ip_address': ip} for ip, entry in entries)
+
+        for ip, entry in entries:
+            request_counters.add_ip(ip, suspicious=int(entry['is_suspicious']))
+            ua_hash = ua_ids[entry['user_agent']][0]
+            if ua_hash != EMPTY_USER_AGENT_HASH:
+                request_counters.add_user_agent(ua_hash)
+
+    def _resolve_ips(self, ips) -> Dict[str, IPAddress]:
+        """Fetch IPAddress rows for the batch, creating missing ones in bulk"""
+        found = {obj.ip_address: obj for obj in IPAddress.objects.filter(ip_address__in=ips)}
+        missing = ips - found.keys()
+        if missing:
+            IPAddress.objects.bulk_create(
+                [IPAddress(ip_address=ip, reputation_score=50) for ip in missing],
+                ignore_conflicts=True,
+            )
+            found.update({obj.ip_address: obj for obj in IPAddress.objects.filter(ip_address__in=missing)})
+        return found
+
+    def _resolve_user_agents(self, user_agent_strings) -> Dict[str, Tuple[str, int]]:
+        """
+        Map each user agent string in the batch to (user_agent_hash, pk).
+        Strings seen recently come from the LRU; the rest are fetched, and
+        created in bulk if missing, with one query per step.
+        """
+        from .security_middleware import UserAgentParser
+
+        resolved = {}
+        missing = {}
+        for user_agent_string in user_agent_strings:
+            cached = user_agent_ids.get(user_agent_string)
+            if cached is None:
+                missing[user_agent_hash(user_agent_string)] = user_agent_string
+            else:
+                resolved[user_agent_string] = cached
+
+        if not missing:
+            return resolved
+
+        found = dict(UserAgent.objects.filter(user_agent_hash__in=missing).values_list('user_agent_hash', 'pk'))
+        new_hashes = missing.keys() - found.keys()
+        if new_hashes:
+            new_objects = []
+            for ua_hash in new_hashes:
+                user_agent_string = missing[ua_hash]
+                if ua_hash == EMPTY_USER_AGENT_HASH:
+                    # Default user agent for empty strings
+                    new_objects.append(UserAgent(
+                        user_agent_hash=ua_hash,
+                        user_agent_string='',
+                        device_type='unknown',
+                        is_bot=False,
+                        is_mobile=False,
+                    ))
+                else:
+                    new_objects.append(UserAgent(
+                        user_agent_hash=ua_hash,
+                        user_agent_string=user_agent_string,
+                        **UserAgentParser.parse_user_agent(user_agent_string)
+                    ))
+            UserAgent.objects.bulk_create(new_objects, ignore_conflicts=True)
+            found.update(UserAgent.objects.filter(user_agent_hash__in=new_hashes).values_list('user_agent_hash', 'pk'))
+
+        for ua_hash, pk in found.items():
+            user_agent_string = missing[ua_hash]
+            resolved[user_agent_string] = (ua_hash, pk)
+            user_agent_ids.set(user_agent_string, (ua_hash, pk))
+        return resolved
+
+
+# One writer per worker process
+security_log_writer = SecurityLogWriter()
+atexit.register(security_log_writer.shutdown)
@@ -5,24 +5,21 @@ Comprehensive security middleware with database logging, rate limiting, and thre
 
 import logging
 import time
-import hashlib
 import re
-import json
-from datetime import timedelta
 from typing import Dict, List, Optional, Tuple, Any
 
-from django.utils.deprecation import MiddlewareMixin
 from django.http import HttpResponseForbidden, JsonResponse
 from django.conf import settings
-from django.utils import timezone
-from django.db import transaction
-from django.core.cache import cache
-from django.contrib.auth.models import User
 
-from .models import (
-    SecurityLog, IPAddress, UserAgent, RateLimitRule, 
-    BlacklistRule, SecurityAlert, RateLimitTracker
-)
+from .models import IPAddress, SecurityAlert
+from .blacklist import blacklist_snapshot
+from .lru_cache import LRUCache
+from .pattern_matcher import PatternSet
+from .request_context import RequestContext
+from .route_classes import DEFAULT_ROUTE_CLASS, DEFAULT_ROUTE_CLASSES, RouteClass, RouteClassifier
+from .counters import request_counters
+from .security_log_writer import normalize_ip, security_log_writer
+from .rate_limit import CompiledRateLimitRule, get_rate_limit_backend, rate_limit_rules
 
 logger = logging.getLogger(__name__)
 
@@ -126,6 +123,36 @@ class SecurityAnalyzer:
         r'scan.*bot',
     ]
     
+    # SQL injection patterns checked in the path
+    PATH_SQL_PATTERNS = [r'union.*select', r'drop.*table', r'insert.*into', r'delete.*from']
+    
+    # Script-like user agents (flagged unless a legitimate bot)
+    SCRIPT_USER_AGENTS = [r'python', r'perl', r'ruby', r'java', r'go-http', r'libwww']
+    
+    # Injection patterns checked in the query string
+    QUERY_INJECTION_PATTERNS = [
+        r'union.*select', r'drop.*table', r'insert.*into', r'delete.*from',
+        r'exec.*\(', r'script.*alert', r'javascript:', r'<script',
+        r'onload=', r'onerror=', r'onclick='
+    ]
+    
+    # Suspicious referer patterns
+    SUSPICIOUS_REFERERS = [
+        r'\.tk$', r'\.ml$', r'\.ga$', r'\.cf$',  # Suspicious TLDs
+        r'bit\.ly', r'tinyurl', r'goo\.gl',      # URL shorteners
+        r'localhost', r'127\.0\.0\.1',          # Local references
+    ]
+    
+    # Compiled once at import; see api.pattern_matcher.PatternSet
+    _suspicious_paths = PatternSet(SUSPICIOUS_PATHS)
+    _legitimate_paths = PatternSet(LEGITIMATE_PATHS)
+    _legitimate_bots = PatternSet(LEGITIMATE_BOTS)
+    _suspicious_user_agents = PatternSet(SUSPICIOUS_USER_AGENTS)
+    _path_sql_patterns = PatternSet(PATH_SQL_PATTERNS)
+    _script_user_agents = PatternSet(SCRIPT_USER_AGENTS)
+    _query_injection_patterns = PatternSet(QUERY_INJECTION_PATTERNS)
+    _suspicious_referers = PatternSet(SUSPICIOUS_REFERERS)
+    
     @classmethod
     def analyze_request(cls, request_info: Dict[str, Any]) -> Tuple[bool, int, List[str]]:
         """
@@ -186,13 +213,12 @@ class SecurityAnalyzer:
         score = 0
         
         # Check for suspicious paths
-        for pattern in cls.SUSPICIOUS_PATHS:
-            if re.search(pattern, path, re.IGNORECASE):
-                indicators.append(f"Suspicious path pattern: {pattern}")
-                score += 25
+        for pattern in cls._suspicious_paths.search_all(path):
+            indicators.append(f"Suspicious path pattern: {pattern}")
+            score += 25
         
         # Check if path is not in legitimate paths
-        is_legitimate = any(re.match(pattern, path, re.IGNORECASE) for pattern in cls.LEGITIMATE_PATHS)
+        is_legitimate = cls._legitimate_paths.match_any(path)
         if not is_legitimate and path != '/':
             indicators.append("Path not in legitimate paths")
             score += 10
@@ -208,11 +234,9 @@ class SecurityAnalyzer:
             score += 20
         
         # Check for SQL injection patterns in path
-        sql_patterns = [r'union.*select', r'drop.*table', r'insert.*into', r'delete.*from']
-        for pattern in sql_patterns:
-            if re.search(pattern, path, re.IGNORECASE):
-                indicators.append(f"SQL injection pattern in path: {pattern}")
-                score += 35
+        for pattern in cls._path_sql_patterns.search_all(path):
+            indicators.append(f"SQL injection pattern in path: {pattern}")
+            score += 35
         
         return len(indicators) > 0, score, indicators
     
@@ -228,14 +252,12 @@ class SecurityAnalyzer:
             return True, score, indicators
         
         # Check for suspicious user agent patterns
-        for pattern in cls.SUSPICIOUS_USER_AGENTS:
-            if re.search(pattern, user_agent, re.IGNORECASE):
-                indicators.append(f"Suspicious user agent pattern: {pattern}")
-                score += 30
+        for pattern in cls._suspicious_user_agents.search_all(user_agent):
+            indicators.append(f"Suspicious user agent pattern: {pattern}")
+            score += 30
         
         # Check if it's a legitimate bot
-        is_legitimate_bot = any(re.search(pattern, user_agent, re.IGNORECASE) 
-                               for pattern in cls.LEGITIMATE_BOTS)
+        is_legitimate_bot = cls._legitimate_bots.search_any(user_agent)
         
         # Check for very short user agents (often bots)
         if len(user_agent) < 10 and not is_legitimate_bot:
@@ -243,9 +265,8 @@ class SecurityAnalyzer:
             score += 10
         
         # Check for script-like user agents
-        script_patterns = [r'python', r'perl', r'ruby', r'java', r'go-http', r'libwww']
-        for pattern in script_patterns:
-            if re.search(pattern, user_agent, re.IGNORECASE) and not is_legitimate_bot:
+        if not is_legitimate_bot:
+            for pattern in cls._script_user_agents.search_all(user_agent):
                 indicators.append(f"Script-like user agent: {pattern}")
                 score += 15
         
@@ -286,16 +307,9 @@ class SecurityAnalyzer:
             return False, 0, []
         
         # Check for SQL injection patterns
-        sql_patterns = [
-            r'union.*select', r'drop.*table', r'insert.*into', r'delete.*from',
-            r'exec.*\(', r'script.*alert', r'javascript:', r'<script',
-            r'onload=', r'onerror=', r'onclick='
-        ]
-        
-        for pattern in sql_patterns:
-            if re.search(pattern, query_string, re.IGNORECASE):
-                indicators.append(f"Injection pattern in query: {pattern}")
-                score += 25
+        for pattern in cls._query_injection_patterns.search_all(query_string):
+            indicators.append(f"Injection pattern in query: {pattern}")
+            score += 25
         
         # Check for excessive parameter length (potential buffer overflow)
         if len(query_string) > 2000:
@@ -336,16 +350,9 @@ class SecurityAnalyzer:
         referer = request_info.get('referer', '')
         if referer and referer != 'None':
             # Check for suspicious referer patterns
-            suspicious_referer_patterns = [
-                r'\.tk$', r'\.ml$', r'\.ga$', r'\.cf$',  # Suspicious TLDs
-                r'bit\.ly', r'tinyurl', r'goo\.gl',      # URL shorteners
-                r'localhost', r'127\.0\.0\.1',          # Local references
-            ]
-            
-            for pattern in suspicious_referer_patterns:
-                if re.search(pattern, referer, re.IGNORECASE):
-                    indicators.append(f"Suspicious referer pattern: {pattern}")
-                    score += 10
+            for pattern in cls._suspicious_referers.search_all(referer):
+                indicators.append(f"Suspicious referer pattern: {pattern}")
+                score += 10
         
         # Check for missing expected headers
         if not request_info.get('host'):
@@ -370,9 +377,21 @@ class SecurityAnalyzer:
 class UserAgentParser:
     """Parse and classify user agents"""
     
+    # Traffic is dominated by a few hundred distinct user agents, so parse each once per worker
+    _parse_cache = LRUCache(maxsize=getattr(settings, 'SECURITY_MIDDLEWARE_SETTINGS', {}).get('USER_AGENT_CACHE_SIZE', 2048))
+    
     @classmethod
     def parse_user_agent(cls, user_agent_string: str) -> Dict[str, Any]:
         """Parse user agent string and return structured data"""
+        parsed = cls._parse_cache.get(user_agent_string)
+        if parsed is None:
+            parsed = cls._parse(user_agent_string)
+            cls._parse_cache.set(user_agent_string, parsed)
+        # Callers get their own copy so the cached entry cannot be mutated
+        return dict(parsed)
+    
+    @classmethod
+    def _parse(cls, user_agent_string: str) -> Dict[str, Any]:
         if not user_agent_string:
             return {
                 'browser': None,
@@ -463,15 +482,13 @@ class RateLimiter:
     """Rate limiting functionality"""
     
     @classmethod
-    def check_rate_limit(cls, identifier: str, request_info: Dict[str, Any]) -> Tuple[bool, Optional[RateLimitRule]]:
+    def check_rate_limit(cls, identifier: str, request_info: Dict[str, Any]) -> Tuple[bool, Optional[CompiledRateLimitRule]]:
         """
         Check if request should be rate limited
         Returns (should_block, matched_rule)
         """
-        # Get active rate limit rules
-        rules = RateLimitRule.objects.filter(is_active=True).order_by('priority')
-        
-        for rule in rules:
+        # Active rules come from the per-worker snapshot, counters from the backend
+        for rule in rate_limit_rules.get():
             if rule.matches_path(request_info['path']):
                 # Check if this rule applies to this request type
                 if not cls._rule_applies_to_request(rule, request_info):
@@ -484,7 +501,7 @@ class RateLimiter:
         return False, None
     
     @classmethod
-    def _rule_applies_to_request(cls, rule: RateLimitRule, request_info: Dict[str, Any]) -> bool:
+    def _rule_applies_to_request(cls, rule: CompiledRateLimitRule, request_info: Dict[str, Any]) -> bool:
         """Check if rule applies to this type of request"""
         if rule.applies_to == 'all':
             return True
@@ -498,93 +515,78 @@ class RateLimiter:
         return False
     
     @classmethod
-    def _check_rule_limit(cls, identifier: str, rule: RateLimitRule) -> bool:
+    def _check_rule_limit(cls, identifier: str, rule: CompiledRateLimitRule) -> bool:
         """Check if identifier has exceeded rate limit for this rule"""
-        now = timezone.now()
-        
-        # Get or create tracker
-        tracker, created = RateLimitTracker.objects.get_or_create(
-            identifier=identifier,
-            rule=rule,
-            defaults={
-                'request_count': 0,
-                'window_start': now,
-                'is_blocked': False,
-            }
-        )
-        
-        # Check if currently blocked
-        if tracker.is_currently_blocked:
-            return True
-        
-        # Check if we need to reset the window
-        window_end = tracker.window_start + timedelta(seconds=rule.time_window)
-        if now > window_end:
-            # Reset window
-            tracker.request_count = 0
-            tracker.window_start = now
-            tracker.is_blocked = False
-            tracker.blocked_until = None
-        
-        # Increment counter
-        tracker.request_count += 1
-        tracker.last_request = now
-        
-        # Check if limit exceeded
-        if tracker.request_count > rule.max_requests:
-            tracker.is_blocked = True
-            tracker.blocked_until = now + timedelta(seconds=rule.block_duration)
-            tracker.save()
-            return True
-        
-        tracker.save()
-        return False
+        return get_rate_limit_backend().hit(identifier, rule)
 
 
-class EnhancedSecurityMiddleware(MiddlewareMixin):
+class EnhancedSecurityMiddleware:
     """
     Enhanced security middleware with comprehensive monitoring and protection
     """
     
     def __init__(self, get_response):
         self.get_response = get_response
-        super().__init__(get_response)
+        
+        # Resolve settings once per worker instead of on every request
+        security_settings = getattr(settings, 'SECURITY_MIDDLEWARE_SETTINGS', {})
+        self.localhost_bypass = security_settings.get('DISABLE_RATE_LIMITING_FOR_LOCALHOST', True)
+        self.localhost_ips = frozenset(security_settings.get('LOCALHOST_IPS', ['127.0.0.1', '::1', 'localhost']))
+        self.local_network_ranges = tuple(security_settings.get('LOCAL_NETWORK_RANGES', ['192.168.', '10.', '172.']))
+        self.debug_bypass = security_settings.get('RESPECT_DEBUG_MODE', True) and getattr(settings, 'DEBUG', False)
+        self.route_classifier = RouteClassifier(security_settings.get('ROUTE_CLASSES', DEFAULT_ROUTE_CLASSES))
     
-    def process_request(self, request):
-        """Process incoming request with comprehensive security analysis"""
-        start_time = time.time()
+    def __call__(self, request):
+        route_class = self.route_classifier.classify(request.path)
+        context = self._build_context(request, route_class)
+        
+        if route_class.skips_checks:
+            # Static assets skip rate limiting, analysis and logging, but a
+            # blacklisted client is refused on every route
+            response = self._check_blacklist(context)
+            if response is None:
+                return self.get_response(request)
+        else:
+            response = self._check_request(request, context)
         
-        # Extract request information
-        request_info = self._extract_request_info(request)
+        if response is None:
+            response = self.get_response(request)
+        else:
+            context.blocked = True
         
+        self._log_response(request, context, response)
+        return response
+    
+    def _check_request(self, request, context: RequestContext):
+        """Run the blacklist, rate limit and analysis stages; return a response to block"""
         # Check blacklist rules first
-        if self._check_blacklist_rules(request_info):
-            self._log_blocked_request(request_info, "Blacklist match")
-            return HttpResponseForbidden("Access denied")
+        response = self._check_blacklist(context)
+        if response is not None:
+            return response
         
         # Skip rate limiting for localhost/development requests
         is_rate_limited = False
         rate_rule = None
-        identifier = self._get_rate_limit_identifier(request, request_info)
+        identifier = self._get_rate_limit_identifier(request, context)
         
-        if self._is_localhost_request(request_info):
+        if context.is_local:
             # Log that rate limiting is being skipped for localhost
-            logger.debug(f"Rate limiting skipped for localhost request from {request_info['remote_addr']}")
+            logger.debug(f"Rate limiting skipped for localhost request from {context.remote_addr}")
         else:
             # Check rate limiting
-            is_rate_limited, rate_rule = RateLimiter.check_rate_limit(identifier, request_info)
+            is_rate_limited, rate_rule = RateLimiter.check_rate_limit(identifier, context)
         
         if is_rate_limited and rate_rule is not None:
             rule_name = rate_rule.name
             block_duration = rate_rule.block_duration
             
-            self._log_blocked_request(request_info, f"Rate limit exceeded: {rule_name}")
+            self._log_blocked_request(context, f"Rate limit exceeded: {rule_name}")
             self._create_security_alert(
                 'rate_limit',
                 'warning',
                 f"Rate limit exceeded for {identifier}",
-                f"Rule: {rule_name}, Path: {request_info['path']}",
-                request_info
+                f"Rule: {rule_name}, Path: {context.path}",
+                context
             )
             return JsonResponse({
                 'error': 'Rate limit exceeded',
@@ -592,79 +594,59 @@ class EnhancedSecurityMiddleware(MiddlewareMixin):
             }, status=429)
         elif is_rate_limited:
             # Fallback case if rate_rule is None but is_rate_limited is True
-            self._log_blocked_request(request_info, "Rate limit exceeded: Unknown rule")
+            self._log_blocked_request(context, "Rate limit exceeded: Unknown rule")
             self._create_security_alert(
                 'rate_limit',
                 'warning',
                 f"Rate limit exceeded for {identifier}",
-                f"Path: {request_info['path']}",
-                request_info
+                f"Path: {context.path}",
+                context
             )
             return JsonResponse({
                 'error': 'Rate limit exceeded',
                 'retry_after': 300  # Default 5 minutes
             }, status=429)
         
-        # Perform security analysis
-        is_suspicious, risk_score, threat_indicators = SecurityAnalyzer.analyze_request(request_info)
-        
-        # Store analysis results in request for later use
-        request._security_analysis = {
-            'is_suspicious': is_suspicious,
-            'risk_score': risk_score,
-            'threat_indicators': threat_indicators,
-            'start_time': start_time,
-        }
+        # Perform security analysis and keep the results on the context for logging
+        is_suspicious, risk_score, threat_indicators = SecurityAnalyzer.analyze_request(context)
+        context.is_suspicious = is_suspicious
+        context.risk_score = risk_score
+        context.threat_indicators = threat_indicators
         
         # Block high-risk requests
         if risk_score >= 80:
-            self._log_blocked_request(request_info, f"High risk score: {risk_score}")
+            self._log_blocked_request(context, f"High risk score: {risk_score}")
             self._create_security_alert(
                 'high_risk_request',
                 'error',
                 f"High risk request blocked (Score: {risk_score})",
-                f"Path: {request_info['path']}, Indicators: {', '.join(threat_indicators)}",
-                request_info
+                f"Path: {context.path}, Indicators: {', '.join(threat_indicators)}",
+                context
             )
             return HttpResponseForbidden("Access denied")
         
         return None
     
-    def process_response(self, request, response):
-        """Process response and log security information"""
-        # Calculate response time
-        analysis = getattr(request, '_security_analysis', {})
-        start_time = analysis.get('start_time', time.time())
-        response_time = (time.time() - start_time) * 1000  # Convert to milliseconds
+    def _log_response(self, request, context: RequestContext, response):
+        """Record the response on the context and log the request"""
+        context.response_status = response.status_code
+        context.response_time = (time.time() - context.start_time) * 1000  # Convert to milliseconds
         
-        # Extract request information
-        request_info = self._extract_request_info(request)
-        request_info['response_status'] = response.status_code
-        request_info['response_time'] = response_time
+        # Sampled route classes only log blocked or alert-worthy requests in full
+        if not (context.blocked or context.risk_score >= 60 or context.route_class.should_log()):
+            return
         
-        # Log the request asynchronously
-        self._log_security_request(request_info, analysis)
+        # User and session are only available after the inner middleware ran
+        context.update_identity(request)
         
-        return response
+        # Log the request off the response path
+        self._log_security_request(context)
     
-    def _extract_request_info(self, request) -> Dict[str, Any]:
-        """Extract comprehensive request information"""
-        return {
-            'timestamp': timezone.now(),
-            'method': request.method,
-            'path': request.path,
-            'query_string': request.META.get('QUERY_STRING', ''),
-            'remote_addr': self._get_client_ip(request),
-            'user_agent': request.META.get('HTTP_USER_AGENT', ''),
-            'referer': request.META.get('HTTP_REFERER', ''),
-            'host': request.META.get('HTTP_HOST', ''),
-            'content_type': request.META.get('CONTENT_TYPE', ''),
-            'x_forwarded_for': request.META.get('HTTP_X_FORWARDED_FOR', ''),
-            'x_real_ip': request.META.get('HTTP_X_REAL_IP', ''),
-            'x_forwarded_proto': request.META.get('HTTP_X_FORWARDED_PROTO', ''),
-            'user': request.user if hasattr(request, 'user') and request.user.is_authenticated else None,
-            'session_key': request.session.session_key if hasattr(request, 'session') else None,
-        }
+    def _build_context(self, request, route_class: RouteClass = DEFAULT_ROUTE_CLASS) -> RequestContext:
+        """Extract request information once for every stage"""
+        context = RequestContext(request, self._get_client_ip(request), time.time(), route_class)
+        context.is_local = self._is_localhost_request(context)
+        return context
     
     def _get_client_ip(self, request) -> str:
         """Get the real client IP address"""
@@ -675,188 +657,105 @@ class EnhancedSecurityMiddleware(MiddlewareMixin):
             ip = request.META.get('REMOTE_ADDR', '127.0.0.1')
         return ip
     
-    def _is_localhost_request(self, request_info: Dict[str, Any]) -> bool:
+    def _is_localhost_request(self, context: RequestContext) -> bool:
         """Check if request is from localhost/development environment"""
-        # Get security settings
-        security_settings = getattr(settings, 'SECURITY_MIDDLEWARE_SETTINGS', {})
-        
         # Check if localhost rate limiting is disabled
-        if not security_settings.get('DISABLE_RATE_LIMITING_FOR_LOCALHOST', True):
+        if not self.localhost_bypass:
             return False
         
-        remote_addr = request_info['remote_addr']
+        remote_addr = context.remote_addr
         
-        # Get localhost IPs from settings
-        localhost_ips = security_settings.get('LOCALHOST_IPS', ['127.0.0.1', '::1', 'localhost'])
-        if remote_addr in localhost_ips:
+        if remote_addr in self.localhost_ips:
             return True
-            
-        # Get local network ranges from settings
-        local_ranges = security_settings.get('LOCAL_NETWORK_RANGES', ['192.168.', '10.', '172.'])
-        if any(remote_addr.startswith(prefix) for prefix in local_ranges):
+        
+        if remote_addr.startswith(self.local_network_ranges):
             return True
-            
+        
         # Check if running in DEBUG mode (if enabled in settings)
-        if security_settings.get('RESPECT_DEBUG_MODE', True) and getattr(settings, 'DEBUG', False):
-            return True
-            
-        return False
+        return self.debug_bypass
     
-    def _get_rate_limit_identifier(self, request, request_info: Dict[str, Any]) -> str:
+    def _get_rate_limit_identifier(self, request, context: RequestContext) -> str:
         """Get identifier for rate limiting (IP or user)"""
-        if request_info['user']:
-            return f"user:{request_info['user'].id}"
+        if context.user:
+            return f"user:{context.user.id}"
         else:
-            return f"ip:{request_info['remote_addr']}"
+            return f"ip:{context.remote_addr}"
     
-    def _check_blacklist_rules(self, request_info: Dict[str, Any]) -> bool:
+    def _check_blacklist(self, context: RequestContext):
+        """Return a 403 response if the request matches a blacklist rule"""
+        if self._check_blacklist_rules(context):
+            self._log_blocked_request(context, "Blacklist match")
+            return HttpResponseForbidden("Access denied")
+        return None
+    
+    def _check_blacklist_rules(self, context: RequestContext) -> bool:
         """Check if request matches any blacklist rules"""
         # Skip blacklist checking for localhost admin access in development
-        if self._is_localhost_request(request_info) and request_info['path'].startswith('/admin/'):
-            logger.debug(f"Blacklist check skipped for localhost admin access: {request_info['path']}")
+        if context.is_local and context.path.startswith('/admin/'):
+            logger.debug(f"Blacklist check skipped for localhost admin access: {context.path}")
             return False
         
-        rules = BlacklistRule.objects.filter(is_active=True)
-        
-        for rule in rules:
-            value = None
-            
-            if rule.rule_type == 'ip':
-                value = request_info['remote_addr']
-            elif rule.rule_type == 'ip_range':
-                value = request_info['remote_addr']
-            elif rule.rule_type == 'user_agent':
-                value = request_info['user_agent']
-            elif rule.rule_type == 'path':
-                value = request_info['path']
-            elif rule.rule_type == 'referer':
-                value = request_info['referer']
-            # Note: country checking would require geolocation lookup
-            
-            if value and rule.matches(value):
-                # Additional check: Skip admin path rules for localhost in development
-                if (rule.rule_type == 'path' and 
-                    self._is_localhost_request(request_info) and 
-                    request_info['path'].startswith('/admin/')):
-                    logger.debug(f"Admin path blacklist rule skipped for localhost: {rule.pattern}")
-                    continue
-                
-                rule.record_match()
-                return True
-        
-        return False
+        # Rules come from the per-worker compiled snapshot, so the steady-state
+        # path costs one cache read instead of a query plus per-rule compilation
+        rule = blacklist_snapshot.find_match(context)
+        if rule is None:
+            return False
+
+        rule.record_match()
+        return True
     
-    def _log_security_request(self, request_info: Dict[str, Any], analysis: Dict[str, Any]):
-        """Log security request to database (asynchronously)"""
-        try:
-            # Get or create IP address record
-            ip_obj, ip_created = IPAddress.objects.get_or_create(
-                ip_address=request_info['remote_addr'],
-                defaults={'reputation_score': 50}
-            )
-            
-            # Update IP statistics
-            ip_obj.total_requests += 1
-            if analysis.get('is_suspicious', False):
-                ip_obj.suspicious_requests += 1
-            ip_obj.save(update_fields=['total_requests', 'suspicious_requests', 'last_seen'])
-            
-            # Get or create user agent record
-            user_agent_string = request_info['user_agent']
-            if user_agent_string:
-                ua_hash = hashlib.sha256(user_agent_string.encode('utf-8')).hexdigest()
-                ua_obj, ua_created = UserAgent.objects.get_or_create(
-                    user_agent_hash=ua_hash,
-                    defaults={
-                        'user_agent_string': user_agent_string,
-                        **UserAgentParser.parse_user_agent(user_agent_string)
-                    }
-                )
-                
-                # Update user agent statistics
-                ua_obj.request_count += 1
-                ua_obj.save(update_fields=['request_count', 'last_seen'])
-            else:
-                # Create a default user agent for empty strings
-                ua_obj, ua_created = UserAgent.objects.get_or_create(
-                    user_agent_hash='empty',
-                    defaults={
-                        'user_agent_string': '',
-                        'device_type': 'unknown',
-                        'is_bot': False,
-                        'is_mobile': False,
-                    }
-                )
-            
-            # Create security log entry
-            risk_score = analysis.get('risk_score', 0)
-            SecurityLog.objects.create(
-                ip_address=ip_obj,
-                user_agent=ua_obj,
-                method=request_info['method'],
-                path=request_info['path'],
-                query_string=request_info['query_string'],
-                referer=request_info['referer'],
-                host=request_info['host'],
-                content_type=request_info['content_type'],
-                is_suspicious=analysis.get('is_suspicious', False),
-                risk_level=SecurityAnalyzer.get_risk_level(risk_score),
-                risk_score=risk_score,
-                user=request_info['user'],
-                session_key=request_info['session_key'],
-                response_status=request_info.get('response_status'),
-                response_time=request_info.get('response_time'),
-                blocked=False,
-                x_forwarded_for=request_info['x_forwarded_for'],
-                x_real_ip=request_info['x_real_ip'],
-                x_forwarded_proto=request_info['x_forwarded_proto'],
-                threat_indicators=analysis.get('threat_indicators', []),
-            )
-            
-            # Update IP reputation if needed
-            if analysis.get('is_suspicious', False):
-                ip_obj.update_reputation()
-            
-            # Create alerts for high-risk requests
-            if risk_score >= 60:
-                self._create_security_alert(
-                    'suspicious_activity',
-                    'warning' if risk_score < 80 else 'error',
-                    f"Suspicious activity detected (Score: {risk_score})",
-                    f"Path: {request_info['path']}, IP: {request_info['remote_addr']}",
-                    request_info
-                )
-        
-        except Exception as e:
-            logger.error(f"Error logging security request: {e}")
+    def _log_security_request(self, context: RequestContext):
+        """Queue the request for the background security log writer"""
+        risk_score = context.risk_score
+        user = context.user
+        security_log_writer.submit({
+            'remote_addr': context.remote_addr,
+            'user_agent': context.user_agent,
+            'method': context.method,
+            'path': context.path,
+            'query_string': context.query_string,
+            'referer': context.referer,
+            'host': context.host,
+            'content_type': context.content_type,
+            'is_suspicious': context.is_suspicious,
+            'risk_level': SecurityAnalyzer.get_risk_level(risk_score),
+            'risk_score': risk_score,
+            'user_id': user.pk if user is not None else None,
+            'session_key': context.session_key,
+            'response_status': context.response_status,
+            'response_time': context.response_time,
+            'x_forwarded_for': context.x_forwarded_for,
+            'x_real_ip': context.x_real_ip,
+            'x_forwarded_proto': context.x_forwarded_proto,
+            'threat_indicators': list(context.threat_indicators),
+        })
     
-    def _log_blocked_request(self, request_info: Dict[str, Any], reason: str):
+    def _log_blocked_request(self, context: RequestContext, reason: str):
         """Log blocked request"""
         try:
-            # Get or create IP address record
-            ip_obj, _ = IPAddress.objects.get_or_create(
-                ip_address=request_info['remote_addr'],
-                defaults={'reputation_score': 50}
-            )
-            
-            # Update blocked requests counter
-            ip_obj.blocked_requests += 1
-            ip_obj.total_requests += 1
-            ip_obj.suspicious_requests += 1
-            ip_obj.save(update_fields=['blocked_requests', 'total_requests', 'suspicious_requests', 'last_seen'])
+            # Count the block; the request itself is counted when it is logged,
+            # and reputation is recomputed when the counters are flushed
+            ip = normalize_ip(context.remote_addr)
+            if ip is not None:
+                request_counters.add_ip(ip, total=0, suspicious=1, blocked=1)
+                request_counters.maybe_flush()
             
-            # Update reputation
-            ip_obj.update_reputation()
-            
-            logger.warning(f"BLOCKED REQUEST: {reason} - {request_info['method']} {request_info['path']} from {request_info['remote_addr']}")
+            logger.warning(f"BLOCKED REQUEST: {reason} - {context.method} {context.path} from {context.remote_addr}")
         
         except Exception as e:
             logger.error(f"Error logging blocked request: {e}")
     
-    def _create_security_alert(self, alert_type: str, severity: str, title: str, description: str, request_info: Dict[str, Any]):
+    def _create_security_alert(self, alert_type: str, severity: str, title: str, description: str, context: RequestContext):
         """Create security alert"""
         try:
-            ip_obj = IPAddress.objects.filter(ip_address=request_info['remote_addr']).first()
+            # The blocked request's counters may not have been flushed yet
+            ip = normalize_ip(context.remote_addr)
+            ip_obj = None
+            if ip is not None:
+                ip_obj, _ = IPAddress.objects.get_or_create(
+                    ip_address=ip,
+                    defaults={'reputation_score': 50}
+                )
             
             SecurityAlert.objects.create(
                 alert_type=alert_type,
@@ -865,10 +764,10 @@ class EnhancedSecurityMiddleware(MiddlewareMixin):
                 description=description,
                 ip_address=ip_obj,
                 additional_data={
-                    'path': request_info['path'],
-                    'method': request_info['method'],
-                    'user_agent': request_info['user_agent'],
-                    'referer': request_info['referer'],
+                    'path': context.path,
+                    'method': context.method,
+                    'user_agent': context.user_agent,
+                    'referer': context.referer,
                 }
             )
         
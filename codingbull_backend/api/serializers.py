@@ -1,29 +1,102 @@
+from django.db import models
 from rest_framework import serializers
+from rest_framework.settings import api_settings
 from .models import Category, BlogPost, Project, Service, ContactInquiry, Testimonial
+from .media_urls import get_media_url_resolver
 
 
+class SparseFieldsMixin:
+    """
+    Limit the output to the fields named in ?fields=id,title,... of the
+    request. Unknown names are ignored, and a list naming no known field
+    leaves the output unchanged. Only serializers built with the request in
+    their context are affected, so nested serializers keep all their fields.
+    """
+    # Also read by CachedResponseMixin, which keys cached responses on it
+    fields_query_param = 'fields'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        query_params = getattr(request, 'query_params', None)
+        if not query_params or not query_params.get(self.fields_query_param):
+            return
+        requested = {name.strip() for name in query_params[self.fields_query_param].split(',')}
+        if requested & set(self.fields):
+            for name in set(self.fields) - requested:
+                self.fields.pop(name)
+
+class MediaFileField(serializers.FileField):
+    """FileField whose URL comes from the request's MediaURLResolver"""
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        if not getattr(self, 'use_url', api_settings.UPLOADED_FILES_USE_URL):
+            return value.name
+        return get_media_url_resolver(self.context.get('request')).url(value)
+
+class MediaImageField(MediaFileField, serializers.ImageField):
+    pass
+
+class MediaURLMixin:
+    """
+    media_url(file) for method fields, and model file/image fields rendered
+    through the same MediaURLResolver instead of build_absolute_uri() per field
+    """
+    serializer_field_mapping = {
+        **serializers.ModelSerializer.serializer_field_mapping,
+        models.FileField: MediaFileField,
+        models.ImageField: MediaImageField,
+    }
+
+    def media_url(self, file):
+        return get_media_url_resolver(self.context.get('request')).url(file)
+
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = Category
         fields = ['id', 'name']
 
-class BlogPostSerializer(serializers.ModelSerializer):
+class CategoryPostCountSerializer(CategorySerializer):
+    # Annotated live count when present, else the denormalised column
+    post_count = serializers.SerializerMethodField()
+
+    def get_post_count(self, obj):
+        return getattr(obj, 'live_post_count', obj.post_count)
+
+    class Meta(CategorySerializer.Meta):
+        fields = CategorySerializer.Meta.fields + ['post_count']
+
+class BlogPostSerializer(SparseFieldsMixin, MediaURLMixin, serializers.ModelSerializer):
     category = CategorySerializer(read_only=True)
     image_url = serializers.SerializerMethodField()
     
     def get_image_url(self, obj):
-        if obj.image:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.image.url)
-            return obj.image.url
-        return None
+        return self.media_url(obj.image)
     
     class Meta:
         model = BlogPost
         fields = ['id', 'title', 'slug', 'content', 'excerpt', 'author', 'published_date', 'category', 'image', 'image_url', 'tags']
 
-class TestimonialSerializer(serializers.ModelSerializer):
+class BlogPostListSerializer(BlogPostSerializer):
+    """Blog cards: everything but the article body"""
+    # Highlighted match in the content, only present in ?search= results
+    search_snippet = serializers.CharField(read_only=True, required=False)
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if data.get('search_snippet') is None:
+            data.pop('search_snippet', None)
+        return data
+
+    class Meta(BlogPostSerializer.Meta):
+        fields = [
+            'id', 'title', 'slug', 'excerpt', 'author', 'published_date', 'category', 'image', 'image_url', 'tags',
+            'search_snippet'
+        ]
+
+class TestimonialSerializer(MediaURLMixin, serializers.ModelSerializer):
     project_title = serializers.CharField(source='project.title', read_only=True)
     project_id = serializers.IntegerField(source='project.id', read_only=True)
     image = serializers.SerializerMethodField()
@@ -33,16 +106,10 @@ class TestimonialSerializer(serializers.ModelSerializer):
         Return the appropriate logo image for the testimonial
         Priority: testimonial.image -> project.client_logo -> None
         """
-        request = self.context.get('request')
-        
         if obj.image:
-            if request:
-                return request.build_absolute_uri(obj.image.url)
-            return obj.image.url
+            return self.media_url(obj.image)
         elif obj.project and obj.project.client_logo:
-            if request:
-                return request.build_absolute_uri(obj.project.client_logo.url)
-            return obj.project.client_logo.url
+            return self.media_url(obj.project.client_logo)
         
         return None
     
@@ -59,7 +126,7 @@ class TestimonialSerializer(serializers.ModelSerializer):
             'project_title'
         ]
 
-class ProjectSerializer(serializers.ModelSerializer):
+class ProjectSerializer(SparseFieldsMixin, MediaURLMixin, serializers.ModelSerializer):
     testimonials = TestimonialSerializer(many=True, read_only=True)
     # Map field names to match frontend expectations
     client = serializers.CharField(source='client_name', read_only=True)
@@ -68,20 +135,10 @@ class ProjectSerializer(serializers.ModelSerializer):
     technologies = serializers.JSONField(source='tech_used', read_only=True)
     
     def get_image(self, obj):
-        if obj.project_image:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.project_image.url)
-            return obj.project_image.url
-        return None
+        return self.media_url(obj.project_image)
     
     def get_logo(self, obj):
-        if obj.client_logo:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.client_logo.url)
-            return obj.client_logo.url
-        return None
+        return self.media_url(obj.client_logo)
     
     # Create testimonial object from individual fields
     testimonial = serializers.SerializerMethodField()
@@ -107,20 +164,23 @@ class ProjectSerializer(serializers.ModelSerializer):
             'testimonials'
         ]
 
-class ServiceSerializer(serializers.ModelSerializer):
+class ProjectListSerializer(ProjectSerializer):
+    """
+    Project listing without the nested testimonials. The case study fields
+    stay because the projects pages open their detail modals from the list.
+    """
+    class Meta(ProjectSerializer.Meta):
+        fields = [name for name in ProjectSerializer.Meta.fields if name != 'testimonials']
+
+class ServiceSerializer(SparseFieldsMixin, MediaURLMixin, serializers.ModelSerializer):
     image = serializers.SerializerMethodField()
     title = serializers.CharField(source='name', read_only=True)  # Frontend expects 'title'
     
     def get_image(self, obj):
         # Always return an absolute URL for the image
-        request = self.context.get('request')
         if obj.image_url:
             return obj.image_url
-        elif obj.icon:
-            if request:
-                return request.build_absolute_uri(obj.icon.url)
-            return obj.icon.url  # This will be a relative URL if no request context
-        return None
+        return self.media_url(obj.icon)  # Relative if there is no request context or MEDIA_BASE_URL
     
     class Meta:
         model = Service
@@ -130,6 +190,14 @@ class ServiceSerializer(serializers.ModelSerializer):
             'process_steps', 'technologies', 'faqs', 'related_services'
         ]
 
+class ServiceListSerializer(ServiceSerializer):
+    """Service cards: the detail page content (FAQs, process, long copy) is left out"""
+    class Meta(ServiceSerializer.Meta):
+        fields = [
+            'id', 'name', 'title', 'slug', 'summary', 'description',
+            'icon', 'icon_emoji', 'image_url', 'image', 'features'
+        ]
+
 class ContactInquirySerializer(serializers.ModelSerializer):
     class Meta:
         model = ContactInquiry
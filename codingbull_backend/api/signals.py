@@ -0,0 +1,136 @@
+"""
+Model signal handlers
+Keeps per-worker caches in sync with admin and management command edits
+"""
+
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+
+from .models import (
+    BlacklistRule, IPAddress, RateLimitRule, UserAgent,
+    BlogPost, Category, Project, Service, Testimonial,
+)
+from .blacklist import bump_blacklist_generation
+from .rate_limit import bump_rate_limit_generation
+from .response_cache import bump_content_generation
+from .search import get_search_backend
+from .security_log_writer import user_agent_ids
+
+# Fields written by match bookkeeping; they never change what a rule matches
+BLACKLIST_STATS_FIELDS = frozenset({'match_count', 'last_matched'})
+
+
+def bump_on_commit(bump, *args):
+    """
+    Run a generation bump once the surrounding transaction commits (at once
+    outside one). Bumping earlier would let a concurrent request rebuild its
+    snapshot or cache entry from the old rows under the new generation.
+    """
+    transaction.on_commit(partial(bump, *args))
+
+
+@receiver(post_save, sender=BlacklistRule)
+def blacklist_rule_saved(sender, instance, update_fields=None, **kwargs):
+    """Invalidate blacklist snapshots when a rule changes"""
+    if update_fields and set(update_fields) <= BLACKLIST_STATS_FIELDS:
+        return
+    bump_on_commit(bump_blacklist_generation)
+
+
+@receiver(post_delete, sender=BlacklistRule)
+def blacklist_rule_deleted(sender, instance, **kwargs):
+    """Invalidate blacklist snapshots when a rule is removed"""
+    bump_on_commit(bump_blacklist_generation)
+
+
+@receiver(post_save, sender=IPAddress)
+def ip_address_saved(sender, instance, created=False, update_fields=None, **kwargs):
+    """Invalidate blacklist snapshots when an address may have been (un)blacklisted"""
+    if update_fields and 'is_blacklisted' not in update_fields:
+        return
+    if created and not instance.is_blacklisted:
+        return
+    bump_on_commit(bump_blacklist_generation)
+
+
+@receiver(post_delete, sender=IPAddress)
+def ip_address_deleted(sender, instance, **kwargs):
+    """Invalidate blacklist snapshots when a blacklisted address is removed"""
+    if instance.is_blacklisted:
+        bump_on_commit(bump_blacklist_generation)
+
+
+@receiver(post_save, sender=RateLimitRule)
+@receiver(post_delete, sender=RateLimitRule)
+def rate_limit_rule_changed(sender, instance, **kwargs):
+    """Invalidate rate limit rule snapshots when a rule changes"""
+    bump_on_commit(bump_rate_limit_generation)
+
+
+@receiver(post_delete, sender=UserAgent)
+def user_agent_deleted(sender, instance, **kwargs):
+    """Forget the cached primary key of a deleted user agent"""
+    user_agent_ids.discard(instance.user_agent_string)
+
+
+@receiver(post_save, sender=BlogPost)
+@receiver(post_delete, sender=BlogPost)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=Project)
+@receiver(post_save, sender=Service)
+@receiver(post_delete, sender=Service)
+@receiver(post_save, sender=Testimonial)
+@receiver(post_delete, sender=Testimonial)
+def content_changed(sender, instance, **kwargs):
+    """Invalidate cached API responses built from the changed model"""
+    bump_on_commit(bump_content_generation, sender)
+
+
+@receiver(pre_save, sender=BlogPost)
+def blog_post_saving(sender, instance, raw=False, **kwargs):
+    """Remember the category a post is moving away from, and copy its category's name"""
+    instance._previous_category_id = None
+    if raw:
+        return
+    if instance.pk:
+        instance._previous_category_id = sender.objects.filter(pk=instance.pk).values_list(
+            'category_id', flat=True
+        ).first()
+    instance.category_name = instance.category.name if instance.category_id else ''
+
+
+@receiver(post_save, sender=BlogPost)
+def blog_post_saved(sender, instance, created, raw=False, **kwargs):
+    """Keep Category.post_count current for the old and new category"""
+    if raw:
+        return
+    previous_category_id = getattr(instance, '_previous_category_id', None)
+    if created or previous_category_id != instance.category_id:
+        Category.refresh_post_counts([previous_category_id, instance.category_id])
+    get_search_backend().index_posts([instance])
+
+
+@receiver(post_delete, sender=BlogPost)
+def blog_post_deleted(sender, instance, **kwargs):
+    Category.refresh_post_counts([instance.category_id])
+    get_search_backend().remove_posts([instance.pk])
+
+
+@receiver(post_save, sender=Category)
+def category_saved(sender, instance, created, raw=False, **kwargs):
+    """Category names are searchable, so a rename re-indexes the category's posts"""
+    if not created and not raw:
+        instance.blog_posts.exclude(category_name=instance.name).update(category_name=instance.name)
+        get_search_backend().index_posts(instance.blog_posts.select_related('category'))
+
+
+@receiver(post_delete, sender=Category)
+def category_deleted(sender, instance, **kwargs):
+    # SET_NULL updated the posts without signals
+    BlogPost.objects.filter(category__isnull=True).exclude(category_name='').update(category_name='')
+    get_search_backend().index_posts(BlogPost.objects.filter(category__isnull=True))
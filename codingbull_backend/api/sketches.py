@@ -0,0 +1,139 @@
+"""
+Latency Sketches
+Mergeable quantile sketches for duration metrics, small enough to store one
+per rollup row
+"""
+
+import math
+from typing import Any, Dict, Iterable, Optional
+
+# Quantile estimates are within 1% of the true value
+DEFAULT_RELATIVE_ACCURACY = 0.01
+# Beyond this many buckets the lowest ones are folded together, which only
+# costs accuracy at the fast end of the distribution
+DEFAULT_MAX_BUCKETS = 1024
+
+
+class LatencySketch:
+    """
+    Log-bucketed histogram of non-negative values (DDSketch).
+
+    A value v > 0 lands in bucket ceil(log_gamma(v)) with
+    gamma = (1 + a) / (1 - a), so every quantile is answered with relative
+    error a regardless of the distribution. Two sketches with the same
+    accuracy merge by adding bucket counts, which is what lets hourly rows
+    be combined into any range without the raw values. Count, sum, min and
+    max are kept exactly.
+    """
+
+    __slots__ = ('relative_accuracy', 'max_buckets', 'gamma', '_log_gamma', 'buckets', 'zero_count',
+                 'count', 'total', 'min', 'max')
+
+    def __init__(self, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY, max_buckets: int = DEFAULT_MAX_BUCKETS):
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def add(self, value: float, weight: int = 1):
+        if value < 0:
+            raise ValueError('LatencySketch only holds non-negative values')
+        if value == 0:
+            self.zero_count += weight
+        else:
+            index = math.ceil(math.log(value) / self._log_gamma)
+            self.buckets[index] = self.buckets.get(index, 0) + weight
+        self.count += weight
+        self.total += value * weight
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        if len(self.buckets) > self.max_buckets:
+            self._collapse()
+
+    def update(self, values: Iterable[float]):
+        for value in values:
+            self.add(value)
+
+    def merge(self, other: 'LatencySketch'):
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError('Only sketches with the same relative accuracy can be merged')
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        if len(self.buckets) > self.max_buckets:
+            self._collapse()
+
+    def _collapse(self):
+        indexes = sorted(self.buckets)
+        excess = len(indexes) - self.max_buckets
+        folded = sum(self.buckets.pop(index) for index in indexes[:excess])
+        target = indexes[excess]
+        self.buckets[target] += folded
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate of the q-quantile (0 <= q <= 1), None when empty"""
+        if self.count == 0:
+            return None
+        if q <= 0:
+            return self.min
+        if q >= 1:
+            return self.max
+
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if rank < seen:
+                # Midpoint of the bucket (gamma^(i-1), gamma^i] in relative terms
+                value = 2 * self.gamma ** index / (1 + self.gamma)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.total / self.count if self.count else None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-ready form; bucket keys become strings"""
+        return {
+            'a': self.relative_accuracy,
+            'z': self.zero_count,
+            'b': {str(index): count for index, count in self.buckets.items()},
+            'n': self.count,
+            's': self.total,
+            'min': self.min,
+            'max': self.max,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]], max_buckets: int = DEFAULT_MAX_BUCKETS) -> 'LatencySketch':
+        if not data:
+            return cls(max_buckets=max_buckets)
+        sketch = cls(data.get('a', DEFAULT_RELATIVE_ACCURACY), max_buckets)
+        sketch.zero_count = data.get('z', 0)
+        sketch.buckets = {int(index): count for index, count in data.get('b', {}).items()}
+        sketch.count = data.get('n', 0)
+        sketch.total = data.get('s', 0.0)
+        sketch.min = data.get('min')
+        sketch.max = data.get('max')
+        return sketch
+
+    @classmethod
+    def merged(cls, sketches: Iterable['LatencySketch']) -> 'LatencySketch':
+        result = cls()
+        for sketch in sketches:
+            result.merge(sketch)
+        return result
@@ -0,0 +1,263 @@
+"""
+Telemetry Ingestion
+Builds ErrorLog/PerformanceLog/UserSession rows from the browser client's
+events, singly or in batches persisted with one bulk write per model
+"""
+
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import ErrorLog, PerformanceLog, UserSession
+from .rollups import record_error_occurrences, record_performance_logs
+
+# The 'kind' of a batched event, named after the single-event endpoint it replaces
+EVENT_KINDS = ('error', 'performance', 'session', 'session-update')
+
+MAX_INTEGER = 2147483647
+
+# Copied from the latest occurrence onto the open ErrorLog row
+ERROR_CONTEXT_FIELDS = (
+    'stack_trace', 'component_stack', 'url', 'user_agent', 'browser_info', 'user_id', 'session_id',
+    'page_load_time', 'memory_usage', 'breadcrumbs', 'extra_data',
+)
+
+
+def get_batch_max_events() -> int:
+    return getattr(settings, 'TELEMETRY_BATCH_MAX_EVENTS', 200)
+
+
+def build_error_log(data: Dict[str, Any]) -> ErrorLog:
+    return ErrorLog(
+        error_type=data.get('type', 'javascript'),
+        severity=data.get('severity', 'medium'),
+        message=data.get('message', ''),
+        stack_trace=data.get('stack', ''),
+        component_stack=data.get('component_stack', ''),
+        url=data.get('url', ''),
+        user_agent=data.get('userAgent', ''),
+        browser_info=data.get('browserInfo', {}),
+        user_id=data.get('userId'),
+        session_id=data.get('sessionId'),
+        page_load_time=data.get('pageLoadTime'),
+        memory_usage=data.get('memoryUsage'),
+        breadcrumbs=data.get('breadcrumbs', []),
+        extra_data=data.get('extra_data', {})
+    )
+
+
+def build_performance_log(data: Dict[str, Any]) -> PerformanceLog:
+    return PerformanceLog(
+        metric_type=data.get('type', 'page_load'),
+        duration=data.get('duration', 0),
+        url=data.get('url', ''),
+        user_agent=data.get('userAgent', ''),
+        user_id=data.get('userId'),
+        session_id=data.get('sessionId'),
+        metrics=data.get('metrics', {})
+    )
+
+
+def build_user_session(data: Dict[str, Any], ip_address=None) -> UserSession:
+    return UserSession(
+        session_id=data.get('sessionId'),
+        user_id=data.get('userId'),
+        user_agent=data.get('userAgent', ''),
+        browser_info=data.get('browserInfo', {}),
+        ip_address=ip_address,
+    )
+
+
+def clean_event_instance(instance: models.Model):
+    """
+    Coerce the client-supplied values of instance to what its columns hold.
+
+    Strings are truncated to max_length and numbers rounded, so one odd
+    event cannot make a whole bulk_create fail. Values that cannot be
+    stored at all raise ValidationError.
+    """
+    for field in instance._meta.concrete_fields:
+        if field.primary_key or getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False):
+            continue
+        value = getattr(instance, field.attname)
+
+        if value is None:
+            if isinstance(field, (models.CharField, models.TextField)) and not field.null:
+                setattr(instance, field.attname, '')
+            elif not field.null:
+                raise ValidationError(f"{field.name} is required")
+            continue
+
+        if isinstance(field, (models.CharField, models.TextField)):
+            value = value if isinstance(value, str) else str(value)
+            if field.max_length:
+                value = value[:field.max_length]
+        elif isinstance(field, models.IntegerField):
+            try:
+                value = round(float(value))
+            except (TypeError, ValueError, OverflowError):
+                raise ValidationError(f"{field.name} must be a number")
+            if isinstance(field, models.PositiveIntegerField) and value < 0:
+                raise ValidationError(f"{field.name} must not be negative")
+            value = min(value, MAX_INTEGER)
+        elif isinstance(field, models.JSONField):
+            expected = type(field.get_default())
+            if not isinstance(value, expected):
+                raise ValidationError(f"{field.name} must be a JSON {'array' if expected is list else 'object'}")
+        elif isinstance(field, models.BooleanField):
+            value = bool(value)
+        setattr(instance, field.attname, value)
+
+
+def _update_open_error_log(fingerprint: str, changes: Dict[str, Any]) -> Optional[int]:
+    """Apply changes to the open row with fingerprint; its pk, or None if there is none"""
+    pk = ErrorLog.objects.filter(fingerprint=fingerprint, is_resolved=False).values_list('pk', flat=True).first()
+    # is_resolved again: the row may have been resolved since the lookup
+    if pk is not None and ErrorLog.objects.filter(pk=pk, is_resolved=False).update(**changes):
+        return pk
+    return None
+
+
+def upsert_error_log(error_log: ErrorLog, occurrences: int = 1) -> Tuple[int, bool]:
+    """
+    Record occurrences of error_log against the open row with its
+    fingerprint, or insert it as a new row. Returns the row's pk and
+    whether it was inserted.
+
+    The UPDATE is tried first since most errors are repeats. A concurrent
+    insert of the same fingerprint trips the partial unique constraint and
+    is retried as an UPDATE, so no occurrence is lost.
+    """
+    if not error_log.fingerprint:
+        error_log.fingerprint = error_log.compute_fingerprint()
+    changes = {field: getattr(error_log, field) for field in ERROR_CONTEXT_FIELDS}
+    changes.update(count=F('count') + occurrences, last_seen=timezone.now())
+
+    pk = _update_open_error_log(error_log.fingerprint, changes)
+    if pk is not None:
+        return pk, False
+    error_log.count = occurrences
+    try:
+        with transaction.atomic():
+            error_log.save()
+        return error_log.pk, True
+    except IntegrityError:
+        return _update_open_error_log(error_log.fingerprint, changes), False
+
+
+def upsert_error_logs(error_logs: List[ErrorLog]):
+    """
+    upsert_error_log once per fingerprint, with the latest occurrence's
+    context, and count every occurrence into the rollups
+    """
+    latest: Dict[str, ErrorLog] = {}
+    occurrences: Dict[str, int] = defaultdict(int)
+    for error_log in error_logs:
+        error_log.fingerprint = error_log.compute_fingerprint()
+        latest[error_log.fingerprint] = error_log
+        occurrences[error_log.fingerprint] += 1
+    for fingerprint, error_log in latest.items():
+        upsert_error_log(error_log, occurrences[fingerprint])
+    record_error_occurrences(error_logs)
+
+
+def ingest_events(events: List[Any], ip_address=None) -> Tuple[int, List[Dict[str, Any]]]:
+    """
+    Validate and persist a batch of events.
+
+    Returns the number of accepted events and a list of {'index', 'error'}
+    for the rejected ones. Performance rows and new sessions are written
+    with one bulk_create each, errors with one upsert per distinct
+    fingerprint, whatever the batch size.
+    """
+    rejected = []
+    error_logs, performance_logs = [], []
+    session_starts: Dict[str, UserSession] = {}
+    session_start_counts: Dict[str, int] = defaultdict(int)
+    session_updates: Dict[str, List[int]] = defaultdict(list)
+
+    for index, event in enumerate(events):
+        try:
+            if not isinstance(event, dict):
+                raise ValidationError('Event must be an object')
+            kind = event.get('kind')
+            if kind not in EVENT_KINDS:
+                raise ValidationError(f"Unknown event kind: {kind!r}")
+
+            if kind == 'error':
+                instance = build_error_log(event)
+                clean_event_instance(instance)
+                error_logs.append(instance)
+            elif kind == 'performance':
+                instance = build_performance_log(event)
+                clean_event_instance(instance)
+                performance_logs.append(instance)
+            else:
+                session_id = event.get('sessionId')
+                if not session_id or not isinstance(session_id, str):
+                    raise ValidationError('sessionId is required')
+                if len(session_id) > UserSession._meta.get_field('session_id').max_length:
+                    raise ValidationError('sessionId is too long')
+                if kind == 'session':
+                    if session_id not in session_starts:
+                        session = build_user_session(event, ip_address)
+                        clean_event_instance(session)
+                        session_starts[session_id] = session
+                    session_start_counts[session_id] += 1
+                else:
+                    session_updates[session_id].append(index)
+        except ValidationError as e:
+            rejected.append({'index': index, 'error': e.messages[0]})
+
+    with transaction.atomic():
+        if error_logs:
+            upsert_error_logs(error_logs)
+        if performance_logs:
+            PerformanceLog.objects.bulk_create(performance_logs)
+            record_performance_logs(performance_logs)
+        if session_starts or session_updates:
+            rejected.extend(_write_sessions(session_starts, session_start_counts, session_updates))
+
+    rejected.sort(key=lambda item: item['index'])
+    return len(events) - len(rejected), rejected
+
+
+def _write_sessions(starts, start_counts, updates) -> List[Dict[str, Any]]:
+    """Same effect as track_session/update_session called once per event"""
+    now = timezone.now()
+    existing = set(
+        UserSession.objects.filter(session_id__in=[*starts, *updates]).order_by().values_list('session_id', flat=True)
+    )
+
+    new_sessions = []
+    increments = defaultdict(list)
+    for session_id, session in starts.items():
+        if session_id in existing:
+            increments[start_counts[session_id]].append(session_id)
+        else:
+            # The first start creates the session, repeats count as page views
+            session.page_views = start_counts[session_id] - 1
+            new_sessions.append(session)
+    if new_sessions:
+        UserSession.objects.bulk_create(new_sessions, ignore_conflicts=True)
+
+    for count, session_ids in increments.items():
+        UserSession.objects.filter(session_id__in=session_ids).update(
+            page_views=F('page_views') + count, last_activity=now
+        )
+
+    known = existing | {session.session_id for session in new_sessions}
+    rejected = []
+    # Sessions created above already carry the current time
+    touched = [session_id for session_id in updates if session_id in existing]
+    if touched:
+        UserSession.objects.filter(session_id__in=touched).update(last_activity=now)
+    for session_id, indexes in updates.items():
+        if session_id not in known:
+            rejected.extend({'index': index, 'error': 'Session not found'} for index in indexes)
+    return rejected
@@ -1,3 +1,900 @@
-from django.test import TestCase
+import gzip
+import json
+import random
+import re
+import tempfile
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, modify_settings, override_settings
+from rest_framework.renderers import JSONRenderer
+
+from . import compression
+from . import rate_limit
+from .blacklist import BLACKLIST_GENERATION_KEY, CompiledBlacklist, CompiledBlacklistRule, blacklist_snapshot
+from .generations import get_generation
+from .models import (
+    BlacklistRule, Category, BlogPost, Project, Testimonial, ErrorLog, IPAddress, LogRollup, PerformanceLog,
+    PerformanceRollup, RateLimitRule, RateLimitTracker, SecurityAlert, SecurityLog, UserSession,
+)
+from .response_cache import content_generation_key
+from .rollups import (
+    log_counts, log_total, log_trend, performance_by_path, performance_summary, range_buckets, rebuild_log_rollups,
+    pending_performance_rollups, rebuild_performance_rollups,
+)
+from .counters import request_counters
+from .fingerprints import url_path_template
+from .management.commands.import_threat_feed import JSONArrayStream, pattern_key
+from .renderers import FastJSONRenderer
+from .retention import prune_logs
+from .route_classes import DEFAULT_ROUTE_CLASSES, RouteClassifier
+from .security_log_writer import SecurityLogWriter, user_agent_ids
+from .sketches import LatencySketch
+
+
+# Query counts are measured for the views alone: the security middleware and
+# the response cache would otherwise add (or hide) queries of their own
+@modify_settings(MIDDLEWARE={'remove': ['api.security_middleware.EnhancedSecurityMiddleware']})
+@override_settings(API_RESPONSE_CACHE={'ENABLED': False})
+class QueryCountTestCase(ABC, TestCase):
+    # Table sizes every endpoint must serve within the same query budget
+    row_counts = (1, 10, 1000)
+
+    @abstractmethod
+    def create_rows(self, count):
+        """Create count rows of every model the endpoints under test serve"""
+
+    def clear_rows(self):
+        for model in (Testimonial, Project, BlogPost, Category):
+            model.objects.all().delete()
+
+    def assertQueryBudget(self, url, budget):
+        """Assert url runs exactly budget queries at every size in row_counts"""
+        for count in self.row_counts:
+            with self.subTest(url=url, rows=count):
+                self.clear_rows()
+                self.create_rows(count)
+                with self.assertNumQueries(budget):
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+
+
+class CategoryPostCountTests(QueryCountTestCase):
+    url = '/api/v1/categories/with_post_count/'
+
+    def create_rows(self, count, posts_per_category=2):
+        categories = Category.objects.bulk_create(
+            Category(name=f"Category {index}") for index in range(count)
+        )
+        BlogPost.objects.bulk_create(
+            BlogPost(
+                title=f"Post {index}-{post_index}", slug=f"post-{index}-{post_index}",
+                content='Body', author='Author', category=category,
+            )
+            for index, category in enumerate(categories)
+            for post_index in range(posts_per_category)
+        )
+        Category.refresh_post_counts()
+
+    def test_with_post_count_is_one_query(self):
+        self.assertQueryBudget(self.url, 1)
+        self.assertTrue(all(item['post_count'] == 2 for item in self.client.get(self.url).json()))
+
+    @override_settings(USE_DENORMALIZED_POST_COUNT=True)
+    def test_denormalized_post_count(self):
+        self.create_rows(2, posts_per_category=1)
+        first, second = Category.objects.order_by('name')
+        post = BlogPost.objects.get(category=first)
+
+        post.category = second
+        post.save()
+        BlogPost.objects.create(title='Extra', slug='extra', content='Body', author='Author', category=second)
+        BlogPost.objects.filter(slug='post-1-0').delete()
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        counts = {item['name']: item['post_count'] for item in response.json()}
+        self.assertEqual(counts, {'Category 0': 0, 'Category 1': 2})
+
+
+class ContentQueryBudgetTests(QueryCountTestCase):
+    """Every list endpoint costs a fixed number of queries however many rows it serves"""
+
+    def create_rows(self, count):
+        category = Category.objects.create(name='Engineering')
+        BlogPost.objects.bulk_create(
+            BlogPost(title=f"Post {index}", slug=f"post-{index}", content='Body', author='Author', category=category)
+            for index in range(count)
+        )
+        projects = Project.objects.bulk_create(
+            Project(
+                title=f"Project {index}", client_name='Client', category='Web', description='Description',
+                challenge='Challenge', solution='Solution', outcome='Outcome', tech_used=[], stats={},
+                client_logo=f"project_logos/{index}.png",
+            )
+            for index in range(count)
+        )
+        Testimonial.objects.bulk_create(
+            Testimonial(quote='Great work', author=f"Author {index}", title='CTO', company='Client', project=project)
+            for index, project in enumerate(projects)
+        )
+
+    def test_project_list(self):
+        # COUNT, page of projects (the list serializer has no nested testimonials)
+        self.assertQueryBudget('/api/v1/projects/', 2)
+
+    def test_project_detail(self):
+        self.clear_rows()
+        self.create_rows(1)
+        project = Project.objects.get()
+        with self.assertNumQueries(2):
+            response = self.client.get(f"/api/v1/projects/{project.pk}/")
+        self.assertEqual(response.json()['testimonials'][0]['project_title'], project.title)
+
+    def test_testimonial_list(self):
+        # Unpaginated, projects joined in
+        self.assertQueryBudget('/api/v1/testimonials/', 1)
+
+    def test_blog_post_list(self):
+        # COUNT, page of posts with their category joined in
+        self.assertQueryBudget('/api/v1/blogs/', 2)
+        self.assertQueryBudget('/api/v1/blogs/featured/', 1)
+
+    def test_blog_post_keyset_pages(self):
+        # No COUNT: one range query on the (published_date, id) index
+        self.assertQueryBudget('/api/v1/blogs/?pagination=cursor', 1)
+
+        slugs = []
+        url = '/api/v1/blogs/?pagination=cursor'
+        while url:
+            with self.assertNumQueries(1):
+                page = self.client.get(url).json()
+            slugs.extend(post['slug'] for post in page['results'])
+            url = page['next']
+        expected = list(BlogPost.objects.order_by('-published_date', '-id').values_list('slug', flat=True))
+        self.assertEqual(slugs, expected)
+
+    def test_blog_post_keyset_pages_with_client_ordering(self):
+        # Ties on the chosen ordering are broken by the pk, so no row repeats or goes missing
+        self.create_rows(25)
+        BlogPost.objects.update(published_date=datetime(2026, 1, 1, tzinfo=dt_timezone.utc))
+        slugs = []
+        url = '/api/v1/blogs/?pagination=cursor&ordering=published_date'
+        while url:
+            page = self.client.get(url).json()
+            slugs.extend(post['slug'] for post in page['results'])
+            url = page['next']
+        self.assertEqual(slugs, list(BlogPost.objects.order_by('pk').values_list('slug', flat=True)))
+
+
+@modify_settings(MIDDLEWARE={'remove': ['api.security_middleware.EnhancedSecurityMiddleware']})
+@override_settings(API_RESPONSE_CACHE={'ENABLED': False})
+class ListSerializerTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Engineering')
+        BlogPost.objects.create(title='Post', slug='post', content='Body ' * 1000, author='Author', category=category)
+
+    def test_list_omits_article_body(self):
+        post = self.client.get('/api/v1/blogs/').json()['results'][0]
+        self.assertNotIn('content', post)
+        self.assertEqual(post['category']['name'], 'Engineering')
+        self.assertIn('content', self.client.get('/api/v1/blogs/post/').json())
+
+    def test_sparse_fields(self):
+        post = self.client.get('/api/v1/blogs/?fields=title,slug').json()['results'][0]
+        self.assertEqual(set(post), {'title', 'slug'})
+        detail = self.client.get('/api/v1/blogs/post/?fields=title,content').json()
+        self.assertEqual(set(detail), {'title', 'content'})
+        # Unknown names alone leave the output unchanged
+        post = self.client.get('/api/v1/blogs/?fields=bogus').json()['results'][0]
+        self.assertIn('excerpt', post)
+
+
+@modify_settings(MIDDLEWARE={'remove': ['api.security_middleware.EnhancedSecurityMiddleware']})
+@override_settings(API_RESPONSE_CACHE={'ENABLED': False})
+class BlogSearchTests(TestCase):
+    def setUp(self):
+        self.category = Category.objects.create(name='Engineering')
+        BlogPost.objects.create(
+            title='Scaling Django', slug='scaling-django', author='Author', category=self.category,
+            content='Connection pooling and caching for busy sites.',
+        )
+        BlogPost.objects.create(
+            title='Frontend notes', slug='frontend-notes', author='Author', category=self.category,
+            content='We render the React app from a Django template and hydrate it.',
+        )
+        BlogPost.objects.create(
+            title='Hiring', slug='hiring', author='Author', content='We are hiring designers.',
+        )
+
+    def search(self, term):
+        return self.client.get('/api/v1/blogs/', {'search': term}).json()['results']
+
+    def test_ranked_results_with_snippets(self):
+        # COUNT, page, snippets for the page
+        with self.assertNumQueries(3):
+            results = self.search('django')
+        self.assertEqual([post['slug'] for post in results], ['scaling-django', 'frontend-notes'])
+        self.assertIn('<mark>Django</mark>', results[1]['search_snippet'])
+        self.assertNotIn('search_snippet', self.client.get('/api/v1/blogs/').json()['results'][0])
+
+    def test_search_ignores_cursor_pagination(self):
+        # Relevance order has no cursor, so searches always get numbered pages
+        response = self.client.get('/api/v1/blogs/', {'search': 'django', 'pagination': 'cursor'}).json()
+        self.assertEqual(response['count'], 2)
+        self.assertEqual([post['slug'] for post in response['results']], ['scaling-django', 'frontend-notes'])
+
+    def test_stemming_and_syntax_characters(self):
+        self.assertEqual([post['slug'] for post in self.search('hydrating')], ['frontend-notes'])
+        self.assertEqual(self.search('"django" OR -NEAR('), [])
+
+    def test_index_follows_edits(self):
+        post = BlogPost.objects.get(slug='hiring')
+        post.title = 'Hiring Django developers'
+        post.save()
+        self.assertIn('hiring', [post['slug'] for post in self.search('django')])
+
+        self.category.name = 'Platform'
+        self.category.save()
+        self.assertEqual(len(self.search('platform')), 2)
+
+        BlogPost.objects.filter(slug='scaling-django').delete()
+        self.assertNotIn('scaling-django', [post['slug'] for post in self.search('django')])
+
+    def test_category_name_denormalised(self):
+        # The PostgreSQL index covers BlogPost.category_name instead of the join
+        self.assertEqual([post['slug'] for post in self.search('engineering')], ['scaling-django', 'frontend-notes'])
+        self.assertEqual(BlogPost.objects.get(slug='hiring').category_name, '')
+
+        post = BlogPost.objects.get(slug='hiring')
+        post.category = Category.objects.create(name='People')
+        post.save()
+        self.category.name = 'Platform'
+        self.category.save()
+        self.assertEqual(
+            dict(BlogPost.objects.values_list('slug', 'category_name')),
+            {'scaling-django': 'Platform', 'frontend-notes': 'Platform', 'hiring': 'People'},
+        )
+
+        self.category.delete()
+        self.assertEqual(set(BlogPost.objects.values_list('category_name', flat=True)), {'', 'People'})
+
+        BlogPost.objects.update(category_name='stale')
+        self.assertEqual(BlogPost.refresh_category_names(), 3)
+        self.assertEqual(BlogPost.objects.get(slug='hiring').category_name, 'People')
+
+
+@modify_settings(MIDDLEWARE={'remove': ['api.security_middleware.EnhancedSecurityMiddleware']})
+class ResponseCacheInvalidationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.post = BlogPost.objects.create(title='Old title', slug='post', content='Body', author='Author')
+
+    def titles(self):
+        response = self.client.get('/api/v1/blogs/')
+        return response['X-Response-Cache'], [post['title'] for post in response.json()['results']]
+
+    def test_generation_bumped_on_commit(self):
+        self.assertEqual(self.titles(), ('MISS', ['Old title']))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self.post.title = 'New title'
+                self.post.save()
+                # Until the commit other connections still read the old row,
+                # so anything they cache must stay under the old generation
+                generation = get_generation(content_generation_key(BlogPost))
+                self.assertEqual(self.titles()[0], 'HIT')
+            self.assertEqual(get_generation(content_generation_key(BlogPost)), generation)
+
+        self.assertEqual(self.titles(), ('MISS', ['New title']))
+
+    def test_blacklist_generation_bumped_on_commit(self):
+        generation = get_generation(BLACKLIST_GENERATION_KEY)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with transaction.atomic():
+                BlacklistRule.objects.create(rule_type='ip', pattern='192.0.2.1', reason='Test')
+                self.assertEqual(get_generation(BLACKLIST_GENERATION_KEY), generation)
+        self.assertEqual(len(callbacks), 1)
+        self.assertNotEqual(get_generation(BLACKLIST_GENERATION_KEY), generation)
+
+    def admin_action(self, model, action, queryset):
+        user, _ = User.objects.get_or_create(username='admin', defaults={'is_staff': True, 'is_superuser': True})
+        request = mock.Mock(user=user)
+        with mock.patch.object(admin.ModelAdmin, 'message_user'):
+            getattr(admin.site._registry[model], action)(request, queryset)
+
+    def test_admin_actions_bump_on_commit(self):
+        IPAddress.objects.create(ip_address='192.0.2.2')
+        generation = get_generation(BLACKLIST_GENERATION_KEY)
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                # Admin requests run in ATOMIC_REQUESTS transactions
+                self.admin_action(IPAddress, 'blacklist_ips', IPAddress.objects.all())
+                self.assertEqual(get_generation(BLACKLIST_GENERATION_KEY), generation)
+        self.assertNotEqual(get_generation(BLACKLIST_GENERATION_KEY), generation)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            rule = BlacklistRule.objects.create(rule_type='ip', pattern='192.0.2.3', reason='Test', is_active=False)
+        for action in ('activate_rules', 'deactivate_rules'):
+            generation = get_generation(BLACKLIST_GENERATION_KEY)
+            with self.captureOnCommitCallbacks(execute=True):
+                with transaction.atomic():
+                    self.admin_action(BlacklistRule, action, BlacklistRule.objects.filter(pk=rule.pk))
+                    self.assertEqual(get_generation(BLACKLIST_GENERATION_KEY), generation)
+            self.assertNotEqual(get_generation(BLACKLIST_GENERATION_KEY), generation)
+
+
+@modify_settings(MIDDLEWARE={'remove': ['api.security_middleware.EnhancedSecurityMiddleware']})
+@override_settings(RESPONSE_COMPRESSION={'MIN_SIZE': 1024})
+class CompressionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name='Engineering')
+        BlogPost.objects.bulk_create(
+            BlogPost(title=f"Post {index}", slug=f"post-{index}", excerpt='Excerpt ' * 20, content='Body',
+                     author='Author', category=category)
+            for index in range(10)
+        )
+
+    @override_settings(API_RESPONSE_CACHE={'ENABLED': False})
+    def test_negotiated_gzip(self):
+        identity = self.client.get('/api/v1/blogs/')
+        self.assertFalse(identity.has_header('Content-Encoding'))
+        self.assertIn('Accept-Encoding', identity['Vary'])
+
+        response = self.client.get('/api/v1/blogs/', HTTP_ACCEPT_ENCODING='br;q=0, gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), identity.content)
+        self.assertTrue(response['ETag'].startswith('W/"'))
+
+        refused = self.client.get('/api/v1/blogs/', HTTP_ACCEPT_ENCODING='gzip;q=0')
+        self.assertFalse(refused.has_header('Content-Encoding'))
+        small = self.client.get('/api/v1/categories/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(small.has_header('Content-Encoding'))
+
+    def test_cache_hit_is_served_precompressed(self):
+        miss = self.client.get('/api/v1/blogs/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(miss['X-Response-Cache'], 'MISS')
+        self.assertEqual(miss['Content-Encoding'], 'gzip')
+
+        with mock.patch('api.compression.compress') as compress:
+            hit = self.client.get('/api/v1/blogs/', HTTP_ACCEPT_ENCODING='gzip')
+            identity = self.client.get('/api/v1/blogs/')
+        compress.assert_not_called()
+        self.assertEqual(hit['X-Response-Cache'], 'HIT')
+        self.assertEqual(hit['Content-Encoding'], 'gzip')
+        self.assertEqual(hit.content, miss.content)
+        self.assertEqual(gzip.decompress(hit.content), identity.content)
+        self.assertIn('Accept-Encoding', identity['Vary'])
+
+        not_modified = self.client.get('/api/v1/blogs/', HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=hit['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_unused_query_params_share_the_entry(self):
+        self.client.get('/api/v1/blogs/?page=1', HTTP_ACCEPT_ENCODING='gzip')
+        with mock.patch('api.compression.compress') as compress:
+            response = self.client.get(f"/api/v1/blogs/?page=1&x={random.random()}", HTTP_ACCEPT_ENCODING='gzip')
+        compress.assert_not_called()
+        self.assertEqual(response['X-Response-Cache'], 'HIT')
+
+        other = self.client.get('/api/v1/blogs/?page=1&category=Engineering', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(other['X-Response-Cache'], 'MISS')
+
+    def test_sparse_fields_do_not_share_the_entry(self):
+        sparse = self.client.get('/api/v1/blogs/?fields=id')
+        self.assertEqual(set(sparse.json()['results'][0]), {'id'})
+        full = self.client.get('/api/v1/blogs/')
+        self.assertEqual(full['X-Response-Cache'], 'MISS')
+        self.assertIn('title', full.json()['results'][0])
+        other = self.client.get('/api/v1/blogs/?fields=title')
+        self.assertEqual(other['X-Response-Cache'], 'MISS')
+        self.assertEqual(set(other.json()['results'][0]), {'title'})
+
+    @skipUnless(compression.brotli, 'brotli is not installed')
+    def test_brotli_preferred(self):
+        miss = self.client.get('/api/v1/blogs/', HTTP_ACCEPT_ENCODING='gzip, br')
+        hit = self.client.get('/api/v1/blogs/', HTTP_ACCEPT_ENCODING='gzip, br')
+        identity = self.client.get('/api/v1/blogs/')
+        for response in (miss, hit):
+            self.assertEqual(response['Content-Encoding'], 'br')
+            self.assertEqual(compression.brotli.decompress(response.content), identity.content)
+        self.assertEqual(hit['X-Response-Cache'], 'HIT')
+
+        with self.settings(API_RESPONSE_CACHE={'ENABLED': False}):
+            live = self.client.get('/api/v1/blogs/', HTTP_ACCEPT_ENCODING='br')
+        self.assertEqual(live['Content-Encoding'], 'br')
+        self.assertEqual(compression.brotli.decompress(live.content), identity.content)
+
+
+@modify_settings(MIDDLEWARE={'remove': ['api.security_middleware.EnhancedSecurityMiddleware']})
+class TelemetryBatchTests(TestCase):
+    url = '/api/v1/error-tracking/batch/'
+
+    def event(self, kind, **data):
+        return {'kind': kind, 'url': 'https://codingbullz.com/', 'userAgent': 'Test', 'sessionId': 's1', **data}
+
+    def post(self, events, content_type='application/json'):
+        return self.client.post(self.url, json.dumps({'events': events}), content_type=content_type)
+
+    def test_mixed_batch_in_constant_queries(self):
+        events = [self.event('session')]
+        events += [self.event('error', type='javascript', message=f"Error {index}") for index in range(20)]
+        events += [self.event('performance', type='page_load', duration=120.6) for _ in range(20)]
+        events += [self.event('session-update'), self.event('session')]
+
+        # Error upsert (UPDATE, then INSERT in a savepoint) and its count
+        # rollup upsert, performance INSERT and one merge per hourly/daily
+        # rollup row (SELECT, then INSERT in a savepoint), session lookup
+        # and INSERT, all inside one savepoint. None of it depends on the
+        # number of events.
+        with self.assertNumQueries(20):
+            response = self.post(events)
+        self.assertEqual(response.json(), {'status': 'success', 'accepted': len(events), 'rejected': []})
+        # "Error 0" ... "Error 19" are one error
+        self.assertEqual(ErrorLog.objects.get().count, 20)
+        self.assertEqual(PerformanceLog.objects.first().duration, 121)
+        self.assertEqual(UserSession.objects.get(session_id='s1').page_views, 1)
+
+        self.post([self.event('session'), self.event('session')])
+        self.assertEqual(UserSession.objects.get(session_id='s1').page_views, 3)
+
+    def test_invalid_events_are_rejected_individually(self):
+        response = self.post([
+            self.event('performance', duration=-5),
+            self.event('unknown'),
+            self.event('error', message='Kept', breadcrumbs='not a list'),
+            self.event('error', message='Kept', type='x' * 50),
+            self.event('session-update', sessionId='missing'),
+        ])
+        body = response.json()
+        self.assertEqual(body['accepted'], 1)
+        self.assertEqual([item['index'] for item in body['rejected']], [0, 1, 2, 4])
+        self.assertEqual(ErrorLog.objects.get().error_type, 'x' * 20)
+
+        self.assertEqual(self.client.post(self.url, {}, content_type='application/json').status_code, 400)
+        with self.settings(TELEMETRY_BATCH_MAX_EVENTS=2):
+            self.assertEqual(self.post([self.event('error')] * 3).status_code, 400)
+
+    def test_beacon_payload(self):
+        response = self.post([self.event('error', message='Beacon')], content_type='text/plain;charset=UTF-8')
+        self.assertEqual(response.json()['accepted'], 1)
+        self.assertTrue(ErrorLog.objects.filter(message='Beacon').exists())
+
+
+@modify_settings(MIDDLEWARE={'remove': ['api.security_middleware.EnhancedSecurityMiddleware']})
+class ErrorFingerprintTests(TestCase):
+    url = '/api/v1/error-tracking/error/'
+
+    def report(self, **data):
+        payload = {
+            'type': 'javascript', 'message': "Cannot read properties of undefined (reading 'id')",
+            'stack': "TypeError: Cannot read properties of undefined (reading 'id')\n"
+                     "    at renderPost (https://codingbullz.com/static/js/main.1a2b3c4d.js:2:10412)\n"
+                     "    at https://codingbullz.com/static/js/main.1a2b3c4d.js:2:9000",
+            'url': 'https://codingbullz.com/blog/scaling-django/', 'userAgent': 'Test', **data,
+        }
+        return self.client.post(self.url, payload, content_type='application/json').json()
+
+    def test_repeats_update_one_row(self):
+        first = self.report()
+        # Another post, another build, another line number: the same error
+        second = self.report(
+            url='https://codingbullz.com/blog/hiring/?ref=x', sessionId='s2',
+            stack="TypeError: Cannot read properties of undefined (reading 'id')\n"
+                  "    at renderPost (https://codingbullz.com/static/js/main.9f8e7d6c.js:2:11873)\n"
+                  "    at https://codingbullz.com/static/js/main.9f8e7d6c.js:2:9120",
+        )
+        self.assertEqual(first['id'], second['id'])
+        error = ErrorLog.objects.get()
+        self.assertEqual((error.count, error.session_id), (2, 's2'))
+        self.assertGreater(error.last_seen, error.first_seen)
+
+        self.report(message="Cannot read properties of undefined (reading 'slug')")
+        self.report(url='https://codingbullz.com/services/web-development/')
+        self.assertEqual(ErrorLog.objects.count(), 3)
+
+    def test_resolved_error_recurs_as_new_row(self):
+        first = self.report()
+        ErrorLog.objects.filter(pk=first['id']).update(is_resolved=True)
+        second = self.report()
+        self.assertNotEqual(first['id'], second['id'])
+        self.assertEqual(ErrorLog.objects.get(pk=second['id']).count, 1)
+
+    def test_url_path_template(self):
+        # Independent of the URLconf: frontend pages never resolve in Django
+        self.assertEqual(url_path_template('https://codingbullz.com/blog/scaling-django/?ref=x'), '/blog/<slug>')
+        self.assertEqual(url_path_template('/projects/42/'), '/projects/<id>')
+        self.assertEqual(url_path_template('/about-us'), '/about-us')
+        self.assertEqual(url_path_template(''), '/')
+
+    def test_repeat_answers_with_open_row(self):
+        first = self.report()
+        # Lookup and UPDATE of the open row, one rollup INSERT, in a savepoint
+        with self.assertNumQueries(5):
+            second = self.report()
+        self.assertEqual(first['id'], second['id'])
+
+
+class FastJSONRendererTests(TestCase):
+    def test_matches_stdlib_renderer(self):
+        data = {'id': 1, 'title': 'Caf\u00e9 \u2028', 'score': 0.1, 'tags': ['a', None], 'when': datetime(2026, 1, 1)}
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_non_finite_floats_raise_like_stdlib(self):
+        for value in (float('nan'), float('inf'), Decimal('NaN')):
+            with self.subTest(value=value), self.assertRaises(ValueError):
+                FastJSONRenderer().render({'values': [1.0, value]})
+
+
+class LatencySketchTests(TestCase):
+    def test_quantiles_within_relative_accuracy(self):
+        rng = random.Random(7)
+        values = [rng.lognormvariate(6, 1) for _ in range(20000)] + [0] * 100
+        halves = LatencySketch(), LatencySketch()
+        for index, value in enumerate(values):
+            halves[index % 2].add(value)
+        # Round-tripped through JSON and merged, as the rollups are
+        sketch = LatencySketch.merged(LatencySketch.from_dict(json.loads(json.dumps(half.to_dict()))) for half in halves)
+
+        values.sort()
+        for q in (0.5, 0.9, 0.99):
+            exact = values[int(q * (len(values) - 1))]
+            self.assertAlmostEqual(sketch.quantile(q), exact, delta=exact * 0.02)
+        self.assertEqual((sketch.count, sketch.min, sketch.max), (len(values), 0, values[-1]))
+
+
+@modify_settings(MIDDLEWARE={'remove': ['api.security_middleware.EnhancedSecurityMiddleware']})
+class PerformanceRollupTests(TestCase):
+    url = '/api/v1/error-tracking/batch/'
+
+    def test_range_buckets(self):
+        start = datetime(2026, 10, 10, 18, 30, tzinfo=dt_timezone.utc)
+        self.assertEqual(range_buckets(start, start + timedelta(days=3)), [
+            ('hour', start.replace(minute=0), start.replace(hour=23, minute=0)),
+            ('day', datetime(2026, 10, 11, tzinfo=dt_timezone.utc), datetime(2026, 10, 12, tzinfo=dt_timezone.utc)),
+            ('hour', datetime(2026, 10, 13, tzinfo=dt_timezone.utc), start.replace(day=13, minute=0)),
+        ])
+        self.assertEqual([period for period, _, _ in range_buckets(start, start + timedelta(hours=3))], ['hour'])
+
+    def test_ingestion_keeps_percentiles(self):
+        events = [
+            {'kind': 'performance', 'type': 'page_load', 'duration': duration, 'userAgent': 'Test',
+             'url': f"https://codingbullz.com/blog/post-{duration % 7}/"}
+            for duration in range(1, 1001)
+        ]
+        for offset in range(0, 1000, 200):
+            self.client.post(self.url, json.dumps({'events': events[offset:offset + 200]}), content_type='application/json')
+
+        # One hourly and one daily row for the blog route, however many posts
+        self.assertEqual(PerformanceRollup.objects.count(), 2)
+        now = datetime.now(dt_timezone.utc)
+        with self.assertNumQueries(1):
+            summary = performance_summary('page_load', now - timedelta(hours=24), now)
+        self.assertEqual(summary['count'], 1000)
+        self.assertAlmostEqual(summary['p90'], 900, delta=9)
+        self.assertAlmostEqual(summary['p99'], 990, delta=10)
+        self.assertEqual(performance_by_path('page_load', now - timedelta(days=7), now)[0]['path'], '/blog/<slug>')
+
+        rows = list(PerformanceRollup.objects.values_list('period', 'count', 'sketch'))
+        rebuild_performance_rollups(now)
+        self.assertEqual(list(PerformanceRollup.objects.values_list('period', 'count', 'sketch')), rows)
+
+    @override_settings(TELEMETRY_ROLLUP_FLUSH_INTERVAL=3600)
+    def test_single_event_duration_is_coerced(self):
+        pending_performance_rollups.flush()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/v1/error-tracking/performance/', json.dumps({
+                'type': 'page_load', 'duration': '1500', 'url': 'https://codingbullz.com/blog/post/', 'userAgent': 'Test',
+            }), content_type='application/json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(PerformanceLog.objects.get().duration, 1500)
+        # Single events are merged in batches, not under a lock per request
+        self.assertFalse(PerformanceRollup.objects.exists())
+        pending_performance_rollups.flush()
+        self.assertEqual(set(PerformanceRollup.objects.values_list('max_duration', flat=True)), {1500})
+
+
+@modify_settings(MIDDLEWARE={'remove': ['api.security_middleware.EnhancedSecurityMiddleware']})
+class LogRollupTests(TestCase):
+    url = '/api/v1/error-tracking/batch/'
+
+    def setUp(self):
+        # UserAgent primary keys cached by earlier tests were rolled back
+        user_agent_ids.clear()
+
+    def security_entry(self, **data):
+        entry = {
+            'remote_addr': '203.0.113.7', 'user_agent': 'Test', 'method': 'GET', 'path': '/api/v1/blog/',
+            'query_string': '', 'referer': None, 'host': 'codingbullz.com', 'content_type': None,
+            'is_suspicious': False, 'risk_level': 'low', 'risk_score': 0, 'user_id': None, 'session_key': None,
+            'response_status': 200, 'response_time': 12.5, 'x_forwarded_for': None, 'x_real_ip': None,
+            'x_forwarded_proto': None, 'threat_indicators': [], 'timestamp': datetime.now(dt_timezone.utc),
+        }
+        entry.update(data)
+        return entry
+
+    def test_security_writer_counts(self):
+        writer = SecurityLogWriter()
+        writer.flush([self.security_entry() for _ in range(3)])
+        writer.flush([
+            self.security_entry(path='/wp-login.php', is_suspicious=True, risk_level='high', risk_score=50,
+                                response_status=404, remote_addr='198.51.100.1'),
+        ])
+        # The writer hands request counts to the shared accumulator
+        request_counters.flush()
+        self.assertEqual(SecurityLog.objects.count(), 4)
+
+        self.assertEqual(log_total('security'), 4)
+        self.assertEqual(log_total('security', 'suspicious'), 1)
+        self.assertEqual(log_counts('security', 'status'), [('200', 3), ('404', 1)])
+        self.assertEqual(log_counts('security', 'ip', limit=1), [('203.0.113.7', 3)])
+        self.assertEqual(log_counts('security', 'risk_level'), [('low', 3), ('high', 1)])
+
+        rows = list(LogRollup.objects.order_by('period', 'dimension', 'value').values_list('period', 'dimension', 'value', 'count'))
+        self.assertEqual(rebuild_log_rollups('security', datetime.now(dt_timezone.utc)), 4)
+        self.assertEqual(
+            list(LogRollup.objects.order_by('period', 'dimension', 'value').values_list('period', 'dimension', 'value', 'count')),
+            rows,
+        )
+
+    def test_security_entries_keep_their_request_time(self):
+        # A batch flushed after the hour turned still counts in the hour the requests came in
+        requested = datetime(2026, 3, 1, 9, 59, 58, tzinfo=dt_timezone.utc)
+        SecurityLogWriter().flush([self.security_entry(timestamp=requested)])
+        self.assertEqual(SecurityLog.objects.get().timestamp, requested)
+        self.assertEqual(
+            LogRollup.objects.get(period='hour', dimension='total').bucket_start,
+            requested.replace(minute=0, second=0),
+        )
+
+    def test_error_occurrences_in_constant_reads(self):
+        events = [
+            {'kind': 'error', 'type': 'javascript' if index % 4 else 'network', 'message': f"Error {index}",
+             'url': 'https://codingbullz.com/blog/post/?ref=x', 'severity': 'high',
+             'browserInfo': {'browser': 'Firefox', 'os': 'Linux'}}
+            for index in range(20)
+        ]
+        self.client.post(self.url, json.dumps({'events': events}), content_type='application/json')
+        self.client.post('/api/v1/error-tracking/error/', json.dumps(events[1]), content_type='application/json')
+
+        # Two open rows, but every occurrence is counted
+        self.assertEqual(ErrorLog.objects.count(), 2)
+        with self.assertNumQueries(1):
+            self.assertEqual(log_total('error'), 21)
+        self.assertEqual(log_counts('error', 'error_type'), [('javascript', 16), ('network', 5)])
+        self.assertEqual(log_counts('error', 'url'), [('https://codingbullz.com/blog/post/', 21)])
+        self.assertEqual(log_counts('error', 'browser'), [('Firefox on Linux', 21)])
+        self.assertEqual(log_trend('error', days=2)[-1]['count'], 21)
+        self.assertEqual(LogRollup.objects.filter(dimension='total').count(), 2)
+
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        response = self.client.get('/admin/error-tracking-dashboard/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total_errors'], 21)
+
+
+@override_settings(LOG_RETENTION={'CHUNK_SIZE': 3, 'CHUNK_PAUSE': 0})
+class LogRetentionTests(TestCase):
+    def test_prune_expired_rows(self):
+        now = datetime.now(dt_timezone.utc)
+        old = now - timedelta(days=100)
+        PerformanceLog.objects.bulk_create(PerformanceLog(metric_type='page_load', duration=100, url='/') for _ in range(10))
+        PerformanceLog.objects.filter(pk__in=PerformanceLog.objects.values('pk')[:7]).update(timestamp=old)
+        UserSession.objects.create(session_id='old', user_agent='Test')
+        UserSession.objects.create(session_id='new', user_agent='Test')
+        UserSession.objects.filter(session_id='old').update(last_activity=old)
+        PerformanceRollup.objects.create(period='day', bucket_start=old, metric_type='page_load', path='/', count=7)
+
+        rule = RateLimitRule.objects.create(name='API', path_pattern='/api/', max_requests=10, time_window=60)
+        RateLimitTracker.objects.create(identifier='1.1.1.1', rule=rule)
+        RateLimitTracker.objects.create(identifier='2.2.2.2', rule=rule, is_blocked=True,
+                                        blocked_until=now + timedelta(hours=1))
+        RateLimitTracker.objects.update(last_request=now - timedelta(days=2))
+
+        dry_run = {result.model: result.rows for result in prune_logs(dry_run=True, now=now)}
+        self.assertEqual(dry_run['PerformanceLog'], 7)
+        self.assertEqual(PerformanceLog.objects.count(), 10)
+
+        results = {result.model: result for result in prune_logs(now=now)}
+        self.assertEqual(results['PerformanceLog'].rows, 7)
+        # None where SQLite is built without the dbstat table
+        if results['PerformanceLog'].bytes is not None:
+            self.assertGreater(results['PerformanceLog'].bytes, 0)
+        self.assertEqual(results['UserSession'].rows, 1)
+        self.assertEqual(results['RateLimitTracker'].rows, 1)
+        self.assertNotIn('PerformanceRollup', results)
+
+        self.assertEqual(PerformanceLog.objects.count(), 3)
+        self.assertEqual(list(UserSession.objects.values_list('session_id', flat=True)), ['new'])
+        # Still blocked, so kept past its window
+        self.assertEqual(RateLimitTracker.objects.get().identifier, '2.2.2.2')
+        self.assertEqual(PerformanceRollup.objects.count(), 1)
+
+
+SECURITY_TEST_SETTINGS = {
+    'DISABLE_RATE_LIMITING_FOR_LOCALHOST': True,
+    'RESPECT_DEBUG_MODE': False,
+    # Entries are written inline, through the same flush() the worker thread uses
+    'SECURITY_LOG_ASYNC': False,
+    'RATE_LIMIT_BACKEND': 'api.rate_limit.CacheRateLimitBackend',
+    'RATE_LIMIT_BACKEND_OPTIONS': {'cache_alias': 'default', 'algorithm': 'sliding'},
+}
+
+
+@override_settings(SECURITY_MIDDLEWARE_SETTINGS=SECURITY_TEST_SETTINGS, API_RESPONSE_CACHE={'ENABLED': False})
+class SecurityMiddlewareTests(TestCase):
+    """Requests through EnhancedSecurityMiddleware, from a non-local address"""
+
+    client_ip = '203.0.113.9'
+
+    def setUp(self):
+        cache.clear()
+        blacklist_snapshot.invalidate()
+        rate_limit.rate_limit_rules.invalidate()
+        # The backend is created once per worker from the settings
+        self.addCleanup(setattr, rate_limit, '_backend', None)
+        rate_limit._backend = None
+        # UserAgent primary keys cached by earlier tests were rolled back
+        user_agent_ids.clear()
+        request_counters.flush()
+
+    def get(self, path, ip=None, user_agent='Mozilla/5.0 (X11; Linux x86_64) Firefox/130.0', data=None):
+        # The test client sends no Host header, which scores as suspicious
+        return self.client.get(path, data, REMOTE_ADDR=ip or self.client_ip, HTTP_USER_AGENT=user_agent,
+                               HTTP_HOST='localhost')
+
+    def test_ip_range_rule_blocks(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            rule = BlacklistRule.objects.create(rule_type='ip_range', pattern='203.0.113.0/24', reason='Test range')
+
+        self.assertEqual(self.get('/api/v1/blogs/').status_code, 403)
+        self.assertEqual(self.get('/api/v1/blogs/', ip='198.51.100.7').status_code, 200)
+        rule.refresh_from_db()
+        self.assertEqual(rule.match_count, 1)
+
+        # Blocked requests are counted and logged like any other
+        request_counters.flush()
+        blocked_ip = IPAddress.objects.get(ip_address=self.client_ip)
+        self.assertEqual((blocked_ip.blocked_requests, blocked_ip.total_requests), (1, 1))
+        self.assertEqual(SecurityLog.objects.get(ip_address=blocked_ip).response_status, 403)
+
+        # Deleting the rule lifts the block once the transaction commits
+        with self.captureOnCommitCallbacks(execute=True):
+            rule.delete()
+        self.assertEqual(self.get('/api/v1/blogs/').status_code, 200)
+
+    @override_settings(SECURITY_MIDDLEWARE_SETTINGS={'SECURITY_COUNTER_FLUSH_EVENTS': 1})
+    def test_block_only_counter_delta_flushes(self):
+        request_counters.add_ip(self.client_ip, total=0, suspicious=1, blocked=1)
+        request_counters.maybe_flush()
+        ip = IPAddress.objects.get(ip_address=self.client_ip)
+        self.assertEqual((ip.total_requests, ip.blocked_requests), (0, 1))
+
+    def test_pattern_rules_combined_per_field(self):
+        rules = [
+            CompiledBlacklistRule.compile(BlacklistRule(rule_type=rule_type, pattern=pattern), position)
+            for position, (rule_type, pattern) in enumerate([
+                ('user_agent', 'sqlmap'), ('path', r'\.env$'), ('user_agent', r'(bot)\1'), ('user_agent', 'nikto'),
+            ])
+        ]
+        blacklist = CompiledBlacklist(rules)
+        # Backreferences cannot be joined, so that field falls back to scanning
+        self.assertIsNone(blacklist.pattern_sets['user_agent'])
+        self.assertIsNotNone(blacklist.pattern_sets['path'])
+        request = {'remote_addr': '198.51.100.1', 'user_agent': 'Nikto/2.5', 'path': '/.env'}
+        self.assertEqual(blacklist.find_match(request).pattern, r'\.env$')
+        self.assertEqual(blacklist.find_match({**request, 'path': '/'}).pattern, 'nikto')
+        self.assertIsNone(blacklist.find_match({**request, 'path': '/', 'user_agent': 'Firefox'}))
+
+    def test_rate_limit_blocks_after_max_requests(self):
+        RateLimitRule.objects.create(
+            name='Blog', path_pattern=r'^/api/v1/blogs/', max_requests=3, time_window=60, block_duration=300,
+        )
+        backends = ('api.rate_limit.CacheRateLimitBackend', 'api.rate_limit.DatabaseRateLimitBackend')
+        for backend in backends:
+            with self.subTest(backend=backend), self.settings(
+                SECURITY_MIDDLEWARE_SETTINGS={**SECURITY_TEST_SETTINGS, 'RATE_LIMIT_BACKEND': backend,
+                                              'RATE_LIMIT_BACKEND_OPTIONS': {}},
+            ):
+                cache.clear()
+                rate_limit._backend = None
+                RateLimitTracker.objects.all().delete()
+
+                statuses = [self.get('/api/v1/blogs/').status_code for _ in range(4)]
+                self.assertEqual(statuses, [200, 200, 200, 429])
+                response = self.get('/api/v1/blogs/')
+                self.assertEqual(response.json(), {'error': 'Rate limit exceeded', 'retry_after': 300})
+                tracker = RateLimitTracker.objects.get(identifier=f"ip:{self.client_ip}")
+                self.assertTrue(tracker.is_currently_blocked)
+                # Other clients and paths are unaffected
+                self.assertEqual(self.get('/api/v1/blogs/', ip='198.51.100.7').status_code, 200)
+                self.assertEqual(self.get('/api/v1/services/').status_code, 200)
+
+        self.assertTrue(SecurityAlert.objects.filter(alert_type='rate_limit').exists())
+
+    def test_local_requests_skip_rate_limiting(self):
+        RateLimitRule.objects.create(name='Blog', path_pattern=r'^/api/v1/blogs/', max_requests=1, time_window=60)
+        statuses = [self.get('/api/v1/blogs/', ip='127.0.0.1').status_code for _ in range(3)]
+        self.assertEqual(statuses, [200, 200, 200])
+
+    def test_suspicious_request_is_logged_with_alert(self):
+        self.get('/api/v1/blogs/')
+        response = self.get('/wp-login.php', user_agent='sqlmap/1.7')
+        self.assertEqual(response.status_code, 404)
+
+        log = SecurityLog.objects.get(path='/wp-login.php')
+        self.assertTrue(log.is_suspicious)
+        self.assertEqual((log.risk_score, log.risk_level, log.response_status), (65, 'high', 404))
+        self.assertIn('Suspicious user agent pattern: sqlmap', log.threat_indicators)
+        self.assertEqual(log.user_agent.user_agent_string, 'sqlmap/1.7')
+        self.assertFalse(SecurityLog.objects.get(path='/api/v1/blogs/').is_suspicious)
+
+        alert = SecurityAlert.objects.get(alert_type='suspicious_activity')
+        self.assertEqual(alert.ip_address.ip_address, self.client_ip)
+        self.assertEqual(alert.additional_data['path'], '/wp-login.php')
+
+        # The inline writer flushes the counters with each entry
+        ip = IPAddress.objects.get(ip_address=self.client_ip)
+        self.assertEqual((ip.total_requests, ip.suspicious_requests, ip.blocked_requests), (2, 1, 0))
+        self.assertLess(ip.reputation_score, 50)
+
+    def test_high_risk_request_is_blocked(self):
+        response = self.get('/.env', user_agent='sqlmap/1.7', data={'q': '1 union select password from users'})
+        self.assertEqual(response.status_code, 403)
+        self.assertTrue(SecurityAlert.objects.filter(alert_type='high_risk_request').exists())
+        self.assertEqual(SecurityLog.objects.get().response_status, 403)
+
+    def test_static_route_class_is_not_logged(self):
+        self.get('/static/app.js')
+        self.assertFalse(SecurityLog.objects.exists())
+
+    def test_skipped_route_still_checks_blacklist(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            BlacklistRule.objects.create(rule_type='ip', pattern=self.client_ip, reason='Test')
+        self.assertEqual(self.get('/static/app.js').status_code, 403)
+        self.assertEqual(SecurityLog.objects.get().response_status, 403)
+
+    def test_route_paths_match_exactly_unless_ending_in_slash(self):
+        classifier = RouteClassifier(DEFAULT_ROUTE_CLASSES)
+        self.assertEqual(classifier.classify('/static/js/main.js').name, 'static')
+        self.assertEqual(classifier.classify('/favicon.ico').name, 'static')
+        self.assertEqual(classifier.classify('/favicon.ico.php').name, 'default')
+        self.assertEqual(classifier.classify('/robots.txt/../.env').name, 'default')
+
+
+class ThreatFeedTests(TestCase):
+    def import_feed(self, name, content, *args):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / name
+            path.write_text(content, encoding='utf-8')
+            call_command('import_threat_feed', str(path), '--source', 'feed', *args, stdout=StringIO())
+
+    def test_json_entries_read_in_chunks(self):
+        feed = json.dumps({'meta': {'count': 3}, 'entries': ['198.51.100.1', {'ip': '198.51.100.2'}, 12345]})
+        stream = JSONArrayStream(StringIO(feed), chunk_size=5)
+        self.assertEqual(list(stream.entries()), ['198.51.100.1', {'ip': '198.51.100.2'}, 12345])
+        self.assertEqual(list(JSONArrayStream(StringIO(' [ ] ')).entries()), [])
+
+    def test_collapsed_networks_keep_entry_reasons(self):
+        entries = [{'ip': f"198.51.100.{index}", 'reason': f"Scanner {index}"} for index in range(4)]
+        self.import_feed('feed.json', json.dumps({'entries': entries + [{'ip': '203.0.113.5', 'reason': 'Botnet'}]}))
+        self.assertEqual(
+            dict(BlacklistRule.objects.values_list('pattern', 'reason')),
+            {'198.51.100.0/30': 'Threat feed: feed - Scanner 0 (+3 more)', '203.0.113.5': 'Threat feed: feed - Botnet'},
+        )
+
+    def test_escaped_patterns_collapse_case_insensitively(self):
+        self.assertEqual(pattern_key(re.escape('BadBot/1.0')), pattern_key(re.escape('badbot/1.0')))
+        self.assertEqual(pattern_key(r'(?i).*EVIL\.com.*'), r'evil\.com')
+        self.assertNotEqual(pattern_key(r'\D+'), pattern_key(r'\d+'))
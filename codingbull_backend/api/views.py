@@ -1,12 +1,50 @@
+from django.conf import settings
+from django.db.models import Count
 from rest_framework import viewsets, filters, status
 from rest_framework.response import Response
 from rest_framework.decorators import action, api_view
 from .models import Category, BlogPost, Project, Service, ContactInquiry, Testimonial
-from .serializers import CategorySerializer, BlogPostSerializer, ProjectSerializer, ServiceSerializer, ContactInquirySerializer, TestimonialSerializer
+from .serializers import (
+    CategorySerializer, CategoryPostCountSerializer, BlogPostSerializer, BlogPostListSerializer,
+    ProjectSerializer, ProjectListSerializer, ServiceSerializer, ServiceListSerializer,
+    ContactInquirySerializer, TestimonialSerializer,
+)
+from .response_cache import CachedResponseMixin
+from .pagination import BlogPostPagination
+from .search import FullTextSearchFilter
 
-class CategoryViewSet(viewsets.ModelViewSet):
+
+class ListSerializerMixin:
+    """
+    Lighter serializer and queryset for the list-style actions of a viewset.
+
+    Actions in list_actions use list_serializer_class, and their queryset
+    goes through get_list_queryset, which defers list_defer: the columns the
+    list serializer never reads, so they are not fetched either.
+    """
+    list_serializer_class = None
+    list_actions = ('list',)
+    list_defer = ()
+
+    def get_serializer_class(self):
+        if self.list_serializer_class is not None and self.action in self.list_actions:
+            return self.list_serializer_class
+        return super().get_serializer_class()
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in self.list_actions:
+            queryset = self.get_list_queryset(queryset)
+        return queryset
+
+    def get_list_queryset(self, queryset):
+        return queryset.defer(*self.list_defer) if self.list_defer else queryset
+
+
+class CategoryViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
+    cache_models = (Category, BlogPost)  # with_post_count counts posts
     http_method_names = ['get']  # Only allow read operations
     
     @action(detail=False, methods=['get'])
@@ -14,22 +52,25 @@ class CategoryViewSet(viewsets.ModelViewSet):
         """
         Get all categories with post count
         """
-        categories = Category.objects.all()
-        result = []
-        
-        for category in categories:
-            post_count = BlogPost.objects.filter(category=category).count()
-            category_data = self.get_serializer(category).data
-            category_data['post_count'] = post_count
-            result.append(category_data)
-            
-        return Response(result)
+        if getattr(settings, 'USE_DENORMALIZED_POST_COUNT', False):
+            categories = Category.objects.all()
+        else:
+            categories = Category.objects.annotate(live_post_count=Count('blog_posts'))
+        serializer = CategoryPostCountSerializer(categories, many=True, context=self.get_serializer_context())
+        return Response(serializer.data)
 
-class BlogPostViewSet(viewsets.ModelViewSet):
-    queryset = BlogPost.objects.all()
+class BlogPostViewSet(CachedResponseMixin, ListSerializerMixin, viewsets.ModelViewSet):
+    queryset = BlogPost.objects.select_related('category')
     serializer_class = BlogPostSerializer
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
-    search_fields = ['title', 'content', 'category__name']
+    list_serializer_class = BlogPostListSerializer
+    list_actions = ('list', 'by_category', 'featured')
+    list_defer = ('content',)
+    pagination_class = BlogPostPagination  # ?pagination=cursor for keyset pages
+    cache_models = (BlogPost, Category)
+    cache_query_params = ('category', 'category_id')
+    # Full-text search on title, excerpt, content and category name; it
+    # orders by relevance, so it runs after OrderingFilter
+    filter_backends = [filters.OrderingFilter, FullTextSearchFilter]
     ordering_fields = ['published_date']
     ordering = ['-published_date']
     http_method_names = ['get']  # Only allow read operations
@@ -46,6 +87,12 @@ class BlogPostViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(category__name__iexact=category_name)
                 
         return queryset
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if page is not None:
+            FullTextSearchFilter().attach_snippets(self.request, page)
+        return page
         
     @action(detail=False, methods=['get'])
     def by_category(self, request):
@@ -56,7 +103,7 @@ class BlogPostViewSet(viewsets.ModelViewSet):
         if not category_name or category_name.lower() == 'all':
             queryset = self.get_queryset()
         else:
-            queryset = BlogPost.objects.filter(category__name__iexact=category_name).order_by('-published_date')
+            queryset = self.get_list_queryset(self.queryset).filter(category__name__iexact=category_name).order_by('-published_date')
             
         page = self.paginate_queryset(queryset)
         if page is not None:
@@ -72,18 +119,29 @@ class BlogPostViewSet(viewsets.ModelViewSet):
         Get featured blog posts
         """
         # Get the 3 most recent posts as featured
-        queryset = BlogPost.objects.all().order_by('-published_date')[:3]
+        queryset = self.get_list_queryset(self.queryset).order_by('-published_date')[:3]
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
 
-class ProjectViewSet(viewsets.ModelViewSet):
-    queryset = Project.objects.all()
+class ProjectViewSet(CachedResponseMixin, ListSerializerMixin, viewsets.ModelViewSet):
+    # Prefetching the reverse FK also fills testimonial.project, which
+    # TestimonialSerializer reads for project_title and the logo fallback
+    queryset = Project.objects.prefetch_related('testimonials')
     serializer_class = ProjectSerializer
+    list_serializer_class = ProjectListSerializer
+    cache_models = (Project, Testimonial)
     http_method_names = ['get']  # Only allow read operations
 
-class ServiceViewSet(viewsets.ModelViewSet):
+    def get_list_queryset(self, queryset):
+        # The list serializer has no nested testimonials
+        return queryset.prefetch_related(None)
+
+class ServiceViewSet(CachedResponseMixin, ListSerializerMixin, viewsets.ModelViewSet):
     queryset = Service.objects.all()
     serializer_class = ServiceSerializer
+    list_serializer_class = ServiceListSerializer
+    list_defer = ('long_description', 'detailed_features', 'process_steps', 'technologies', 'faqs', 'related_services')
+    cache_models = (Service,)
     lookup_field = 'slug'
     http_method_names = ['get']  # Only allow read operations
 
@@ -103,9 +161,10 @@ class ContactInquiryViewSet(viewsets.ModelViewSet):
             headers=headers
         )
 
-class TestimonialViewSet(viewsets.ModelViewSet):
-    queryset = Testimonial.objects.all()
+class TestimonialViewSet(CachedResponseMixin, viewsets.ModelViewSet):
+    queryset = Testimonial.objects.select_related('project')
     serializer_class = TestimonialSerializer
+    cache_models = (Testimonial, Project)
     http_method_names = ['get']  # Only allow read operations
     
     def list(self, request, *args, **kwargs):
@@ -168,10 +227,17 @@ def technologies_list(request):
 
 
 # Error Tracking Views
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, authentication_classes, parser_classes, permission_classes
 from rest_framework.permissions import AllowAny
-from .models import ErrorLog, PerformanceLog, UserSession
+from .models import UserSession
+from .renderers import FastJSONParser, PlainTextJSONParser
+from .rollups import pending_performance_rollups, record_error_occurrences
+from .telemetry import (
+    build_error_log, build_performance_log, clean_event_instance, get_batch_max_events, ingest_events, upsert_error_log,
+)
 import json
+from functools import partial
+from django.db import transaction
 from django.utils import timezone
 from django.http import JsonResponse
 
@@ -183,24 +249,13 @@ def track_error(request):
         data = request.data
         
         # Create or update error log
-        error_log = ErrorLog.objects.create(
-            error_type=data.get('type', 'javascript'),
-            severity=data.get('severity', 'medium'),
-            message=data.get('message', ''),
-            stack_trace=data.get('stack', ''),
-            component_stack=data.get('component_stack', ''),
-            url=data.get('url', ''),
-            user_agent=data.get('userAgent', ''),
-            browser_info=data.get('browserInfo', {}),
-            user_id=data.get('userId'),
-            session_id=data.get('sessionId'),
-            page_load_time=data.get('pageLoadTime'),
-            memory_usage=data.get('memoryUsage'),
-            breadcrumbs=data.get('breadcrumbs', []),
-            extra_data=data.get('extra_data', {})
-        )
+        error_log = build_error_log(data)
+        clean_event_instance(error_log)
+        with transaction.atomic():
+            error_log_id, _ = upsert_error_log(error_log)
+            record_error_occurrences([error_log])
         
-        return JsonResponse({'status': 'success', 'id': error_log.pk})
+        return JsonResponse({'status': 'success', 'id': error_log_id})
     except Exception as e:
         return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
 
@@ -211,15 +266,12 @@ def track_performance(request):
     try:
         data = request.data
         
-        performance_log = PerformanceLog.objects.create(
-            metric_type=data.get('type', 'page_load'),
-            duration=data.get('duration', 0),
-            url=data.get('url', ''),
-            user_agent=data.get('userAgent', ''),
-            user_id=data.get('userId'),
-            session_id=data.get('sessionId'),
-            metrics=data.get('metrics', {})
-        )
+        performance_log = build_performance_log(data)
+        clean_event_instance(performance_log)
+        performance_log.save()
+        # Merged into the rollups in batches, not locked per beacon
+        transaction.on_commit(partial(pending_performance_rollups.add, [performance_log]))
+        transaction.on_commit(pending_performance_rollups.maybe_flush)
         
         return JsonResponse({'status': 'success', 'id': performance_log.pk})
     except Exception as e:
@@ -270,3 +322,25 @@ def update_session(request):
             
     except Exception as e:
         return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+
+@api_view(['POST'])
+@authentication_classes([])
+@permission_classes([AllowAny])
+@parser_classes([FastJSONParser, PlainTextJSONParser])
+def track_batch(request):
+    """Track a batch of events, each a single-endpoint payload plus its 'kind'"""
+    # No authentication: beacons sent while a page unloads carry no CSRF token
+    data = request.data
+    events = data.get('events') if isinstance(data, dict) else data
+    if not isinstance(events, list):
+        return JsonResponse({'status': 'error', 'message': 'Expected a list of events'}, status=400)
+    if len(events) > get_batch_max_events():
+        return JsonResponse(
+            {'status': 'error', 'message': f"At most {get_batch_max_events()} events per batch"}, status=400
+        )
+
+    try:
+        accepted, rejected = ingest_events(events, ip_address=request.META.get('REMOTE_ADDR'))
+    except Exception as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+    return JsonResponse({'status': 'success', 'accepted': accepted, 'rejected': rejected})
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 from pathlib import Path
+import importlib.util
 import os
 from dotenv import load_dotenv
 
@@ -66,6 +67,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
+    'api.compression.CompressionMiddleware',  # gzip/brotli, before anything that reads the body
     'api.security_middleware.EnhancedSecurityMiddleware',  # Enhanced security middleware first
     'api.security_headers_middleware.SecurityHeadersMiddleware',  # Security headers
     'api.security_headers_middleware.APISecurityHeadersMiddleware',  # API-specific headers
@@ -142,14 +144,80 @@ CORS_ALLOW_METHODS = [
 REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
+    # orjson-backed when orjson is installed, stdlib json otherwise (same output)
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'api.renderers.FastJSONRenderer',
     ],
     'DEFAULT_PARSER_CLASSES': [
-        'rest_framework.parsers.JSONParser',
+        'api.renderers.FastJSONParser',
     ],
 }
 
+# Cached GET responses of the read-only content viewsets (see api.response_cache).
+# Entries are invalidated by content generations, TIMEOUT only bounds their lifetime
+API_RESPONSE_CACHE = {
+    'ENABLED': os.getenv('API_RESPONSE_CACHE_ENABLED', 'True').lower() == 'true',
+    'CACHE_ALIAS': 'default',
+    'TIMEOUT': 60 * 60,
+    'KEY_PREFIX': 'apiresponse',
+}
+
+# Negotiated gzip/brotli compression of JSON/XML/text responses (see
+# api.compression). Brotli is used when the brotli module is installed. The
+# same levels apply to the variants stored with response cache entries
+RESPONSE_COMPRESSION = {
+    'ENABLED': os.getenv('RESPONSE_COMPRESSION_ENABLED', 'True').lower() == 'true',
+    'MIN_SIZE': 1024,  # Bytes; smaller bodies are sent as is
+    'GZIP_LEVEL': 6,
+    'BROTLI_QUALITY': 5,
+}
+
+# Most events /api/v1/error-tracking/batch/ accepts in one request
+TELEMETRY_BATCH_MAX_EVENTS = 200
+
+# Single /api/v1/error-tracking/performance/ events are merged into the
+# rollups in batches: after this many events or seconds, per worker
+TELEMETRY_ROLLUP_FLUSH_EVENTS = 200
+TELEMETRY_ROLLUP_FLUSH_INTERVAL = 5.0
+
+# Days of rows kept per log table by `manage.py prune_logs` (see api.retention);
+# None keeps a table forever. The hourly/daily rollups outlive the raw rows,
+# so the dashboards keep their history. Deletes run CHUNK_SIZE rows per
+# transaction with CHUNK_PAUSE seconds between them; tables partitioned by
+# time range on PostgreSQL drop whole expired partitions instead and get
+# monthly partitions created PARTITIONS_AHEAD months in advance
+LOG_RETENTION = {
+    'POLICIES': {
+        'SecurityLog': int(os.getenv('SECURITY_LOG_RETENTION_DAYS', '30')),
+        'ErrorLog': 90,
+        'PerformanceLog': 30,
+        'UserSession': 90,
+        'RateLimitTracker': 1,
+        'PerformanceRollup': None,
+        'LogRollup': None,
+    },
+    'CHUNK_SIZE': 5000,
+    'CHUNK_PAUSE': 0.1,
+    'PARTITIONS_AHEAD': 2,
+}
+
+# Serve /categories/with_post_count/ from the denormalised Category.post_count
+# column instead of a COUNT join (both are a single query)
+USE_DENORMALIZED_POST_COUNT = os.getenv('USE_DENORMALIZED_POST_COUNT', 'False').lower() == 'true'
+
+# Cache-Control for GET/HEAD responses of public API endpoints, by path prefix
+# (see api.security_headers_middleware). 'no-cache' lets browsers keep a copy
+# but revalidate it with If-None-Match, which the content viewsets answer with
+# 304. Any other /api/ path stays no-store.
+CONTENT_API_PREFIXES = [
+    f"/api/{version}{resource}/"
+    for version in ('v1/', '')
+    for resource in ('categories', 'blogs', 'projects', 'services', 'testimonials', 'technologies')
+]
+API_CACHE_POLICIES = [
+    {'name': 'content', 'prefixes': CONTENT_API_PREFIXES, 'cache_control': 'public, no-cache'},
+]
+
 ROOT_URLCONF = 'codingbull_api.urls'
 
 TEMPLATES = [
@@ -213,6 +281,51 @@ else:
     }
 
 
+# Cache configuration
+# Security rule generations, rate limit counters and cached API responses live
+# in the cache, so all gunicorn workers must share one backend in production.
+# Redis (CACHE_URL=redis://..., redis-py is in requirements.txt) is the
+# production backend: its INCR is atomic across workers. Without it a
+# file-based cache on the VPS disk still shares generations and responses,
+# but rate limiting falls back to database rows (see RATE_LIMIT_BACKEND).
+CACHE_URL = os.environ.get('CACHE_URL', '')
+CACHE_KEY_PREFIX = os.environ.get('CACHE_KEY_PREFIX', 'codingbull')
+CACHE_TIMEOUT = int(os.environ.get('CACHE_TIMEOUT', '3600'))
+SHARED_ATOMIC_CACHE = CACHE_URL.startswith(('redis://', 'rediss://')) and importlib.util.find_spec('redis') is not None
+
+if SHARED_ATOMIC_CACHE:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+            'KEY_PREFIX': CACHE_KEY_PREFIX,
+            'TIMEOUT': CACHE_TIMEOUT,
+        }
+    }
+elif ENVIRONMENT == 'production':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': BASE_DIR / 'cache',
+            'KEY_PREFIX': CACHE_KEY_PREFIX,
+            'TIMEOUT': CACHE_TIMEOUT,
+            # The default of 300 would cull generations and cached responses under load
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'codingbull-dev',
+            'TIMEOUT': CACHE_TIMEOUT,
+        }
+    }
+
+# Redis, or local memory in a single development process; not the file cache
+CACHE_COUNTERS_ATOMIC = SHARED_ATOMIC_CACHE or ENVIRONMENT != 'production'
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -257,6 +370,9 @@ STATICFILES_DIRS = [
 # Media files (user uploaded content)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# Origin for absolute media URLs in API responses (e.g. a CDN). Empty uses the
+# request's scheme and host; see api.media_urls
+MEDIA_BASE_URL = os.getenv('MEDIA_BASE_URL', '')
 
 # Static files configuration for production
 STATIC_ROOT = BASE_DIR / 'staticfiles'
@@ -370,6 +486,25 @@ SECURITY_MIDDLEWARE_SETTINGS = {
     'LOCALHOST_IPS': ['127.0.0.1', '::1', 'localhost'],  # IPs considered as localhost
     'LOCAL_NETWORK_RANGES': ['192.168.', '10.', '172.'],  # Local network prefixes
     'RESPECT_DEBUG_MODE': True,  # Disable rate limiting when DEBUG=True
+    'RULE_SNAPSHOT_MAX_AGE': 300,  # Seconds before a worker reloads blacklist/rate limit rules even without a signal
+    # Rate limit counters: CacheRateLimitBackend uses the CACHES alias below
+    # ('fixed' or 'sliding' windows) and needs atomic increments shared by all
+    # workers, so production without Redis keeps DatabaseRateLimitBackend's rows
+    'RATE_LIMIT_BACKEND': (
+        'api.rate_limit.CacheRateLimitBackend' if CACHE_COUNTERS_ATOMIC else 'api.rate_limit.DatabaseRateLimitBackend'
+    ),
+    'RATE_LIMIT_BACKEND_OPTIONS': {'cache_alias': 'default', 'algorithm': 'sliding'} if CACHE_COUNTERS_ATOMIC else {},
+    # Background SecurityLog writer: bounded queue drained by a thread per worker
+    'SECURITY_LOG_ASYNC': True,  # False writes each entry inline (useful in tests)
+    'SECURITY_LOG_QUEUE_SIZE': 10000,  # Entries beyond this are dropped and counted
+    'SECURITY_LOG_BATCH_SIZE': 200,  # Rows per bulk_create
+    'SECURITY_LOG_FLUSH_INTERVAL': 2.0,  # Seconds between flushes of a partial batch
+    'SECURITY_COUNTER_FLUSH_EVENTS': 500,  # Pending IP/user agent counter increments before a flush
+    'SECURITY_COUNTER_FLUSH_INTERVAL': 5.0,  # Seconds between counter flushes
+    'USER_AGENT_CACHE_SIZE': 2048,  # Per-worker LRU entries for parsed user agents and UserAgent PKs
+    # Route classes default to api.route_classes.DEFAULT_ROUTE_CLASSES; set
+    # 'ROUTE_CLASSES' here to replace them. Policies: 'skip' (blacklist only),
+    # 'sample' (full checks, log sample_rate of unremarkable requests), 'full'
 }
 
 # ============================================================================
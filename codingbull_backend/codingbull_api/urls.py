@@ -114,6 +114,7 @@ urlpatterns = [
     path('api/v1/error-tracking/performance/', views.track_performance, name='track-performance'),
     path('api/v1/error-tracking/session/', views.track_session, name='track-session'),
     path('api/v1/error-tracking/session-update/', views.update_session, name='update-session'),
+    path('api/v1/error-tracking/batch/', views.track_batch, name='track-batch'),
 
     # SEO and sitemap endpoints
     path('sitemap.xml', sitemap, {'sitemaps': sitemaps}, name='django.contrib.sitemaps.views.sitemap'),
@@ -152,6 +153,7 @@ urlpatterns += [
     path('error-tracking/performance/', views.track_performance, name='track-performance-legacy'),
     path('error-tracking/session/', views.track_session, name='track-session-legacy'),
     path('error-tracking/session-update/', views.update_session, name='update-session-legacy'),
+    path('error-tracking/batch/', views.track_batch, name='track-batch-legacy'),
 ]
 
 # Serve media files based on environment